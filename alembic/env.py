@@ -11,7 +11,13 @@ from src.core.database import Base
 # Import all models so they are registered with Base.metadata
 from src.auth.models import User  # noqa: F401
 from src.categories.models import Category  # noqa: F401
+from src.core.idempotency import IdempotencyKey  # noqa: F401
+from src.core.leases import Lease  # noqa: F401
+from src.core.sharding import UserDirectory  # noqa: F401
+from src.outbox.models import OutboxMessage  # noqa: F401
+from src.tags.models import Tag  # noqa: F401
 from src.todos.models import Todo  # noqa: F401
+from src.webhooks.models import Webhook  # noqa: F401
 
 config = context.config
 
@@ -39,24 +45,35 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection) -> None:  # type: ignore[no-untyped-def]
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        compare_server_default=True,
+        # SQLite can't ALTER constraints or defaults in place.
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
 
     with context.begin_transaction():
         context.run_migrations()
 
 
 async def run_async_migrations() -> None:
-    """Run migrations in 'online' mode with async engine."""
-    connectable = async_engine_from_config(
-        config.get_section(config.config_ini_section, {}),
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
-    )
-
-    async with connectable.connect() as connection:
-        await connection.run_sync(do_run_migrations)
-
-    await connectable.dispose()
+    """Run migrations in 'online' mode with async engine.
+
+    When sharded, every shard gets the same schema as the directory database.
+    """
+    section = config.get_section(config.config_ini_section, {})
+    for url in [settings.DATABASE_URL, *settings.DATABASE_SHARD_URLS]:
+        connectable = async_engine_from_config(
+            {**section, "sqlalchemy.url": url},
+            prefix="sqlalchemy.",
+            poolclass=pool.NullPool,
+        )
+
+        async with connectable.connect() as connection:
+            await connection.run_sync(do_run_migrations)
+
+        await connectable.dispose()
 
 
 def run_migrations_online() -> None:
@@ -0,0 +1,58 @@
+"""archive_completed_todos
+
+Revision ID: 6f73aec4353c
+Revises: be9ac27bcc0f
+Create Date: 2026-10-19 17:22:49.689622
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f73aec4353c'
+down_revision: Union[str, Sequence[str], None] = 'be9ac27bcc0f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _recreate_todo_on_sqlite(autoincrement: bool) -> dict:
+    # Archived todos keep their id, so SQLite must not reuse the highest id
+    # after it is deleted, which takes AUTOINCREMENT and a table rebuild.
+    if op.get_context().dialect.name != 'sqlite':
+        return {}
+    return {'recreate': 'always', 'table_kwargs': {'sqlite_autoincrement': autoincrement}}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('todo_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=True),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('priority', sa.Integer(), nullable=True),
+    sa.Column('due_date', sa.Date(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('archived_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['category.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'id')
+    )
+    op.create_index('ix_todo_archive_category_id', 'todo_archive', ['category_id'], unique=False)
+    with op.batch_alter_table('todo', **_recreate_todo_on_sqlite(True)) as batch_op:
+        batch_op.create_index('ix_todo_completed_at', ['completed_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('todo', **_recreate_todo_on_sqlite(False)) as batch_op:
+        batch_op.drop_index('ix_todo_completed_at')
+    op.drop_index('ix_todo_archive_category_id', table_name='todo_archive')
+    op.drop_table('todo_archive')
@@ -0,0 +1,44 @@
+"""cascade_user_deletes
+
+Revision ID: be9ac27bcc0f
+Revises: d223cb471476
+Create Date: 2026-10-19 16:41:07.699017
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'be9ac27bcc0f'
+down_revision: Union[str, Sequence[str], None] = 'd223cb471476'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The initial schema left these foreign keys unnamed. This convention gives
+# SQLite's reflected copies PostgreSQL's default names, so one name works on
+# both.
+NAMING_CONVENTION = {'fk': '%(table_name)s_%(column_0_name)s_fkey'}
+
+
+def _set_user_fk_ondelete(ondelete: Union[str, None]) -> None:
+    for table in ('category', 'todo'):
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            batch_op.drop_constraint(f'{table}_user_id_fkey', type_='foreignkey')
+            batch_op.create_foreign_key(f'{table}_user_id_fkey', 'user', ['user_id'], ['id'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _set_user_fk_ondelete('CASCADE')
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('deleted_at')
+    _set_user_fk_ondelete(None)
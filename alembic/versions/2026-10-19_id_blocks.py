@@ -0,0 +1,31 @@
+"""id_blocks
+
+Revision ID: 3d8a61f0c2e7
+Revises: f8bea4bb90fe
+Create Date: 2026-10-19 22:41:17.902113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d8a61f0c2e7'
+down_revision: Union[str, Sequence[str], None] = 'f8bea4bb90fe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('id_block',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('id_block')
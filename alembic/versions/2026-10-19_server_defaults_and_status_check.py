@@ -0,0 +1,63 @@
+"""server_defaults_and_status_check
+
+Revision ID: aaad6a5645a1
+Revises: 2a70755b1a9b
+Create Date: 2026-10-19 02:51:38.772894
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'aaad6a5645a1'
+down_revision: Union[str, Sequence[str], None] = '2a70755b1a9b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TIMESTAMP_COLUMNS = {
+    'user': ['created_at'],
+    'category': ['created_at'],
+    'todo': ['created_at', 'updated_at'],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column,
+                       existing_type=sa.DateTime(timezone=True),
+                       server_default=sa.func.now(),
+                       existing_nullable=False)
+
+    with op.batch_alter_table('todo', schema=None) as batch_op:
+        batch_op.alter_column('status',
+               existing_type=sa.String(length=20),
+               server_default='pending',
+               existing_nullable=False)
+        batch_op.create_check_constraint(
+            'ck_todo_status',
+            "status IN ('pending', 'in_progress', 'completed')",
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('todo', schema=None) as batch_op:
+        batch_op.drop_constraint('ck_todo_status', type_='check')
+        batch_op.alter_column('status',
+               existing_type=sa.String(length=20),
+               server_default=None,
+               existing_nullable=False)
+
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column,
+                       existing_type=sa.DateTime(timezone=True),
+                       server_default=None,
+                       existing_nullable=False)
@@ -0,0 +1,47 @@
+"""subtasks
+
+Revision ID: 11281ad481fd
+Revises: 6f73aec4353c
+Create Date: 2026-10-19 18:09:22.759612
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '11281ad481fd'
+down_revision: Union[str, Sequence[str], None] = '6f73aec4353c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _sqlite_table_kwargs() -> dict:
+    # Adding a foreign key rebuilds the table on SQLite; keep AUTOINCREMENT.
+    if op.get_context().dialect.name != 'sqlite':
+        return {}
+    return {'table_kwargs': {'sqlite_autoincrement': True}}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('todo', **_sqlite_table_kwargs()) as batch_op:
+        batch_op.add_column(sa.Column('parent_id', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_todo_parent_id', ['parent_id'], unique=False)
+        batch_op.create_foreign_key('todo_parent_id_fkey', 'todo', ['parent_id'], ['id'], ondelete='CASCADE')
+
+    with op.batch_alter_table('todo_archive', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('parent_id', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('todo_archive', schema=None) as batch_op:
+        batch_op.drop_column('parent_id')
+
+    with op.batch_alter_table('todo', **_sqlite_table_kwargs()) as batch_op:
+        batch_op.drop_constraint('todo_parent_id_fkey', type_='foreignkey')
+        batch_op.drop_index('ix_todo_parent_id')
+        batch_op.drop_column('parent_id')
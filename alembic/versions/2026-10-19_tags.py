@@ -0,0 +1,47 @@
+"""tags
+
+Revision ID: 5c00904884ad
+Revises: 11281ad481fd
+Create Date: 2026-10-19 19:42:08.316504
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c00904884ad'
+down_revision: Union[str, Sequence[str], None] = '11281ad481fd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('tag',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=50).with_variant(sa.String(length=50, collation='C'), 'postgresql'), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='tag_user_id_fkey', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'name', name='uq_tag_user_name')
+    )
+    op.create_index('ix_tag_user_id', 'tag', ['user_id'], unique=False)
+    op.create_table('todo_tag',
+    sa.Column('todo_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['tag_id'], ['tag.id'], name='todo_tag_tag_id_fkey', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('todo_id', 'tag_id')
+    )
+    op.create_index('ix_todo_tag_tag_id_todo_id', 'todo_tag', ['tag_id', 'todo_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_todo_tag_tag_id_todo_id', table_name='todo_tag')
+    op.drop_table('todo_tag')
+    op.drop_index('ix_tag_user_id', table_name='tag')
+    op.drop_table('tag')
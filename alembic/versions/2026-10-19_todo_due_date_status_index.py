@@ -0,0 +1,27 @@
+"""todo_due_date_status_index
+
+Revision ID: b899c7b210b1
+Revises: 9e4b2d7c1a38
+Create Date: 2026-10-19 12:05:41.227306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b899c7b210b1'
+down_revision: Union[str, Sequence[str], None] = '9e4b2d7c1a38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_todo_due_date_status', 'todo', ['due_date', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_todo_due_date_status', table_name='todo')
@@ -0,0 +1,94 @@
+"""todo_rank
+
+Revision ID: f8bea4bb90fe
+Revises: 5c00904884ad
+Create Date: 2026-10-19 21:04:51.527340
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f8bea4bb90fe'
+down_revision: Union[str, Sequence[str], None] = '5c00904884ad'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+RANK_TYPE = sa.String(length=255).with_variant(sa.String(length=255, collation='C'), 'postgresql')
+DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+
+
+def _sqlite_table_kwargs() -> dict:
+    # Dropping a column rebuilds the table on SQLite; keep AUTOINCREMENT.
+    if op.get_context().dialect.name != 'sqlite':
+        return {}
+    return {'table_kwargs': {'sqlite_autoincrement': True}}
+
+
+def _rank(n: int) -> str:
+    # Fixed-width rank keys in order: "e" and five base-62 digits.
+    digits = ''
+    for _ in range(5):
+        n, digit = divmod(n, len(DIGITS))
+        digits = DIGITS[digit] + digits
+    return 'e' + digits
+
+
+def _backfill_ranks() -> None:
+    """Rank each user's todos, archived or not, newest first as listed so far."""
+    bind = op.get_bind()
+    tables = {
+        name: sa.table(name, sa.column('id'), sa.column('user_id'), sa.column('created_at'), sa.column('rank'))
+        for name in ('todo', 'todo_archive')
+    }
+    rows = bind.execute(
+        sa.union_all(
+            *(
+                sa.select(table.c.id, table.c.user_id, table.c.created_at, sa.literal(name).label('source'))
+                for name, table in tables.items()
+            )
+        ).order_by(sa.text('user_id'), sa.text('created_at DESC'), sa.text('id DESC'))
+    ).all()
+    ranks: dict[str, list[dict]] = {name: [] for name in tables}
+    user_id, n = None, 0
+    for row in rows:
+        if row.user_id != user_id:
+            user_id, n = row.user_id, 0
+        ranks[row.source].append({'_id': row.id, '_user_id': row.user_id, '_rank': _rank(n)})
+        n += 1
+    for name, table in tables.items():
+        if ranks[name]:
+            bind.execute(
+                table.update()
+                .where(table.c.id == sa.bindparam('_id'), table.c.user_id == sa.bindparam('_user_id'))
+                .values(rank=sa.bindparam('_rank')),
+                ranks[name],
+            )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('todo', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rank', RANK_TYPE, server_default='a0', nullable=False))
+        batch_op.create_index('ix_todo_user_id_rank', ['user_id', 'rank'], unique=False)
+
+    with op.batch_alter_table('todo_archive', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rank', RANK_TYPE, nullable=True))
+
+    _backfill_ranks()
+
+    with op.batch_alter_table('todo_archive', schema=None) as batch_op:
+        batch_op.alter_column('rank', existing_type=RANK_TYPE, nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('todo_archive', schema=None) as batch_op:
+        batch_op.drop_column('rank')
+
+    with op.batch_alter_table('todo', **_sqlite_table_kwargs()) as batch_op:
+        batch_op.drop_index('ix_todo_user_id_rank')
+        batch_op.drop_column('rank')
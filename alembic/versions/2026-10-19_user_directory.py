@@ -0,0 +1,36 @@
+"""user_directory
+
+Revision ID: 5c1e0b7d93f4
+Revises: aaad6a5645a1
+Create Date: 2026-10-19 09:12:04.118532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e0b7d93f4'
+down_revision: Union[str, Sequence[str], None] = 'aaad6a5645a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_directory',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('moving', sa.Boolean(), server_default=sa.false(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index(op.f('ix_user_directory_email'), 'user_directory', ['email'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_user_directory_email'), table_name='user_directory')
+    op.drop_table('user_directory')
@@ -0,0 +1,63 @@
+"""Report what importing the app costs, module by module.
+
+Imports ``src.main`` in a fresh interpreter under ``-X importtime`` and lists
+the most expensive modules by self time, with each top-level package's
+cumulative cost.
+
+    uv run python -m benchmarks.import_cost [module] [top]
+"""
+
+import subprocess
+import sys
+from typing import NamedTuple
+
+
+class ImportCost(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def measure_imports(module: str = "src.main") -> list[ImportCost]:
+    """Import ``module`` in a subprocess and parse its ``-X importtime`` log."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    costs = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        costs.append(ImportCost(name.strip(), int(self_us), int(cumulative_us)))
+    return costs
+
+
+def main(module: str, top: int) -> None:
+    costs = measure_imports(module)
+    total = next(cost for cost in costs if cost.module == module)
+    print(f"import {module}: {total.cumulative_us / 1000:.1f} ms")
+
+    packages: dict[str, int] = {}
+    for cost in costs:
+        package = cost.module.split(".")[0]
+        packages[package] = packages.get(package, 0) + cost.self_us
+    print(f"\n{'package':<32}{'ms':>8}")
+    for package, us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"{package:<32}{us / 1000:8.1f}")
+
+    print(f"\n{'module':<48}{'self ms':>8}{'cum ms':>8}")
+    for cost in sorted(costs, key=lambda cost: -cost.self_us)[:top]:
+        print(
+            f"{cost.module:<48}{cost.self_us / 1000:8.1f}"
+            f"{cost.cumulative_us / 1000:8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main(
+        sys.argv[1] if len(sys.argv) > 1 else "src.main",
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20,
+    )
@@ -0,0 +1,92 @@
+"""Measure per-request overhead of RequestContextMiddleware.
+
+Drives a minimal FastAPI app directly over ASGI (no sockets) with no
+middleware, with a no-op ``BaseHTTPMiddleware`` for reference, and with
+``RequestContextMiddleware``, and reports the mean cost per request.
+
+    uv run python -m benchmarks.middleware_overhead [requests]
+"""
+
+import asyncio
+import logging
+import sys
+from time import perf_counter
+
+from fastapi import FastAPI, Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.types import ASGIApp, Message
+
+from src.core.middleware import RequestContextMiddleware
+
+
+class NoopHTTPMiddleware(BaseHTTPMiddleware):
+    async def dispatch(
+        self, request: Request, call_next: RequestResponseEndpoint
+    ) -> Response:
+        return await call_next(request)
+
+
+def build_app(middleware: type | None) -> ASGIApp:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping() -> dict[str, str]:
+        return {"status": "ok"}
+
+    if middleware is not None:
+        app.add_middleware(middleware)
+    return app
+
+
+async def drive(app: ASGIApp, requests: int) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/ping",
+        "raw_path": b"/ping",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        pass
+
+    for _ in range(500):  # warm up routing and validation caches
+        await app(dict(scope), receive, send)
+
+    start = perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return perf_counter() - start
+
+
+async def main(requests: int) -> None:
+    # Keep the access log enabled but discard its output so we time record
+    # creation rather than terminal I/O.
+    access_logger = logging.getLogger("src.access")
+    access_logger.setLevel(logging.INFO)
+    access_logger.addHandler(logging.NullHandler())
+    access_logger.propagate = False
+
+    base_us = await drive(build_app(None), requests) / requests * 1e6
+    print(f"requests: {requests}")
+    print(f"{'no middleware':<28}{base_us:8.1f} us/req")
+    for middleware in (NoopHTTPMiddleware, RequestContextMiddleware):
+        us = await drive(build_app(middleware), requests) / requests * 1e6
+        print(
+            f"{middleware.__name__:<28}{us:8.1f} us/req "
+            f"(+{us - base_us:.1f} us, +{(us / base_us - 1) * 100:.0f}%)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000))
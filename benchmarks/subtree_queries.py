@@ -0,0 +1,97 @@
+"""Time subtree reads: one recursive-CTE query against a query per node.
+
+Builds wide, deep and bushy subtask trees in a SQLite database alongside
+``other_rows`` unrelated todos, then reads each tree with
+``TodoService.get_subtree`` and with a naive traversal that asks for every
+node's children separately. The CTE's cost follows the subtree's size, not
+the table's: rerun with a larger ``other_rows`` to see it stay flat.
+
+    uv run python -m benchmarks.subtree_queries [other_rows]
+"""
+
+import asyncio
+import statistics
+import sys
+from collections.abc import Awaitable, Callable
+from functools import partial
+from time import perf_counter
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+# Import the models the todo table refers to, so create_all can build them.
+from src.auth.models import User  # noqa: F401
+from src.categories.models import Category  # noqa: F401
+from src.core.database import Base
+from src.todos.models import Todo
+from src.todos.service import TodoService
+
+USER_ID = 1
+# name: (children per node, levels below the root)
+SHAPES = {"wide": (2000, 1), "deep": (1, 8), "bushy": (4, 6)}
+
+
+async def build_tree(db: AsyncSession, fanout: int, levels: int) -> tuple[int, int]:
+    """Insert a tree level by level; return its root id and size."""
+    root_id = await db.scalar(
+        insert(Todo).values(user_id=USER_ID, title="root").returning(Todo.id)
+    )
+    assert root_id is not None
+    level, size = [root_id], 1
+    for depth in range(1, levels + 1):
+        rows = [
+            {"user_id": USER_ID, "title": f"d{depth}", "parent_id": parent}
+            for parent in level
+            for _ in range(fanout)
+        ]
+        level = list(await db.scalars(insert(Todo).returning(Todo.id), rows))
+        size += len(level)
+    await db.commit()
+    return root_id, size
+
+
+async def naive_subtree(db: AsyncSession, root_id: int) -> int:
+    """The N+1 traversal: one children query per node."""
+    seen, pending = 0, [root_id]
+    while pending:
+        todo_id = pending.pop()
+        seen += 1
+        children = await db.scalars(select(Todo.id).where(Todo.parent_id == todo_id))
+        pending.extend(children)
+    return seen
+
+
+async def best_ms(read: Callable[[], Awaitable[object]], repeat: int = 5) -> float:
+    await read()  # warm up the statement cache
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        await read()
+        timings.append(perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+async def main(other_rows: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine) as db:
+        await db.execute(
+            insert(Todo),
+            [{"user_id": 2, "title": f"other {n}"} for n in range(other_rows)],
+        )
+        print(f"other rows: {other_rows}")
+        print(f"{'tree':<8}{'nodes':>8}{'CTE ms':>10}{'N+1 ms':>10}")
+        service = TodoService(db)
+        for name, (fanout, levels) in SHAPES.items():
+            root_id, size = await build_tree(db, fanout, levels)
+            assert len(await service.get_subtree(root_id, USER_ID)) == size
+            assert await naive_subtree(db, root_id) == size
+            cte_ms = await best_ms(partial(service.get_subtree, root_id, USER_ID))
+            naive_ms = await best_ms(partial(naive_subtree, db, root_id))
+            print(f"{name:<8}{size:>8}{cte_ms:>10.1f}{naive_ms:>10.1f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000))
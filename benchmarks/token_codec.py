@@ -0,0 +1,36 @@
+"""Compare JWT encode/decode throughput of the token codec backends.
+
+uv run python -m benchmarks.token_codec [iterations]
+"""
+
+import sys
+import time
+from time import perf_counter
+
+from src.auth.tokens import CODECS, SigningKeys
+
+
+def main(iterations: int) -> None:
+    keys = SigningKeys("benchmark-secret", {"k1": "benchmark-key"}, active_kid="k1")
+    claims = {"sub": "12345", "exp": int(time.time()) + 3600}
+    print(f"iterations: {iterations}")
+    print(f"{'backend':<10}{'encode ops/s':>16}{'decode ops/s':>16}")
+    for name, codec_class in CODECS.items():
+        codec = codec_class(keys)
+        token = codec.encode(claims)
+        codec.decode(token)  # warm up lazy imports and caches
+
+        start = perf_counter()
+        for _ in range(iterations):
+            codec.encode(claims)
+        encode_rate = iterations / (perf_counter() - start)
+
+        start = perf_counter()
+        for _ in range(iterations):
+            codec.decode(token)
+        decode_rate = iterations / (perf_counter() - start)
+        print(f"{name:<10}{encode_rate:16,.0f}{decode_rate:16,.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
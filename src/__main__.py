@@ -0,0 +1,5 @@
+from src.server import main
+
+# Worker processes are spawned and re-import this module as __mp_main__.
+if __name__ == "__main__":
+    main()
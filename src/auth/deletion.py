@@ -0,0 +1,127 @@
+"""Delete closed accounts.
+
+    uv run python -m src.auth.deletion 42
+
+``DELETE /auth/me`` only closes the account: its sessions are revoked, it can
+no longer log in, and a ``user.deleted`` message is queued in the outbox. An
+outbox worker then deletes the account's rows table by table with set-based
+``DELETE``s of ``DELETE_BATCH_SIZE`` rows, one transaction each, so however
+large the account, no transaction locks more than a batch and no rows are
+loaded into memory. The command above does the same in the foreground, e.g.
+for accounts closed while no worker ran. Deleting is idempotent: a purge cut
+short is finished by the outbox's retry.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from collections.abc import Sequence
+
+from sqlalchemy import ColumnElement, Table, delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth.models import User
+from src.core.cache import apply_pending_invalidations, invalidate_user
+from src.core.config import get_settings
+from src.core.database import (
+    Base,
+    delete_in_batches,
+    dispose_databases,
+    get_databases,
+)
+from src.core.idempotency import IdempotencyKey
+from src.core.metrics import metrics
+from src.core.sharding import UserDirectory, shard_map
+from src.outbox.models import OutboxMessage
+from src.outbox.service import OutboxEntry, register_handler
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+USER_DELETED = "user.deleted"
+
+
+def _owned_rows(table: Table, user_id: int) -> ColumnElement[bool] | None:
+    """WHERE clause selecting ``table``'s rows that belong to the user, or None."""
+    if "user_id" in table.c:
+        return table.c.user_id == user_id
+    # Child rows reached only through a foreign key, e.g. a todo's tags.
+    clauses = [
+        fk.parent.in_(select(fk.column).where(fk.column.table.c.user_id == user_id))
+        for fk in table.foreign_keys
+        if "user_id" in fk.column.table.c
+    ]
+    return or_(*clauses) if clauses else None
+
+
+def _owned_tables(user_id: int) -> list[tuple[Table, ColumnElement[bool]]]:
+    """Tables holding the user's rows, children before parents."""
+    return [
+        (table, where)
+        for table in reversed(Base.metadata.sorted_tables)
+        if not table.info.get("directory")
+        # Holds the message driving this purge; handled messages go anyway.
+        and table.name != OutboxMessage.__tablename__
+        and (where := _owned_rows(table, user_id)) is not None
+    ]
+
+
+async def purge_user(db: AsyncSession, user_id: int, batch_size: int) -> int:
+    """Delete the user and every row they own; return the number of rows."""
+    deleted = 0
+    for table, where in _owned_tables(user_id):
+        deleted += await delete_in_batches(db, table, where, batch_size=batch_size)
+    await db.execute(delete(User).where(User.id == user_id))
+    await db.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.scope == f"user:{user_id}")
+    )
+    if shard_map.is_sharded:
+        await db.execute(delete(UserDirectory).where(UserDirectory.user_id == user_id))
+    await invalidate_user(db, user_id)
+    await db.commit()
+    await apply_pending_invalidations(db)
+    metrics.incr("auth.users_deleted")
+    return deleted + 1
+
+
+async def handle_deleted_users(entries: Sequence[OutboxEntry]) -> None:
+    session_factory = get_databases().session_factory
+    for entry in entries:
+        user_id = json.loads(entry.payload)["id"]
+        async with session_factory(info={"shard": entry.shard}) as db:
+            rows = await purge_user(db, user_id, settings.DELETE_BATCH_SIZE)
+        logger.info("Deleted user %d (%d rows)", user_id, rows)
+
+
+register_handler([USER_DELETED], handle_deleted_users)
+
+
+async def run(user_id: int) -> None:
+    # Import the app so every model's table is known.
+    import src.main  # noqa: F401
+
+    databases = get_databases()
+    try:
+        async with databases.session_factory() as db:
+            shard = await shard_map.shard_for(db, user_id)
+        async with databases.session_factory(info={"shard": shard}) as db:
+            user = await db.get(User, user_id)
+            if user is None or user.deleted_at is None:
+                raise SystemExit(f"user {user_id} not found or not closed")
+            rows = await purge_user(db, user_id, settings.DELETE_BATCH_SIZE)
+        print(f"Deleted user {user_id} ({rows} rows)")
+    finally:
+        await dispose_databases()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("user_id", type=int)
+    args = parser.parse_args()
+    asyncio.run(run(args.user_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,61 @@
 from typing import Annotated
 
-from fastapi import Depends
+from fastapi import Depends, Response
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.auth.exceptions import InvalidTokenError, NotAuthenticatedError
-from src.auth.models import User
-from src.auth.service import AuthService, decode_access_token
+from src.auth.exceptions import NotAuthenticatedError, TokenRevokedError
+from src.auth.revocation import revocations
+from src.auth.schemas import CurrentUser
+from src.auth.service import decode_access_token
 from src.core.database import get_db
+from src.core.ratelimit import RateLimit, enforce_rate_limit
+from src.core.sharding import bind_session_user
+from src.core.timing import track_auth
 
 security = HTTPBearer(auto_error=False)
 
 
+def verify_access_token(token: str) -> CurrentUser:
+    user = decode_access_token(token)
+    if user.session_id is not None and user.session_id in revocations:
+        raise TokenRevokedError()
+    return user
+
+
 async def get_current_user(
     credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(security)],
     db: Annotated[AsyncSession, Depends(get_db)],
-) -> User:
+) -> CurrentUser:
+    """Authenticate from the access token alone; the user table is not read."""
     if credentials is None:
         raise NotAuthenticatedError()
 
-    user_id = decode_access_token(credentials.credentials)
-    user = await AuthService(db).get_user_by_id(user_id)
-
-    if user is None:
-        raise InvalidTokenError()
+    with track_auth():
+        user = verify_access_token(credentials.credentials)
+        await bind_session_user(db, user.id)
 
     return user
+
+
+async def get_stream_user(
+    credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(security)],
+) -> CurrentUser:
+    """``get_current_user`` for long-lived responses, which must not hold a session."""
+    if credentials is None:
+        raise NotAuthenticatedError()
+    return verify_access_token(credentials.credentials)
+
+
+class UserRateLimiter:
+    """Route dependency enforcing a per-user ``RateLimit``."""
+
+    def __init__(self, limit: RateLimit) -> None:
+        self.limit = limit
+
+    async def __call__(
+        self,
+        response: Response,
+        current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    ) -> None:
+        await enforce_rate_limit(self.limit, f"user:{current_user.id}", response)
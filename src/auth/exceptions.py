@@ -1,4 +1,4 @@
-from src.core.exceptions import ConflictError, UnauthorizedError
+from src.core.exceptions import ConflictError, TooManyRequestsError, UnauthorizedError
 
 
 class EmailExistsError(ConflictError):
@@ -11,11 +11,21 @@ class InvalidCredentialsError(UnauthorizedError):
     message = "Invalid credentials"
 
 
+class LoginThrottledError(TooManyRequestsError):
+    code = "LOGIN_THROTTLED"
+    message = "Too many failed login attempts, retry later"
+
+
 class TokenExpiredError(UnauthorizedError):
     code = "TOKEN_EXPIRED"
     message = "Token expired"
 
 
+class TokenRevokedError(UnauthorizedError):
+    code = "TOKEN_REVOKED"
+    message = "Token revoked"
+
+
 class InvalidTokenError(UnauthorizedError):
     code = "INVALID_TOKEN"
     message = "Invalid token"
@@ -1,28 +1,62 @@
 from datetime import UTC, datetime
 
-from sqlalchemy import DateTime, String
+from sqlalchemy import ForeignKey, String, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from src.core.database import Base
+from src.core.database import Base, UTCDateTime
 
 
 class User(Base):
     __tablename__ = "user"
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(primary_key=True)
     email: Mapped[str] = mapped_column(String(255), unique=True, index=True)
     hashed_password: Mapped[str] = mapped_column(String(255))
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        UTCDateTime,
         default=lambda: datetime.now(UTC),
+        server_default=func.now(),
     )
+    # Set when the account is closed; its rows are deleted in the background.
+    deleted_at: Mapped[datetime | None] = mapped_column(UTCDateTime, default=None)
 
-    # Relationships
+    # Relationships. Deleting a user leaves unloaded children to the
+    # database's ON DELETE CASCADE instead of loading them one by one; large
+    # accounts are emptied in batches first (see src.auth.deletion).
     todos: Mapped[list["Todo"]] = relationship(  # type: ignore[name-defined]  # noqa: F821
         back_populates="user",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     categories: Mapped[list["Category"]] = relationship(  # type: ignore[name-defined]  # noqa: F821
         back_populates="user",
         cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    refresh_tokens: Mapped[list["RefreshToken"]] = relationship(
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+
+class RefreshToken(Base):
+    """One refresh token of a login session (``family_id``).
+
+    Each refresh marks the presented token used and issues a new one in the
+    same family. Revoking the session stamps ``revoked_at`` on the family.
+    """
+
+    __tablename__ = "refresh_token"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("user.id", ondelete="CASCADE"), index=True
+    )
+    family_id: Mapped[str] = mapped_column(String(32), index=True)
+    token_hash: Mapped[str] = mapped_column(String(64), unique=True)
+    expires_at: Mapped[datetime] = mapped_column(UTCDateTime)
+    used_at: Mapped[datetime | None] = mapped_column(UTCDateTime, default=None)
+    revoked_at: Mapped[datetime | None] = mapped_column(
+        UTCDateTime, default=None, index=True
     )
@@ -0,0 +1,174 @@
+"""Password hashing with tunable cost.
+
+    uv run python -m src.auth.passwords --target-ms 250
+
+prints the bcrypt cost (and argon2id time cost, if installed) that takes
+about ``--target-ms`` per hash on this machine.
+"""
+
+import argparse
+import math
+import secrets
+from abc import ABC, abstractmethod
+from functools import cached_property
+from time import perf_counter
+from typing import Any
+
+import bcrypt
+
+from src.core.config import get_settings
+
+# Below this, bcrypt is too cheap to slow down offline guessing.
+MIN_BCRYPT_ROUNDS = 10
+
+
+class PasswordHasher(ABC):
+    @abstractmethod
+    def hash(self, password: str) -> str: ...
+
+    @abstractmethod
+    def verify(self, password: str, hashed: str) -> bool:
+        """Check ``password`` against a hash from any supported scheme."""
+
+    @abstractmethod
+    def needs_rehash(self, hashed: str) -> bool:
+        """Whether ``hashed`` uses another scheme or outdated parameters."""
+
+    @cached_property
+    def dummy_hash(self) -> str:
+        """A hash to verify against when there is no account, costing the same."""
+        return self.hash(secrets.token_urlsafe(16))
+
+
+def _is_bcrypt(hashed: str) -> bool:
+    return hashed.startswith(("$2a$", "$2b$", "$2y$"))
+
+
+def _verify_any(password: str, hashed: str) -> bool:
+    if _is_bcrypt(hashed):
+        return bcrypt.checkpw(password.encode(), hashed.encode())
+    if hashed.startswith("$argon2"):
+        from argon2 import PasswordHasher as Argon2
+        from argon2.exceptions import InvalidHashError, VerificationError
+
+        try:
+            verified: bool = Argon2().verify(hashed, password)
+        except (VerificationError, InvalidHashError):
+            return False
+        return verified
+    return False
+
+
+class BcryptHasher(PasswordHasher):
+    def __init__(self, rounds: int = 12) -> None:
+        self.rounds = rounds
+
+    def hash(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(self.rounds)).decode()
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return _verify_any(password, hashed)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        # "$2b$12$...": the cost is the second field.
+        return not _is_bcrypt(hashed) or hashed.split("$")[2] != f"{self.rounds:02d}"
+
+
+class Argon2Hasher(PasswordHasher):
+    """argon2id; needs the ``argon2`` extra."""
+
+    def __init__(
+        self, time_cost: int = 3, memory_cost: int = 65536, parallelism: int = 4
+    ) -> None:
+        from argon2 import PasswordHasher as Argon2
+
+        self._hasher: Any = Argon2(
+            time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism
+        )
+
+    def hash(self, password: str) -> str:
+        hashed: str = self._hasher.hash(password)
+        return hashed
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return _verify_any(password, hashed)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        if not hashed.startswith("$argon2id$"):
+            return True
+        stale: bool = self._hasher.check_needs_rehash(hashed)
+        return stale
+
+
+def build_password_hasher() -> PasswordHasher:
+    settings = get_settings()
+    if settings.PASSWORD_HASH_SCHEME == "argon2id":
+        return Argon2Hasher(
+            settings.ARGON2_TIME_COST,
+            settings.ARGON2_MEMORY_COST,
+            settings.ARGON2_PARALLELISM,
+        )
+    return BcryptHasher(settings.BCRYPT_ROUNDS)
+
+
+_hasher: PasswordHasher | None = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    global _hasher
+    if _hasher is None:
+        _hasher = build_password_hasher()
+    return _hasher
+
+
+def set_password_hasher(hasher: PasswordHasher | None) -> None:
+    global _hasher
+    _hasher = hasher
+
+
+def _time_hash(hasher: PasswordHasher, samples: int = 3) -> float:
+    """Best-of-``samples`` seconds per hash."""
+    best = math.inf
+    for _ in range(samples):
+        start = perf_counter()
+        hasher.hash("calibration-password")
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def calibrate_bcrypt(target_ms: float, probe_rounds: int = 10) -> int:
+    """Highest bcrypt cost whose hash takes at most ``target_ms`` here."""
+    # Each extra round doubles the work.
+    seconds = _time_hash(BcryptHasher(probe_rounds))
+    rounds = probe_rounds + math.floor(math.log2(target_ms / 1000 / seconds))
+    return max(4, min(31, rounds))
+
+
+def calibrate_argon2(target_ms: float, memory_cost: int, parallelism: int) -> int:
+    """Highest argon2id time cost within ``target_ms`` at the given memory."""
+    seconds = _time_hash(Argon2Hasher(1, memory_cost, parallelism))
+    # Time grows linearly with passes over memory.
+    return max(1, math.floor(target_ms / 1000 / seconds))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Calibrate password hash cost.")
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    args = parser.parse_args()
+    settings = get_settings()
+
+    rounds = calibrate_bcrypt(args.target_ms)
+    print(f"BCRYPT_ROUNDS={rounds}")
+    if rounds < MIN_BCRYPT_ROUNDS:
+        print(f"# warning: below the recommended minimum of {MIN_BCRYPT_ROUNDS}")
+    try:
+        time_cost = calibrate_argon2(
+            args.target_ms, settings.ARGON2_MEMORY_COST, settings.ARGON2_PARALLELISM
+        )
+    except ImportError:
+        return
+    print(f"ARGON2_TIME_COST={time_cost}")
+
+
+if __name__ == "__main__":
+    main()
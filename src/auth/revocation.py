@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+from datetime import UTC, datetime, timedelta
+from typing import cast
+
+from sqlalchemy import Table, func, or_, select
+
+from src.auth.models import RefreshToken
+from src.core.config import get_settings
+from src.core.database import delete_in_batches, get_databases
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationList:
+    """Sessions revoked recently enough that their access tokens still verify.
+
+    Access tokens are checked against this set instead of the database. An
+    entry can be dropped once every access token issued before the revocation
+    has expired, so the set stays as small as the logouts of one token
+    lifetime. Each worker reloads it from ``refresh_token`` periodically;
+    revocations made by this worker apply immediately.
+    """
+
+    def __init__(self, token_lifetime: float) -> None:
+        self.token_lifetime = token_lifetime
+        self._revoked_at: dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._revoked_at)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._revoked_at
+
+    def revoke(self, session_id: str, revoked_at: float | None = None) -> None:
+        self._revoked_at[session_id] = revoked_at or time.time()
+
+    def prune(self, now: float | None = None) -> None:
+        cutoff = (now or time.time()) - self.token_lifetime
+        self._revoked_at = {
+            sid: at for sid, at in self._revoked_at.items() if at > cutoff
+        }
+
+    async def sync(self) -> None:
+        """Load revocations from every shard, then drop expired entries."""
+        since = datetime.now(UTC) - timedelta(seconds=self.token_lifetime)
+        query = (
+            select(RefreshToken.family_id, func.max(RefreshToken.revoked_at))
+            .where(RefreshToken.revoked_at >= since)
+            .group_by(RefreshToken.family_id)
+        )
+        databases = get_databases()
+        for shard in range(len(databases.shards)):
+            async with databases.read_session_factory(info={"shard": shard}) as db:
+                for session_id, revoked_at in await db.execute(query):
+                    if revoked_at is not None:
+                        self.revoke(session_id, revoked_at.timestamp())
+        self.prune()
+
+    async def run(self, interval: float) -> None:
+        """Sync every ``interval`` seconds; the caller does the first sync."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sync()
+            except Exception:
+                # Keep serving with the current list; retry next interval.
+                logger.exception("Revocation list sync failed")
+
+
+revocations = RevocationList(get_settings().ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+metrics.register_gauge("auth.revoked_sessions", lambda: len(revocations))
+
+
+async def purge_expired_tokens(batch_size: int = 1000) -> int:
+    """Delete expired and long-revoked refresh tokens; return how many.
+
+    Revoked rows stay while ``sync`` still loads them, i.e. for one access
+    token lifetime.
+    """
+    now = datetime.now(UTC)
+    revoked_before = now - timedelta(seconds=revocations.token_lifetime)
+    purged = 0
+    databases = get_databases()
+    for shard in range(len(databases.shards)):
+        async with databases.session_factory(info={"shard": shard}) as db:
+            purged += await delete_in_batches(
+                db,
+                cast(Table, RefreshToken.__table__),
+                or_(
+                    RefreshToken.expires_at <= now,
+                    RefreshToken.revoked_at < revoked_before,
+                ),
+                batch_size=batch_size,
+            )
+            await db.commit()
+    return purged
+
+
+async def run_purge(interval: float) -> None:
+    """Purge refresh tokens every ``interval`` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await purge_expired_tokens()
+        except Exception:
+            logger.exception("Refresh token purge failed")
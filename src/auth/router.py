@@ -1,44 +1,112 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.auth.dependencies import get_current_user
+from src.auth.exceptions import InvalidTokenError
 from src.auth.models import User
-from src.auth.schemas import LoginRequest, TokenResponse, UserCreate, UserResponse
-from src.auth.service import AuthService, create_access_token
-from src.core.database import get_db
+from src.auth.schemas import (
+    CurrentUser,
+    LoginRequest,
+    RefreshRequest,
+    TokenResponse,
+    UserCreate,
+    UserResponse,
+)
+from src.auth.service import AuthService
+from src.core.database import get_db, get_read_db, read_only
+from src.core.idempotency import Idempotency
+from src.core.ratelimit import RateLimit, RateLimiter, client_ip
+from src.core.timing import track_auth
 
 router = APIRouter()
 
+# Login is deliberately slow (bcrypt), so throttle it per client IP.
+LOGIN_RATE_LIMIT = RateLimit.per_minute("auth-login", 10)
+REGISTER_RATE_LIMIT = RateLimit.per_minute("auth-register", 5)
+REFRESH_RATE_LIMIT = RateLimit.per_minute("auth-refresh", 30)
+
 
 @router.post(
     "/register",
     response_model=UserResponse,
     status_code=status.HTTP_201_CREATED,
-    responses={409: {"description": "Email already registered"}},
+    responses={
+        409: {
+            "description": "Email already registered, or request with this "
+            "Idempotency-Key in progress"
+        },
+        429: {"description": "Too many requests"},
+    },
+    dependencies=[Depends(RateLimiter(REGISTER_RATE_LIMIT))],
 )
 async def register(
     data: UserCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
-) -> User:
+    idempotency: Annotated[Idempotency, Depends()],
+) -> Response:
     """Register a new user."""
-    return await AuthService(db).create_user(data)
+
+    async def render() -> bytes:
+        user = await AuthService(db).create_user(data)
+        return UserResponse.model_validate(user).model_dump_json().encode()
+
+    # Replaying needs the same body, password included, so keys need not be
+    # scoped to a client.
+    return await idempotency.run(db, "anonymous", render, status.HTTP_201_CREATED)
 
 
 @router.post(
     "/login",
     response_model=TokenResponse,
-    responses={401: {"description": "Invalid credentials"}},
+    responses={
+        401: {"description": "Invalid credentials"},
+        429: {"description": "Too many requests"},
+    },
+    dependencies=[Depends(RateLimiter(LOGIN_RATE_LIMIT))],
 )
 async def login(
+    request: Request,
     data: LoginRequest,
     db: Annotated[AsyncSession, Depends(get_db)],
 ) -> TokenResponse:
-    """Authenticate and get access token."""
-    user = await AuthService(db).authenticate(data.email, data.password)
-    token = create_access_token(user.id)
-    return TokenResponse(access_token=token)
+    """Authenticate and get access and refresh tokens."""
+    with track_auth():
+        service = AuthService(db)
+        user = await service.authenticate(data.email, data.password, client_ip(request))
+        return await service.start_session(user.id)
+
+
+@router.post(
+    "/refresh",
+    response_model=TokenResponse,
+    responses={
+        401: {"description": "Invalid, expired or revoked refresh token"},
+        429: {"description": "Too many requests"},
+    },
+    dependencies=[Depends(RateLimiter(REFRESH_RATE_LIMIT))],
+)
+async def refresh(
+    data: RefreshRequest,
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> TokenResponse:
+    """Exchange a refresh token for a new access and refresh token."""
+    with track_auth():
+        return await AuthService(db).refresh(data.refresh_token)
+
+
+@router.post(
+    "/logout",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={401: {"description": "Invalid refresh token"}},
+)
+async def logout(
+    data: RefreshRequest,
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> None:
+    """Revoke the session's refresh and access tokens."""
+    await AuthService(db).logout(data.refresh_token)
 
 
 @router.get(
@@ -46,8 +114,30 @@ async def login(
     response_model=UserResponse,
     responses={401: {"description": "Not authenticated"}},
 )
+@read_only
 async def get_me(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
 ) -> User:
     """Get current authenticated user."""
-    return current_user
+    user = await AuthService(db).get_user_by_id(current_user.id)
+    if user is None:
+        raise InvalidTokenError()
+    return user
+
+
+@router.delete(
+    "/me",
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={401: {"description": "Not authenticated"}},
+)
+async def delete_me(
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> None:
+    """Delete the current user's account and all of its data.
+
+    Sessions end and logins fail at once; the data is deleted in the
+    background.
+    """
+    await AuthService(db).close_account(current_user.id)
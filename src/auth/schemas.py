@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from datetime import datetime
 
 from pydantic import EmailStr, Field
@@ -23,4 +24,19 @@ class LoginRequest(BaseSchema):
 
 class TokenResponse(BaseSchema):
     access_token: str
+    refresh_token: str
     token_type: str = "bearer"
+    expires_in: int
+
+
+class RefreshRequest(BaseSchema):
+    refresh_token: str
+
+
+@dataclass(frozen=True, slots=True)
+class CurrentUser:
+    """The authenticated user, from access-token claims alone."""
+
+    id: int
+    session_id: str | None = None
+    expires_at: float | None = None  # the token's exp, as a Unix time
@@ -1,51 +1,71 @@
+import hashlib
+import secrets
+import time
 from datetime import UTC, datetime, timedelta
+from functools import partial
+from typing import Any
 
-import bcrypt
-from jose import JWTError, jwt
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.auth.deletion import USER_DELETED
 from src.auth.exceptions import (
     EmailExistsError,
     InvalidCredentialsError,
     InvalidTokenError,
     TokenExpiredError,
+    TokenRevokedError,
 )
-from src.auth.models import User
-from src.auth.schemas import UserCreate
+from src.auth.models import RefreshToken, User
+from src.auth.passwords import get_password_hasher
+from src.auth.revocation import revocations
+from src.auth.schemas import CurrentUser, TokenResponse, UserCreate
+from src.auth.throttle import login_throttle
+from src.auth.tokens import get_token_codec
 from src.core.config import get_settings
+from src.core.database import on_rollback
+from src.core.sharding import bind_session_user, shard_map
+from src.events.schemas import Event
+from src.outbox.service import enqueue
 
 settings = get_settings()
 
-ALGORITHM = "HS256"
-
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    return get_password_hasher().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+    return get_password_hasher().verify(plain_password, hashed_password)
 
 
-def create_access_token(user_id: int) -> str:
-    expire = datetime.now(UTC) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode = {"sub": str(user_id), "exp": expire}
-    token: str = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
-    return token
+def create_access_token(user_id: int, session_id: str | None = None) -> str:
+    now = int(time.time())
+    claims: dict[str, Any] = {
+        "sub": str(user_id),
+        "iat": now,
+        "exp": now + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+    if session_id is not None:
+        claims["sid"] = session_id
+    return get_token_codec().encode(claims)
 
 
-def decode_access_token(token: str) -> int:
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise InvalidTokenError()
-        return int(user_id)
-    except jwt.ExpiredSignatureError:
-        raise TokenExpiredError() from None
-    except JWTError:
-        raise InvalidTokenError() from None
+def decode_access_token(token: str) -> CurrentUser:
+    claims = get_token_codec().decode(token)
+    user_id = claims.get("sub")
+    session_id = claims.get("sid")
+    if not isinstance(user_id, str) or not user_id.isdigit():
+        raise InvalidTokenError()
+    if session_id is not None and not isinstance(session_id, str):
+        raise InvalidTokenError()
+    # The codec has checked that exp, if present, is a number in the future.
+    expires_at = claims.get("exp")
+    return CurrentUser(id=int(user_id), session_id=session_id, expires_at=expires_at)
+
+
+def _hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
 
 
 class AuthService:
@@ -53,6 +73,11 @@ class AuthService:
         self.db = db
 
     async def get_user_by_email(self, email: str) -> User | None:
+        if shard_map.is_sharded:
+            user_id = await shard_map.lookup_email(self.db, email)
+            if user_id is None:
+                return None
+            await bind_session_user(self.db, user_id)
         result = await self.db.execute(select(User).where(User.email == email))
         return result.scalar_one_or_none()
 
@@ -69,15 +94,132 @@ class AuthService:
             email=data.email,
             hashed_password=hash_password(data.password),
         )
+        if shard_map.is_sharded:
+            user_id = await shard_map.register(data.email)
+            if user_id is None:
+                raise EmailExistsError()
+            on_rollback(self.db, partial(shard_map.unregister, user_id))
+            user.id = user_id
+            await bind_session_user(self.db, user.id)
         self.db.add(user)
         await self.db.flush()
-        await self.db.refresh(user)
+        # A login attempted before registering must not stick as a failure.
+        await login_throttle.forget_password(data.email, data.password)
         return user
 
-    async def authenticate(self, email: str, password: str) -> User:
+    async def authenticate(
+        self, email: str, password: str, client_ip: str | None = None
+    ) -> User:
+        await login_throttle.check(email, password, client_ip)
         user = await self.get_user_by_email(email)
-        if not user:
-            raise InvalidCredentialsError()
-        if not verify_password(password, user.hashed_password):
+        if user is None:
+            # Spend a full verify anyway, so response time doesn't reveal
+            # which emails are registered.
+            verify_password(password, get_password_hasher().dummy_hash)
+        if (
+            user is None
+            or user.deleted_at is not None
+            or not verify_password(password, user.hashed_password)
+        ):
+            await login_throttle.record_failure(email, password, client_ip)
             raise InvalidCredentialsError()
+        await login_throttle.record_success(email)
+        if get_password_hasher().needs_rehash(user.hashed_password):
+            # Only now do we have the plaintext to upgrade the stored hash.
+            user.hashed_password = hash_password(password)
         return user
+
+    async def start_session(self, user_id: int) -> TokenResponse:
+        return await self._issue_tokens(user_id, secrets.token_hex(16))
+
+    async def _issue_tokens(self, user_id: int, session_id: str) -> TokenResponse:
+        # The user id prefix routes the refresh to the user's shard.
+        refresh_token = f"{user_id}.{secrets.token_urlsafe(32)}"
+        self.db.add(
+            RefreshToken(
+                user_id=user_id,
+                family_id=session_id,
+                token_hash=_hash_refresh_token(refresh_token),
+                expires_at=datetime.now(UTC)
+                + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+            )
+        )
+        await self.db.flush()
+        return TokenResponse(
+            access_token=create_access_token(user_id, session_id),
+            refresh_token=refresh_token,
+            expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        )
+
+    async def _get_refresh_token(self, token: str) -> RefreshToken:
+        user_id, _, _ = token.partition(".")
+        if not user_id.isdigit():
+            raise InvalidTokenError()
+        await bind_session_user(self.db, int(user_id))
+        result = await self.db.execute(
+            select(RefreshToken).where(
+                RefreshToken.token_hash == _hash_refresh_token(token)
+            )
+        )
+        row = result.scalar_one_or_none()
+        if row is None or row.user_id != int(user_id):
+            raise InvalidTokenError()
+        return row
+
+    async def _revoke_session(self, session_id: str) -> None:
+        now = datetime.now(UTC)
+        await self.db.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.family_id == session_id,
+                RefreshToken.revoked_at.is_(None),
+            )
+            .values(revoked_at=now)
+        )
+        revocations.revoke(session_id, now.timestamp())
+
+    async def refresh(self, token: str) -> TokenResponse:
+        """Rotate ``token``: mark it used and issue a new pair."""
+        row = await self._get_refresh_token(token)
+        if row.revoked_at is not None:
+            raise TokenRevokedError()
+        if row.expires_at <= datetime.now(UTC):
+            raise TokenExpiredError()
+        # Conditional, so of two concurrent refreshes only one wins.
+        result = await self.db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.id == row.id, RefreshToken.used_at.is_(None))
+            .values(used_at=datetime.now(UTC))
+        )
+        if result.rowcount != 1:  # type: ignore[attr-defined]
+            # A rotated token came back: it leaked, so end the whole session.
+            # Commit now; the error below would roll the revocation back.
+            await self._revoke_session(row.family_id)
+            await self.db.commit()
+            raise TokenRevokedError()
+        return await self._issue_tokens(row.user_id, row.family_id)
+
+    async def logout(self, token: str) -> None:
+        row = await self._get_refresh_token(token)
+        await self._revoke_session(row.family_id)
+
+    async def close_account(self, user_id: int) -> None:
+        """End every session and queue the account's rows for deletion."""
+        now = datetime.now(UTC)
+        result = await self.db.execute(
+            update(User)
+            .where(User.id == user_id, User.deleted_at.is_(None))
+            .values(deleted_at=now)
+        )
+        if result.rowcount != 1:  # type: ignore[attr-defined]
+            # Already closed; the purge is queued.
+            return
+        sessions = await self.db.scalars(
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=now)
+            .returning(RefreshToken.family_id)
+        )
+        for session_id in set(sessions):
+            revocations.revoke(session_id, now.timestamp())
+        enqueue(self.db, Event.deleted(user_id, USER_DELETED, user_id))
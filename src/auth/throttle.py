@@ -0,0 +1,141 @@
+import hashlib
+import hmac
+import time
+from dataclasses import dataclass
+
+from src.auth.exceptions import InvalidCredentialsError, LoginThrottledError
+from src.core.cache import get_cache
+from src.core.config import get_settings
+from src.core.metrics import metrics
+
+
+@dataclass(frozen=True, slots=True)
+class Failures:
+    count: int
+    last_at: float
+
+
+class LoginThrottle:
+    """Slow down password guessing before it costs a password verify.
+
+    Failed logins are counted per account and per client IP. Past a free
+    allowance, each further attempt must wait an exponentially growing delay
+    after the last failure. Exact (email, password) pairs that just failed are
+    remembered for a short while and rejected outright, so a replayed
+    credential list costs no hashing.
+
+    The counters are kept per worker, in this object rather than the
+    evictable cache, so a flood of negative-cache entries can't wipe them.
+    Each worker counts only the attempts it serves: with N workers, a client
+    spread over all of them gets up to N times the free allowance before
+    backing off. The negative cache is the per-worker response cache too.
+    """
+
+    def __init__(
+        self,
+        account_free_failures: int,
+        ip_free_failures: int,
+        backoff_base: float,
+        backoff_max: float,
+        failure_window: float,
+        negative_ttl: float,
+        secret: str,
+        max_keys: int = 100_000,
+    ) -> None:
+        self.free = {"account": account_free_failures, "ip": ip_free_failures}
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_window = failure_window
+        self.negative_ttl = negative_ttl
+        self._secret = secret.encode()
+        self.max_keys = max_keys
+        self._failures: dict[str, Failures] = {}
+
+    def _keys(self, email: str, ip: str | None) -> dict[str, str]:
+        keys = {"account": f"login:fail:account:{email.lower()}"}
+        if ip is not None:
+            keys["ip"] = f"login:fail:ip:{ip}"
+        return keys
+
+    def _negative_key(self, email: str, password: str) -> str:
+        # Keyed digest, so the cache never holds a fast hash of a password.
+        digest = hmac.digest(
+            self._secret, f"{email.lower()}\0{password}".encode(), hashlib.sha256
+        )
+        return f"login:neg:{digest.hex()}"
+
+    def backoff(self, failures: int, free: int) -> float:
+        if failures < free:
+            return 0.0
+        return min(self.backoff_max, self.backoff_base * 2.0 ** (failures - free))
+
+    def _get_failures(self, key: str, now: float) -> Failures | None:
+        failures = self._failures.get(key)
+        if failures is not None and failures.last_at + self.failure_window <= now:
+            del self._failures[key]
+            return None
+        return failures
+
+    def _evict(self, now: float) -> None:
+        cutoff = now - self.failure_window
+        for key in [k for k, f in self._failures.items() if f.last_at <= cutoff]:
+            del self._failures[key]
+        while len(self._failures) > self.max_keys:
+            del self._failures[next(iter(self._failures))]
+
+    def clear(self) -> None:
+        self._failures.clear()
+
+    async def check(self, email: str, password: str, ip: str | None) -> None:
+        """Reject attempts made during a backoff or repeating a failed one."""
+        now = time.time()
+        for scope, key in self._keys(email, ip).items():
+            failures = self._get_failures(key, now)
+            if failures is None:
+                continue
+            wait = failures.last_at + self.backoff(failures.count, self.free[scope])
+            if wait > now:
+                metrics.incr(f"auth.login.throttled.{scope}")
+                raise LoginThrottledError(
+                    headers={"Retry-After": str(max(1, round(wait - now)))}
+                )
+        if await get_cache().get(self._negative_key(email, password)):
+            metrics.incr("auth.login.negative_cache_hit")
+            raise InvalidCredentialsError()
+
+    async def record_failure(self, email: str, password: str, ip: str | None) -> None:
+        now = time.time()
+        for key in self._keys(email, ip).values():
+            failures = self._get_failures(key, now)
+            count = 1 if failures is None else failures.count + 1
+            # Re-inserted, so the dict stays ordered by last failure.
+            self._failures.pop(key, None)
+            self._failures[key] = Failures(count, now)
+        if len(self._failures) > self.max_keys:
+            self._evict(now)
+        await get_cache().set(
+            self._negative_key(email, password), True, ttl=self.negative_ttl
+        )
+
+    async def record_success(self, email: str) -> None:
+        self._failures.pop(self._keys(email, None)["account"], None)
+
+    async def forget_password(self, email: str, password: str) -> None:
+        """Drop a remembered failure, e.g. once the account is registered."""
+        await get_cache().delete(self._negative_key(email, password))
+
+
+def build_login_throttle() -> LoginThrottle:
+    settings = get_settings()
+    return LoginThrottle(
+        account_free_failures=settings.LOGIN_ACCOUNT_FREE_FAILURES,
+        ip_free_failures=settings.LOGIN_IP_FREE_FAILURES,
+        backoff_base=settings.LOGIN_BACKOFF_BASE_SECONDS,
+        backoff_max=settings.LOGIN_BACKOFF_MAX_SECONDS,
+        failure_window=settings.LOGIN_FAILURE_WINDOW_SECONDS,
+        negative_ttl=settings.LOGIN_NEGATIVE_CACHE_SECONDS,
+        secret=settings.SECRET_KEY,
+    )
+
+
+login_throttle = build_login_throttle()
@@ -0,0 +1,182 @@
+import base64
+import hashlib
+import hmac
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
+from typing import Any
+
+from pydantic_core import from_json, to_json
+
+from src.auth.exceptions import InvalidTokenError, TokenExpiredError
+from src.core.config import get_settings
+
+ALGORITHM = "HS256"
+
+
+class SigningKeys:
+    """HMAC secrets by key id; new tokens are signed with ``active_kid``.
+
+    Rotate by adding a key, making it active, and dropping the old one once
+    every token signed with it has expired. Tokens without a ``kid`` header
+    (issued before rotation was configured) verify against ``default``.
+    """
+
+    def __init__(
+        self,
+        default: str,
+        keys: Mapping[str, str] | None = None,
+        active_kid: str | None = None,
+    ) -> None:
+        self.keys = {kid: secret.encode() for kid, secret in (keys or {}).items()}
+        self.default = default.encode()
+        if active_kid is not None and active_kid not in self.keys:
+            raise ValueError(f"active key id {active_kid!r} is not configured")
+        self.active_kid = active_kid
+
+    @property
+    def active(self) -> bytes:
+        return self.default if self.active_kid is None else self.keys[self.active_kid]
+
+    def get(self, kid: str | None) -> bytes:
+        if kid is None:
+            return self.default
+        try:
+            return self.keys[kid]
+        except KeyError:
+            raise InvalidTokenError() from None
+
+
+class TokenCodec(ABC):
+    """Sign and verify HS256 JWTs.
+
+    ``decode`` raises ``InvalidTokenError`` or ``TokenExpiredError``.
+    """
+
+    def __init__(self, keys: SigningKeys) -> None:
+        self.keys = keys
+
+    @abstractmethod
+    def encode(self, claims: dict[str, Any]) -> str: ...
+
+    @abstractmethod
+    def decode(self, token: str) -> dict[str, Any]: ...
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class HS256Codec(TokenCodec):
+    """HS256 on the standard library, with pydantic-core's JSON codec."""
+
+    def __init__(self, keys: SigningKeys) -> None:
+        super().__init__(keys)
+        header: dict[str, str] = {"alg": ALGORITHM, "typ": "JWT"}
+        if keys.active_kid is not None:
+            header["kid"] = keys.active_kid
+        self._header = _b64encode(to_json(header))
+        # Header segment -> key; issued tokens share a handful of headers.
+        self._header_keys: dict[str, bytes] = {}
+
+    def encode(self, claims: dict[str, Any]) -> str:
+        signing_input = self._header + b"." + _b64encode(to_json(claims))
+        signature = hmac.digest(self.keys.active, signing_input, hashlib.sha256)
+        return (signing_input + b"." + _b64encode(signature)).decode()
+
+    def _key_for(self, header_segment: str) -> bytes:
+        key = self._header_keys.get(header_segment)
+        if key is None:
+            header = from_json(_b64decode(header_segment))
+            if not isinstance(header, dict) or header.get("alg") != ALGORITHM:
+                raise InvalidTokenError()
+            key = self.keys.get(header.get("kid"))
+            if len(self._header_keys) < 64:
+                self._header_keys[header_segment] = key
+        return key
+
+    def decode(self, token: str) -> dict[str, Any]:
+        try:
+            header_segment, payload_segment, signature_segment = token.split(".")
+            key = self._key_for(header_segment)
+            signature = _b64decode(signature_segment)
+            payload = _b64decode(payload_segment)
+        except (ValueError, TypeError):
+            # Wrong segment count, bad base64 or bad header JSON.
+            raise InvalidTokenError() from None
+        signing_input = f"{header_segment}.{payload_segment}".encode()
+        expected = hmac.digest(key, signing_input, hashlib.sha256)
+        if not hmac.compare_digest(signature, expected):
+            raise InvalidTokenError()
+        try:
+            claims = from_json(payload)
+        except ValueError:
+            raise InvalidTokenError() from None
+        if not isinstance(claims, dict):
+            raise InvalidTokenError()
+        now = time.time()
+        exp = claims.get("exp")
+        if exp is not None:
+            if not isinstance(exp, int | float):
+                raise InvalidTokenError()
+            if exp <= now:
+                raise TokenExpiredError()
+        nbf = claims.get("nbf")
+        if nbf is not None and (not isinstance(nbf, int | float) or nbf > now):
+            raise InvalidTokenError()
+        return claims
+
+
+class JoseCodec(TokenCodec):
+    """python-jose backend, for compatibility; needs the ``jose`` extra."""
+
+    def encode(self, claims: dict[str, Any]) -> str:
+        from jose import jwt
+
+        headers = {"kid": self.keys.active_kid} if self.keys.active_kid else None
+        token: str = jwt.encode(
+            claims, self.keys.active.decode(), algorithm=ALGORITHM, headers=headers
+        )
+        return token
+
+    def decode(self, token: str) -> dict[str, Any]:
+        from jose import JWTError, jwt
+
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+            claims: dict[str, Any] = jwt.decode(
+                token, self.keys.get(kid).decode(), algorithms=[ALGORITHM]
+            )
+        except jwt.ExpiredSignatureError:
+            raise TokenExpiredError() from None
+        except JWTError:
+            raise InvalidTokenError() from None
+        return claims
+
+
+CODECS: dict[str, type[TokenCodec]] = {"hs256": HS256Codec, "jose": JoseCodec}
+
+
+def build_token_codec() -> TokenCodec:
+    settings = get_settings()
+    keys = SigningKeys(settings.SECRET_KEY, settings.JWT_KEYS, settings.JWT_ACTIVE_KID)
+    return CODECS[settings.JWT_BACKEND](keys)
+
+
+_codec: TokenCodec | None = None
+
+
+def get_token_codec() -> TokenCodec:
+    global _codec
+    if _codec is None:
+        _codec = build_token_codec()
+    return _codec
+
+
+def set_token_codec(codec: TokenCodec | None) -> None:
+    global _codec
+    _codec = codec
@@ -1,9 +1,9 @@
 from datetime import UTC, datetime
 
-from sqlalchemy import DateTime, ForeignKey, String, UniqueConstraint
+from sqlalchemy import ForeignKey, String, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from src.core.database import Base
+from src.core.database import Base, UTCDateTime
 
 
 class Category(Base):
@@ -11,17 +11,24 @@ class Category(Base):
     __table_args__ = (
         UniqueConstraint("user_id", "name", name="uq_category_user_name"),
     )
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("user.id"), index=True)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("user.id", ondelete="CASCADE"), index=True
+    )
     name: Mapped[str] = mapped_column(String(100))
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        UTCDateTime,
         default=lambda: datetime.now(UTC),
+        server_default=func.now(),
     )
 
     # Relationships
     user: Mapped["User"] = relationship(back_populates="categories")  # type: ignore[name-defined]  # noqa: F821
+    # Deleting a category leaves its todos to ON DELETE SET NULL rather than
+    # loading them; CategoryService.delete un-files them with one UPDATE first.
     todos: Mapped[list["Todo"]] = relationship(  # type: ignore[name-defined]  # noqa: F821
         back_populates="category",
+        passive_deletes=True,
     )
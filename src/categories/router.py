@@ -1,44 +1,71 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, Response, status
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.auth.dependencies import get_current_user
-from src.auth.models import User
-from src.categories.dependencies import get_category_or_404
+from src.auth.schemas import CurrentUser
 from src.categories.models import Category
 from src.categories.schemas import CategoryCreate, CategoryResponse, CategoryUpdate
 from src.categories.service import CategoryService
-from src.core.database import get_db
+from src.core.database import get_db, get_read_db, read_only
+from src.core.idempotency import Idempotency
+from src.core.response_cache import cached_json_response
 
 router = APIRouter()
 
+category_list_adapter = TypeAdapter(list[CategoryResponse])
+
 
 @router.get(
     "",
     response_model=list[CategoryResponse],
 )
+@read_only
 async def list_categories(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
-) -> list[Category]:
+    request: Request,
+    response: Response,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+) -> Response:
     """List all categories for the current user."""
-    return await CategoryService(db).list_by_user(current_user.id)
+
+    async def render() -> bytes:
+        categories = await CategoryService(db).list_by_user(current_user.id)
+        return category_list_adapter.dump_json(
+            [CategoryResponse.model_validate(c) for c in categories]
+        )
+
+    return await cached_json_response(request, response, current_user.id, render)
 
 
 @router.post(
     "",
     response_model=CategoryResponse,
     status_code=status.HTTP_201_CREATED,
-    responses={409: {"description": "Category already exists"}},
+    responses={
+        409: {
+            "description": "Category already exists, or request with this "
+            "Idempotency-Key in progress"
+        }
+    },
 )
 async def create_category(
     data: CategoryCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
-) -> Category:
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    idempotency: Annotated[Idempotency, Depends()],
+) -> Response:
     """Create a new category."""
-    return await CategoryService(db).create(data, current_user.id)
+
+    async def render() -> bytes:
+        category = await CategoryService(db).create(data, current_user.id)
+        return CategoryResponse.model_validate(category).model_dump_json().encode()
+
+    return await idempotency.run(
+        db, f"user:{current_user.id}", render, status.HTTP_201_CREATED
+    )
 
 
 @router.get(
@@ -46,11 +73,23 @@ async def create_category(
     response_model=CategoryResponse,
     responses={404: {"description": "Category not found"}},
 )
+@read_only
 async def get_category(
-    category: Annotated[Category, Depends(get_category_or_404)],
-) -> Category:
+    category_id: int,
+    request: Request,
+    response: Response,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+) -> Response:
     """Get a category by ID."""
-    return category
+
+    async def render() -> bytes:
+        category = await CategoryService(db).get_by_id_or_404(
+            category_id, current_user.id
+        )
+        return CategoryResponse.model_validate(category).model_dump_json().encode()
+
+    return await cached_json_response(request, response, current_user.id, render)
 
 
 @router.patch(
@@ -65,7 +104,7 @@ async def update_category(
     category_id: int,
     data: CategoryUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
 ) -> Category:
     """Update a category."""
     return await CategoryService(db).update(category_id, data, current_user.id)
@@ -79,7 +118,7 @@ async def update_category(
 async def delete_category(
     category_id: int,
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
 ) -> None:
     """Delete a category."""
     await CategoryService(db).delete(category_id, current_user.id)
@@ -1,10 +1,15 @@
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.categories.exceptions import CategoryExistsError, CategoryNotFoundError
 from src.categories.models import Category
-from src.categories.schemas import CategoryCreate, CategoryUpdate
+from src.categories.schemas import CategoryCreate, CategoryResponse, CategoryUpdate
+from src.core.cache import invalidate_user
+from src.events.hub import publish_on_commit
+from src.events.schemas import Event
+from src.outbox.service import enqueue
+from src.todos.models import Todo, TodoArchive
 
 
 class CategoryService:
@@ -28,9 +33,7 @@ class CategoryService:
 
     async def list_by_user(self, user_id: int) -> list[Category]:
         result = await self.db.execute(
-            select(Category)
-            .where(Category.user_id == user_id)
-            .order_by(Category.name)
+            select(Category).where(Category.user_id == user_id).order_by(Category.name)
         )
         return list(result.scalars().all())
 
@@ -45,7 +48,8 @@ class CategoryService:
         except IntegrityError:
             await self.db.rollback()
             raise CategoryExistsError() from None
-        await self.db.refresh(category)
+        await invalidate_user(self.db, user_id)
+        self._after_write(category, "category.created")
         return category
 
     async def update(
@@ -61,10 +65,32 @@ class CategoryService:
         except IntegrityError:
             await self.db.rollback()
             raise CategoryExistsError() from None
-        await self.db.refresh(category)
+        await invalidate_user(self.db, user_id)
+        self._after_write(category, "category.updated")
         return category
 
     async def delete(self, category_id: int, user_id: int) -> None:
         category = await self.get_by_id_or_404(category_id, user_id)
+        # Un-file the todos with set-based UPDATEs rather than loading them:
+        # one statement per table, not bounded chunks committed one by one,
+        # since a chunk committed before a later failure would leave the
+        # category half deleted. A large category costs a longer transaction.
+        for model in (Todo, TodoArchive):
+            await self.db.execute(
+                update(model)
+                .where(model.category_id == category_id)
+                .values(category_id=None)
+                .execution_options(synchronize_session=False)
+            )
         await self.db.delete(category)
         await self.db.flush()
+        await invalidate_user(self.db, user_id)
+        self._publish(Event.deleted(user_id, "category.deleted", category_id))
+
+    def _after_write(self, category: Category, event_type: str) -> None:
+        snapshot = CategoryResponse.model_validate(category)
+        self._publish(Event.of(category.user_id, event_type, snapshot))
+
+    def _publish(self, event: Event) -> None:
+        publish_on_commit(self.db, event)
+        enqueue(self.db, event)
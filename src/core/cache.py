@@ -0,0 +1,148 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import get_settings
+from src.core.metrics import metrics
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Any | None: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float | None = None) -> None: ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        """Atomically increment an integer counter, starting from 0."""
+
+
+class InMemoryCache(CacheBackend):
+    """Per-process LRU cache bounded by entry count.
+
+    Values are returned as stored, so callers must only cache immutable
+    snapshots. Operations never await, so no locking is needed. Counters are
+    kept outside the LRU: evicting a revision would reset it and resurrect
+    entries cached under an old value.
+    """
+
+    def __init__(self, max_entries: int = 10_000) -> None:
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[Any, float | None]] = OrderedDict()
+        self._counters: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    async def get(self, key: str) -> Any | None:
+        if key in self._counters:
+            return self._counters[key]
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            metrics.incr("cache.evictions")
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+        self._counters.pop(key, None)
+
+    async def incr(self, key: str) -> int:
+        value = self._counters.get(key, 0) + 1
+        self._counters[key] = value
+        return value
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._counters.clear()
+
+
+# Created on first use, so importing doesn't read the settings.
+_cache: CacheBackend | None = None
+
+
+def get_cache() -> CacheBackend:
+    global _cache
+    if _cache is None:
+        _cache = InMemoryCache(get_settings().CACHE_MAX_ENTRIES)
+    return _cache
+
+
+def set_cache(cache: CacheBackend) -> None:
+    global _cache
+    _cache = cache
+
+
+async def cached(namespace: str, key: str) -> Any | None:
+    """Look up ``key`` and count a hit or miss for ``namespace``."""
+    value = await get_cache().get(key)
+    metrics.incr(f"cache.{namespace}.{'miss' if value is None else 'hit'}")
+    return value
+
+
+# Per-user revisions. Cache keys embed the user's current revision, so bumping
+# it invalidates every cached result for that user at once; stale entries are
+# never read again and age out of the LRU. Revisions are per process, so
+# committed invalidations are also relayed to the other workers (see
+# ``set_invalidation_relay``); CACHE_TTL_SECONDS bounds any they miss.
+
+_relay: Callable[[int], None] | None = None
+
+
+def set_invalidation_relay(relay: Callable[[int], None] | None) -> None:
+    """Install how committed invalidations reach the other worker processes."""
+    global _relay
+    _relay = relay
+
+
+def _revision_key(user_id: int) -> str:
+    return f"rev:user:{user_id}"
+
+
+async def get_user_revision(user_id: int) -> int:
+    return int(await get_cache().get(_revision_key(user_id)) or 0)
+
+
+async def invalidate_user(db: AsyncSession, user_id: int) -> None:
+    """Invalidate cached results for ``user_id`` after a write through ``db``.
+
+    The revision is bumped immediately, so later reads in this process miss,
+    and again once ``db`` commits (see ``get_db``): a concurrent read that
+    repopulated the cache from pre-commit data must not outlive the commit.
+    Only the commit is relayed to other workers, which never see the write
+    before it.
+    """
+    await get_cache().incr(_revision_key(user_id))
+    db.info.setdefault("invalidate_users", set()).add(user_id)
+
+
+async def apply_pending_invalidations(db: AsyncSession) -> None:
+    for user_id in db.info.pop("invalidate_users", ()):
+        await get_cache().incr(_revision_key(user_id))
+        if _relay is not None:
+            _relay(user_id)
+
+
+async def apply_relayed_invalidation(user_id: int) -> None:
+    """Retire this worker's cached results after another worker's commit."""
+    await get_cache().incr(_revision_key(user_id))
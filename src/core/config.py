@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -11,14 +12,146 @@ class Settings(BaseSettings):
     )
 
     DATABASE_URL: str = "sqlite+aiosqlite:///./app.db"
+    DB_POOL_SIZE: int = 10  # PostgreSQL only
+    DB_MAX_OVERFLOW: int = 10  # PostgreSQL only
+    DB_POOL_WARMUP: int = 2  # connections opened per engine at startup
+    DATABASE_REPLICA_URL: str | None = None  # serves routes marked @read_only
+    REPLICA_STICKINESS_SECONDS: float = 5.0  # reads stay on primary after a write
+    # When set, user data is sharded across these databases by user_id and
+    # DATABASE_URL holds only the user directory. Replicas are not used.
+    DATABASE_SHARD_URLS: list[str] = []
+    SHARD_CACHE_TTL_SECONDS: float = 60.0
     SECRET_KEY: str
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440  # 24 hours
+    # Password hashing; pick costs with `python -m src.auth.passwords`.
+    # Hashes with other settings are upgraded on the user's next login.
+    PASSWORD_HASH_SCHEME: Literal["bcrypt", "argon2id"] = "bcrypt"
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 3  # argon2id needs the argon2 extra
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 4
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15  # stateless, so keep short
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    REVOCATION_SYNC_SECONDS: float = 10.0  # how often workers reload revocations
+    REFRESH_TOKEN_PURGE_SECONDS: float = 3600.0  # expired/revoked rows deleted
+    JWT_BACKEND: Literal["hs256", "jose"] = "hs256"  # jose needs the jose extra
+    # Key rotation: signing keys by "kid". Without JWT_ACTIVE_KID, tokens are
+    # signed with SECRET_KEY and carry no kid.
+    JWT_KEYS: dict[str, str] = {}
+    JWT_ACTIVE_KID: str | None = None
     ENV: str = "development"
 
+    # Serving (python -m src)
+    HOST: str = "127.0.0.1"
+    PORT: int = 8000
+    WORKERS: int | None = None  # defaults to the number of usable CPUs
+    WORKER_MAX_REQUESTS: int | None = None  # recycle a worker after this many
+
+    # Logging
+    SQL_ECHO: bool = False
+    LOG_LEVEL: str | None = None  # defaults to INFO in production, DEBUG otherwise
+    LOG_FORMAT: str = "text"  # text, json
+    LOG_DEBUG_SAMPLE_RATE: float = 1.0  # fraction of DEBUG records kept
+    ACCESS_LOG: bool = True
+
+    # Rate limiting
+    RATE_LIMIT_ENABLED: bool = True
+    # Failed logins: after the free allowance, each attempt waits
+    # base * 2**(failures - free) seconds since the last failure.
+    LOGIN_ACCOUNT_FREE_FAILURES: int = 5
+    LOGIN_IP_FREE_FAILURES: int = 20
+    LOGIN_BACKOFF_BASE_SECONDS: float = 1.0
+    LOGIN_BACKOFF_MAX_SECONDS: float = 900.0
+    LOGIN_FAILURE_WINDOW_SECONDS: float = 900.0  # counters reset after this
+    LOGIN_NEGATIVE_CACHE_SECONDS: float = 60.0  # replayed bad passwords
+
+    # Caching. The default backend is per worker process: other workers'
+    # writes are relayed through the events fanout, and entries expire after
+    # CACHE_TTL_SECONDS to bound staleness from relayed writes that are lost.
+    CACHE_ENABLED: bool = True
+    CACHE_MAX_ENTRIES: int = 10_000
+    CACHE_TTL_SECONDS: float = 30.0
+
+    # Idempotency-Key on writes: responses are replayed to retries for
+    # IDEMPOTENCY_TTL_SECONDS. A claim whose request never finished (e.g. the
+    # worker died) is given up after IDEMPOTENCY_LOCK_SECONDS.
+    IDEMPOTENCY_TTL_SECONDS: float = 86400.0
+    IDEMPOTENCY_LOCK_SECONDS: float = 60.0
+    IDEMPOTENCY_PURGE_SECONDS: float = 3600.0
+
+    # Background jobs that must run in one process at a time (the reminder
+    # scheduler) run in the worker holding their lease; another worker takes
+    # over within JOB_LEASE_SECONDS of the holder dying.
+    JOB_LEASE_SECONDS: float = 30.0
+
+    # Due-date reminders, fired REMINDER_LEAD_HOURS before the due date starts
+    # (UTC). Only reminders within REMINDER_HORIZON_HOURS are held in memory.
+    REMINDERS_ENABLED: bool = True
+    REMINDER_SINK: Literal["log", "file"] = "log"
+    REMINDER_FILE: str = "reminders.jsonl"  # JSON lines, for the file sink
+    REMINDER_LEAD_HOURS: float = 24.0
+    REMINDER_HORIZON_HOURS: float = 24.0
+    REMINDER_RELOAD_SECONDS: float = 300.0  # picks up other workers' writes
+    REMINDER_BATCH_SIZE: int = 1000
+
+    # Live events (/todos/events) and cache invalidations. With several
+    # workers, "unix" relays them between workers on one host through datagram
+    # sockets in EVENTS_SOCKET_DIR. Unset, python -m src picks "unix" when it
+    # runs several workers.
+    EVENTS_FANOUT: Literal["local", "unix"] | None = None
+    # Must be private to the app's user; unset, $XDG_RUNTIME_DIR/todo-api-events
+    # or todo-api-events-<uid> in the temp directory, created 0700.
+    EVENTS_SOCKET_DIR: str | None = None
+    EVENTS_BUFFER_SIZE: int = 100  # a stream further behind is disconnected
+    EVENTS_KEEPALIVE_SECONDS: float = 15.0
+
+    # Outbox: work queued by writes, processed by worker tasks in each app
+    # process (OUTBOX_WORKER_ENABLED) and/or by python -m src.outbox.worker.
+    OUTBOX_WORKER_ENABLED: bool = True
+    OUTBOX_CONCURRENCY: int = 2
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_LEASE_SECONDS: float = 60.0  # claimed messages reappear after this
+    OUTBOX_POLL_SECONDS: float = 1.0
+    OUTBOX_MAX_ATTEMPTS: int = 10
+    OUTBOX_BACKOFF_BASE_SECONDS: float = 1.0
+    OUTBOX_BACKOFF_MAX_SECONDS: float = 600.0
+
+    # Subtasks: levels allowed below a top-level todo
+    SUBTASK_MAX_DEPTH: int = 8
+
+    # Manual order: a move making a rank key longer than this queues a
+    # background rerank of the user's todos (see src.todos.ranks).
+    RANK_REBALANCE_LENGTH: int = 24
+
+    # Archiving: todos completed and untouched for ARCHIVE_AFTER_DAYS move to
+    # todo_archive, ARCHIVE_BATCH_SIZE per transaction.
+    ARCHIVE_ENABLED: bool = True
+    ARCHIVE_AFTER_DAYS: float = 30.0
+    ARCHIVE_INTERVAL_SECONDS: float = 3600.0
+    ARCHIVE_BATCH_SIZE: int = 1000
+
+    # Rows changed per transaction when deleting accounts and categories
+    DELETE_BATCH_SIZE: int = 1000
+
+    # Webhooks, delivered by the outbox workers
+    WEBHOOK_MAX_PER_USER: int = 10
+    WEBHOOK_TIMEOUT_SECONDS: float = 10.0
+    WEBHOOK_MAX_CONNECTIONS: int = 100  # pooled across all destinations
+    WEBHOOK_HOST_CONCURRENCY: int = 4  # in-flight requests per destination host
+    WEBHOOK_ATTEMPTS: int = 3  # per batch, before the outbox retries it later
+    WEBHOOK_BACKOFF_BASE_SECONDS: float = 1.0
+    # Allows loopback and private destinations, e.g. for local development.
+    WEBHOOK_ALLOW_PRIVATE_URLS: bool = False
+
     @property
     def is_production(self) -> bool:
         return self.ENV == "production"
 
+    @property
+    def log_level(self) -> str:
+        if self.LOG_LEVEL:
+            return self.LOG_LEVEL.upper()
+        return "INFO" if self.is_production else "DEBUG"
+
 
 @lru_cache
 def get_settings() -> Settings:
@@ -1,33 +1,437 @@
-from collections.abc import AsyncGenerator
+import asyncio
+import math
+import time
+from collections.abc import (
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Sequence,
+)
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime
+from typing import Any, NamedTuple
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import DeclarativeBase
+from fastapi import Request
+from sqlalchemy import (
+    ColumnElement,
+    DateTime,
+    Select,
+    Table,
+    TypeDecorator,
+    delete,
+    event,
+    make_url,
+    select,
+    text,
+    tuple_,
+)
+from sqlalchemy.engine import Dialect, Engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import DeclarativeBase, Session
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from src.core.cache import apply_pending_invalidations
 from src.core.config import get_settings
 
-settings = get_settings()
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=not settings.is_production,
-)
+def create_engine_from_url(url: str) -> AsyncEngine:
+    """Create an async engine with pool settings suited to its backend."""
+    settings = get_settings()
+    kwargs: dict[str, Any] = {"echo": settings.SQL_ECHO}
+    if make_url(url).get_backend_name() == "postgresql":
+        kwargs.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_pre_ping=True,
+        )
+    return create_async_engine(url, **kwargs)
 
-async_session_factory = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+
+def read_only_engine(engine: AsyncEngine) -> AsyncEngine:
+    """View of ``engine`` whose connections never open a write transaction.
+
+    PostgreSQL gets ``BEGIN READ ONLY``; SQLite runs in autocommit, so reads
+    take no lock and need no COMMIT.
+    """
+    if engine.dialect.name == "postgresql":
+        return engine.execution_options(postgresql_readonly=True)
+    return engine.execution_options(isolation_level="AUTOCOMMIT")
+
+
+class Shard(NamedTuple):
+    primary: AsyncEngine
+    replica: AsyncEngine
+
+
+class RoutingSession(Session):
+    """Route statements by shard, role and table.
+
+    Tables flagged ``info={"directory": True}`` live on the directory engine.
+    Everything else goes to shard ``info["shard"]`` (0 until a user is bound):
+    SELECTs to its replica when ``info["use_replica"]`` is set, flushes and
+    DML always to its primary, so a replica-routed session still writes
+    safely; it just reads possibly-lagging data.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        shards: Sequence[Shard],
+        directory: AsyncEngine,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.shards = [
+            (shard.primary.sync_engine, shard.replica.sync_engine) for shard in shards
+        ]
+        self.directory = directory.sync_engine
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kwargs: Any) -> Engine:
+        if mapper is not None and mapper.local_table.info.get("directory"):
+            return self.directory
+        primary, replica = self.shards[self.info.get("shard", 0)]
+        if (
+            self.info.get("use_replica")
+            and not self._flushing
+            and isinstance(clause, Select)
+        ):
+            return replica
+        return primary
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_written(session: Session, flush_context: Any) -> None:
+    session.info["wrote"] = True
+
+
+def on_commit(db: AsyncSession, callback: Callable[[], None]) -> None:
+    """Call ``callback`` once the transaction ``db`` is in commits.
+
+    Callbacks run synchronously inside ``commit()`` and are dropped on
+    rollback, so they suit in-process bookkeeping that must only reflect
+    committed data. They must not raise or do I/O.
+    """
+    db.info.setdefault("on_commit", []).append(callback)
+
+
+def on_rollback(db: AsyncSession, compensate: Callable[[], Awaitable[None]]) -> None:
+    """Await ``compensate`` if the request ``db`` serves rolls back.
+
+    For a write the request commits on its own before its transaction (e.g. a
+    directory row), which must be undone when the rest never lands. Only
+    ``get_db`` runs these.
+    """
+    db.info.setdefault("on_rollback", []).append(compensate)
+
+
+def after_commit(db: AsyncSession, callback: Callable[[], Awaitable[None]]) -> None:
+    """Await ``callback`` once the request ``db`` serves has committed.
+
+    For a write on another database that must not land unless this
+    transaction does. Only ``get_db`` runs these; ``callback`` handles its
+    own errors, since the response has been sent by then.
+    """
+    db.info.setdefault("after_commit", []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_commit_callbacks(session: Session) -> None:
+    for callback in session.info.pop("on_commit", ()):
+        callback()
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_commit_callbacks(session: Session) -> None:
+    session.info.pop("on_commit", None)
+
+
+def make_session_factory(
+    shards: Sequence[Shard], directory: AsyncEngine
+) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        shards=[Shard(shard.primary, shard.primary) for shard in shards],
+        directory=directory,
+        expire_on_commit=False,
+    )
+
+
+def make_read_session_factory(
+    shards: Sequence[Shard], directory: AsyncEngine
+) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        shards=[
+            Shard(read_only_engine(shard.primary), read_only_engine(shard.replica))
+            for shard in shards
+        ],
+        directory=read_only_engine(directory),
+        expire_on_commit=False,
+        info={"use_replica": True},
+    )
+
+
+class Databases:
+    """The engines and session factories of one process."""
+
+    def __init__(self, directory: AsyncEngine, shards: Sequence[Shard]) -> None:
+        self.directory = directory
+        self.shards = list(shards)
+        self.session_factory = make_session_factory(self.shards, directory)
+        self.read_session_factory = make_read_session_factory(self.shards, directory)
+
+    @classmethod
+    def from_settings(cls) -> "Databases":
+        settings = get_settings()
+        directory = create_engine_from_url(settings.DATABASE_URL)
+        if settings.DATABASE_SHARD_URLS:
+            # Sharded: DATABASE_URL holds only the user directory.
+            return cls(
+                directory,
+                [
+                    Shard(shard_engine, shard_engine)
+                    for shard_engine in map(
+                        create_engine_from_url, settings.DATABASE_SHARD_URLS
+                    )
+                ],
+            )
+        replica = (
+            create_engine_from_url(settings.DATABASE_REPLICA_URL)
+            if settings.DATABASE_REPLICA_URL
+            else directory
+        )
+        return cls(directory, [Shard(directory, replica)])
+
+    @property
+    def has_replicas(self) -> bool:
+        return any(shard.replica is not shard.primary for shard in self.shards)
+
+    @property
+    def engines(self) -> set[AsyncEngine]:
+        return {
+            self.directory,
+            *(engine for shard in self.shards for engine in shard),
+        }
+
+    async def warm_up(self, connections: int) -> None:
+        """Open ``connections`` pooled connections on every engine.
+
+        Runs before a worker serves traffic, so its first requests don't pay
+        for connection setup.
+        """
+
+        async def ping(engine: AsyncEngine) -> None:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        # Concurrent, so each ping holds its own connection and the pool grows.
+        await asyncio.gather(
+            *(ping(engine) for engine in self.engines for _ in range(connections))
+        )
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            await engine.dispose()
+
+
+# Created by the app's lifespan, or on first use by scripts and tests, so
+# importing the app never opens a database.
+_databases: Databases | None = None
+
+
+def get_databases() -> Databases:
+    global _databases
+    if _databases is None:
+        _databases = Databases.from_settings()
+    return _databases
+
+
+def set_databases(databases: Databases | None) -> None:
+    global _databases
+    _databases = databases
+
+
+async def dispose_databases() -> None:
+    global _databases
+    if _databases is not None:
+        await _databases.dispose()
+        _databases = None
+
+
+class UTCDateTime(TypeDecorator[datetime]):
+    """``timestamptz`` on PostgreSQL; on SQLite, stored as UTC and read back aware."""
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(
+        self, value: datetime | None, dialect: Dialect
+    ) -> datetime | None:
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(UTC)
+        return value
+
+    def process_result_value(
+        self, value: datetime | None, dialect: Dialect
+    ) -> datetime | None:
+        if value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=UTC)
+        return value
 
 
 class Base(DeclarativeBase):
     pass
 
 
-async def get_db() -> AsyncGenerator[AsyncSession]:
-    async with async_session_factory() as session:
+def _first_rows(
+    table: Table, where: tuple[ColumnElement[bool], ...], limit: int
+) -> ColumnElement[bool]:
+    """Match the first ``limit`` rows of ``table`` matching ``where``, by key."""
+    pk = list(table.primary_key.columns)
+    batch = select(*pk).where(*where).limit(limit)
+    if len(pk) == 1:
+        return pk[0].in_(batch.scalar_subquery())
+    return tuple_(*pk).in_(batch)
+
+
+async def delete_in_batches(
+    db: AsyncSession, table: Table, *where: ColumnElement[bool], batch_size: int
+) -> int:
+    """Delete ``table``'s rows matching ``where``; return how many were deleted.
+
+    Rows go ``batch_size`` at a time, by primary key, and every full batch is
+    committed, so no transaction holds locks on an unbounded number of rows
+    and nothing is loaded into the session. The last batch is left in the
+    caller's transaction: small deletes stay atomic with what follows.
+    """
+    deleted = 0
+    while True:
+        result = await db.execute(
+            delete(table).where(_first_rows(table, where, batch_size))
+        )
+        count: int = result.rowcount  # type: ignore[attr-defined]
+        deleted += count
+        if count < batch_size:
+            return deleted
+        await db.commit()
+
+
+def read_only(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """Mark a GET route as read-only.
+
+    Every ``get_db`` dependency in the request (e.g. from ``get_current_user``)
+    then shares the route's ``get_read_db`` session instead of opening a
+    read-write one.
+    """
+    endpoint.__read_only__ = True  # type: ignore[attr-defined]
+    return endpoint
+
+
+def is_read_only_request(request: Request) -> bool:
+    endpoint = request.scope.get("endpoint")
+    return request.method in ("GET", "HEAD") and getattr(
+        endpoint, "__read_only__", False
+    )
+
+
+# Read-your-writes: the response to a write sets a cookie with its time, and
+# reads that send it back within REPLICA_STICKINESS_SECONDS stay on the
+# primary, whichever worker serves them, so replication lag can't hide the
+# write. A forged cookie only moves that client's reads to the primary.
+LAST_WRITE_COOKIE = "last_write"
+
+
+def wrote_recently(request: Request) -> bool:
+    try:
+        written_at = float(request.cookies.get(LAST_WRITE_COOKIE, ""))
+    except ValueError:
+        return False
+    age = time.time() - written_at
+    return 0 <= age < get_settings().REPLICA_STICKINESS_SECONDS
+
+
+class LastWriteCookieMiddleware:
+    """Set the read-your-writes cookie on responses to requests that wrote.
+
+    Plain ASGI, like ``RequestContextMiddleware``: the cookie must go out with
+    the response headers, before ``get_db`` commits.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        state = scope.setdefault("state", {})
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                info = state.get("write_session_info")
+                if info and info.get("wrote") and get_databases().has_replicas:
+                    max_age = math.ceil(get_settings().REPLICA_STICKINESS_SECONDS)
+                    cookie = (
+                        f"{LAST_WRITE_COOKIE}={time.time():.3f}; Path=/; "
+                        f"Max-Age={max_age}; HttpOnly; SameSite=Lax"
+                    )
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"set-cookie", cookie.encode()),
+                    ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+@asynccontextmanager
+async def _read_session(request: Request) -> AsyncIterator[AsyncSession]:
+    # One read session per request, however many dependencies ask for it.
+    shared: AsyncSession | None = getattr(request.state, "read_db", None)
+    if shared is not None:
+        yield shared
+        return
+    factory = get_databases().read_session_factory
+    async with factory(info={"use_replica": not wrote_recently(request)}) as session:
+        request.state.read_db = session
+        yield session
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession]:
+    """Session for read-only routes: replica-routed, never committed."""
+    async with _read_session(request) as session:
+        yield session
+
+
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession]:
+    if is_read_only_request(request):
+        async with _read_session(request) as session:
+            yield session
+        return
+
+    # Sessions connect lazily, so a request that never queries never checks
+    # out a connection and has nothing to commit.
+    async with get_databases().session_factory() as session:
+        request.state.write_session_info = session.info
         try:
             yield session
-            await session.commit()
+            if session.in_transaction():
+                await session.commit()
+            session.info.pop("on_rollback", None)
+            for callback in session.info.pop("after_commit", ()):
+                await callback()
+            await apply_pending_invalidations(session)
         except Exception:
+            session.info.pop("after_commit", None)
             await session.rollback()
+            for compensate in session.info.pop("on_rollback", ()):
+                await compensate()
             raise
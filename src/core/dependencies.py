@@ -1,3 +1,3 @@
-from src.core.database import get_db
+from src.core.database import get_db, get_read_db
 
-__all__ = ["get_db"]
+__all__ = ["get_db", "get_read_db"]
@@ -3,8 +3,11 @@ class AppException(Exception):
     message: str = "An application error occurred"
     status_code: int = 400
 
-    def __init__(self, message: str | None = None) -> None:
+    def __init__(
+        self, message: str | None = None, headers: dict[str, str] | None = None
+    ) -> None:
         self.message = message or self.__class__.message
+        self.headers = headers
         super().__init__(self.message)
 
 
@@ -36,3 +39,15 @@ class ValidationError(AppException):
     code = "VALIDATION_ERROR"
     message = "Validation failed"
     status_code = 422
+
+
+class TooManyRequestsError(AppException):
+    code = "RATE_LIMITED"
+    message = "Too many requests"
+    status_code = 429
+
+
+class ServiceUnavailableError(AppException):
+    code = "SERVICE_UNAVAILABLE"
+    message = "Service temporarily unavailable"
+    status_code = 503
@@ -0,0 +1,285 @@
+"""``Idempotency-Key`` support for write routes.
+
+A client that retries a write after a dropped connection sends the same key
+again. The first request with a key claims it in a short transaction of its
+own, so a concurrent duplicate finds the claim and gets a 409 instead of
+repeating the write. The response is stored in the request's transaction,
+committed together with the write; when sharded, where the keys and the
+write are on different databases, it is stored once the write has
+committed. Retries within ``IDEMPOTENCY_TTL_SECONDS`` are answered from it
+without running the route. A request that fails, or whose commit does,
+releases its key, so the client can retry it.
+"""
+
+import asyncio
+import hashlib
+import logging
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime, timedelta
+from functools import partial
+from typing import Annotated
+
+from fastapi import Header, Request, Response
+from sqlalchemy import (
+    Integer,
+    LargeBinary,
+    String,
+    UniqueConstraint,
+    delete,
+    select,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.core.config import get_settings
+from src.core.database import (
+    Base,
+    UTCDateTime,
+    after_commit,
+    get_databases,
+    on_rollback,
+)
+from src.core.exceptions import ConflictError, ValidationError
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class IdempotencyKey(Base):
+    """A claimed ``Idempotency-Key`` and, once its request commits, the response.
+
+    Kept on the directory database, so keys sent before the user has a shard
+    (registration) and keys from every shard live in one place.
+    """
+
+    __tablename__ = "idempotency_key"
+    __table_args__ = (
+        UniqueConstraint("scope", "key"),
+        {"info": {"directory": True}},
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # Who may replay the key: "user:<id>", or "anonymous" for registration.
+    scope: Mapped[str] = mapped_column(String(64))
+    key: Mapped[str] = mapped_column(String(255))
+    # SHA-256 of the method, path and body, so a reused key is detected.
+    fingerprint: Mapped[str] = mapped_column(String(64))
+    # Unset while the first request is in progress.
+    status_code: Mapped[int | None] = mapped_column(Integer, default=None)
+    response: Mapped[bytes | None] = mapped_column(LargeBinary, default=None)
+    created_at: Mapped[datetime] = mapped_column(UTCDateTime)
+    expires_at: Mapped[datetime] = mapped_column(UTCDateTime, index=True)
+
+
+class IdempotencyKeyReusedError(ValidationError):
+    code = "IDEMPOTENCY_KEY_REUSED"
+    message = "Idempotency-Key was already used for a different request"
+
+
+class IdempotencyInProgressError(ConflictError):
+    code = "IDEMPOTENCY_IN_PROGRESS"
+    message = "A request with this Idempotency-Key is in progress, retry shortly"
+
+
+def fingerprint(method: str, path: str, body: bytes) -> str:
+    return hashlib.sha256(f"{method} {path}\n".encode() + body).hexdigest()
+
+
+class Idempotency:
+    """Dependency giving a write route ``Idempotency-Key`` semantics.
+
+    The route passes its work to ``run`` as a ``render`` callback returning
+    the JSON body. Without the header, ``render`` simply runs.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        response: Response,
+        key: Annotated[
+            str | None,
+            Header(
+                alias="Idempotency-Key",
+                min_length=1,
+                max_length=255,
+                description="Retries with the same key return the first response",
+            ),
+        ] = None,
+    ) -> None:
+        self.request = request
+        self.response = response
+        self.key = key
+
+    async def run(
+        self,
+        db: AsyncSession,
+        scope: str,
+        render: Callable[[], Awaitable[bytes]],
+        status_code: int = 200,
+    ) -> Response:
+        """Run ``render`` once per key in ``scope``; replay its response after.
+
+        ``db`` must be the session ``render`` writes through.
+        """
+        if self.key is None:
+            return self._respond(await render(), status_code)
+
+        request_fingerprint = fingerprint(
+            self.request.method, self.request.url.path, await self.request.body()
+        )
+        previous = await self._claim(scope, request_fingerprint)
+        if previous is not None:
+            return self._replay(previous, request_fingerprint)
+        try:
+            body = await render()
+            # The claim is committed already; free it if the write isn't.
+            on_rollback(db, partial(self._release, scope))
+            if db.get_bind() is db.get_bind(IdempotencyKey.__mapper__):
+                await self._store(db, scope, status_code, body)
+            else:
+                # Sharded: the key is on the directory, the write on a shard.
+                after_commit(
+                    db, partial(self._store_committed, scope, status_code, body)
+                )
+        except BaseException:
+            # The write is abandoned, so let a retry redo it. Roll back first:
+            # on SQLite the write's lock would block the release.
+            await asyncio.shield(self._abandon(db, scope))
+            raise
+        return self._respond(body, status_code)
+
+    async def _claim(
+        self, scope: str, request_fingerprint: str
+    ) -> IdempotencyKey | None:
+        """Claim the key; return the live record holding it instead, if any."""
+        now = datetime.now(UTC)
+        async with get_databases().session_factory() as db:
+            record = await db.scalar(
+                select(IdempotencyKey).where(
+                    IdempotencyKey.scope == scope, IdempotencyKey.key == self.key
+                )
+            )
+            if record is not None:
+                abandoned = record.status_code is None and (
+                    record.created_at
+                    <= now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+                )
+                if record.expires_at > now and not abandoned:
+                    return record
+                await db.delete(record)
+                # Before the insert, which a flush would otherwise run first.
+                await db.flush()
+            db.add(
+                IdempotencyKey(
+                    scope=scope,
+                    key=self.key,
+                    fingerprint=request_fingerprint,
+                    created_at=now,
+                    expires_at=now
+                    + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+                )
+            )
+            try:
+                await db.commit()
+            except IntegrityError:
+                # A concurrent request with the same key claimed it first.
+                metrics.incr("idempotency.conflicts")
+                raise IdempotencyInProgressError(headers={"Retry-After": "1"}) from None
+        return None
+
+    async def _store(
+        self, db: AsyncSession, scope: str, status_code: int, body: bytes
+    ) -> None:
+        await db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.scope == scope, IdempotencyKey.key == self.key)
+            .values(status_code=status_code, response=body)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def _store_committed(self, scope: str, status_code: int, body: bytes) -> None:
+        try:
+            async with get_databases().session_factory() as session:
+                await self._store(session, scope, status_code, body)
+                await session.commit()
+        except Exception:
+            # The claim lapses after IDEMPOTENCY_LOCK_SECONDS; a retry after
+            # that runs the request again.
+            logger.exception("Failed to store idempotent response")
+
+    async def _abandon(self, db: AsyncSession, scope: str) -> None:
+        await db.rollback()
+        await self._release(scope)
+
+    async def _release(self, scope: str) -> None:
+        try:
+            async with get_databases().session_factory() as session:
+                await session.execute(
+                    delete(IdempotencyKey).where(
+                        IdempotencyKey.scope == scope,
+                        IdempotencyKey.key == self.key,
+                        IdempotencyKey.status_code.is_(None),
+                    )
+                )
+                await session.commit()
+        except Exception:
+            # The claim lapses after IDEMPOTENCY_LOCK_SECONDS anyway.
+            logger.exception("Failed to release idempotency key")
+
+    def _replay(self, record: IdempotencyKey, request_fingerprint: str) -> Response:
+        if record.fingerprint != request_fingerprint:
+            raise IdempotencyKeyReusedError()
+        if record.status_code is None or record.response is None:
+            metrics.incr("idempotency.conflicts")
+            raise IdempotencyInProgressError(headers={"Retry-After": "1"})
+        metrics.incr("idempotency.replayed")
+        self.response.headers[REPLAYED_HEADER] = "true"
+        return self._respond(record.response, record.status_code)
+
+    def _respond(self, body: bytes, status_code: int) -> Response:
+        # Keep headers set by other dependencies (e.g. rate limits).
+        return Response(
+            body,
+            status_code=status_code,
+            media_type="application/json",
+            headers=dict(self.response.headers),
+        )
+
+
+async def purge_expired_keys(batch_size: int = 1000) -> int:
+    """Delete expired keys in batches; return how many were deleted."""
+    purged = 0
+    session_factory = get_databases().session_factory
+    while True:
+        async with session_factory() as db:
+            expired = (
+                select(IdempotencyKey.id)
+                .where(IdempotencyKey.expires_at <= datetime.now(UTC))
+                .limit(batch_size)
+            )
+            result = await db.execute(
+                delete(IdempotencyKey)
+                .where(IdempotencyKey.id.in_(expired.scalar_subquery()))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        count: int = result.rowcount  # type: ignore[attr-defined]
+        purged += count
+        if count < batch_size:
+            return purged
+
+
+async def run_purge(interval: float) -> None:
+    """Purge expired keys every ``interval`` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await purge_expired_keys()
+        except Exception:
+            logger.exception("Idempotency key purge failed")
@@ -0,0 +1,120 @@
+"""Run a background job in one process at a time.
+
+Every worker starts the job's runner, but only the one holding the job's
+lease (a row in ``lease`` on the directory database) runs it. The holder
+renews the lease every third of ``JOB_LEASE_SECONDS``; a worker that fails to
+renew stops its job, and once the lease expires another worker takes over.
+Hosts' clocks must agree to well within ``JOB_LEASE_SECONDS``.
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import socket
+import uuid
+from collections.abc import Callable, Coroutine
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import String, delete, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.core.config import get_settings
+from src.core.database import Base, UTCDateTime, get_databases
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Unique per process start, so a restarted worker never renews its old lease.
+HOLDER = f"{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class Lease(Base):
+    """Which process runs a background job, until when."""
+
+    __tablename__ = "lease"
+    __table_args__ = {"info": {"directory": True}}
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    holder: Mapped[str] = mapped_column(String(64))
+    expires_at: Mapped[datetime] = mapped_column(UTCDateTime)
+
+
+async def acquire(name: str, ttl: float, holder: str = HOLDER) -> bool:
+    """Take or renew the lease on ``name``; return whether ``holder`` has it."""
+    now = datetime.now(UTC)
+    expires_at = now + timedelta(seconds=ttl)
+    async with get_databases().session_factory() as db:
+        result = await db.execute(
+            update(Lease)
+            .where(
+                Lease.name == name,
+                or_(Lease.holder == holder, Lease.expires_at <= now),
+            )
+            .values(holder=holder, expires_at=expires_at)
+            .execution_options(synchronize_session=False)
+        )
+        renewed: int = result.rowcount  # type: ignore[attr-defined]
+        if not renewed:
+            # Never taken yet, or held by someone else: then the insert fails.
+            db.add(Lease(name=name, holder=holder, expires_at=expires_at))
+        try:
+            await db.commit()
+        except IntegrityError:
+            return False
+    return True
+
+
+async def release(name: str, holder: str = HOLDER) -> None:
+    async with get_databases().session_factory() as db:
+        await db.execute(
+            delete(Lease).where(Lease.name == name, Lease.holder == holder)
+        )
+        await db.commit()
+
+
+async def run_with_lease(
+    name: str,
+    job: Callable[[], Coroutine[Any, Any, None]],
+    ttl: float | None = None,
+    holder: str = HOLDER,
+) -> None:
+    """Run ``job`` while this process holds the lease on ``name``, until cancelled.
+
+    ``job`` is cancelled when the lease can't be renewed, and started again
+    once it is reacquired.
+    """
+    ttl = ttl or settings.JOB_LEASE_SECONDS
+    task: asyncio.Task[None] | None = None
+    try:
+        while True:
+            try:
+                held = await acquire(name, ttl, holder)
+            except Exception:
+                logger.exception("Renewing the %s lease failed", name)
+                held = False
+            if held and task is None:
+                logger.info("Took the %s lease", name)
+                metrics.incr(f"leases.{name}.acquired")
+                task = asyncio.create_task(job())
+            elif not held and task is not None:
+                logger.warning("Lost the %s lease, stopping it", name)
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                task = None
+            if task is not None and task.done():
+                if not task.cancelled() and task.exception() is not None:
+                    logger.error("%s failed", name, exc_info=task.exception())
+                # Started again on the next round, if the lease is still held.
+                task = None
+            await asyncio.sleep(ttl / 3)
+    finally:
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            with contextlib.suppress(Exception):
+                await asyncio.shield(release(name, holder))
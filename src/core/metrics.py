@@ -0,0 +1,32 @@
+from collections import defaultdict
+from collections.abc import Callable
+
+
+class Metrics:
+    """In-process counters and gauges, exposed as JSON on ``/metrics``."""
+
+    def __init__(self) -> None:
+        self._counters: defaultdict[str, float] = defaultdict(float)
+        self._gauges: dict[str, Callable[[], float]] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        self._counters[name] += value
+
+    def register_gauge(self, name: str, read: Callable[[], float]) -> None:
+        self._gauges[name] = read
+
+    def get(self, name: str) -> float:
+        if name in self._gauges:
+            return self._gauges[name]()
+        return self._counters.get(name, 0)
+
+    def snapshot(self) -> dict[str, float]:
+        values = dict(self._counters)
+        values.update({name: read() for name, read in self._gauges.items()})
+        return dict(sorted(values.items()))
+
+    def reset(self) -> None:
+        self._counters.clear()
+
+
+metrics = Metrics()
@@ -0,0 +1,93 @@
+import logging
+import uuid
+from time import perf_counter
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.logging import request_id_var
+from src.core.timing import RequestTimings, timings_var
+
+access_logger = logging.getLogger("src.access")
+
+REQUEST_ID_HEADER = b"x-request-id"
+MAX_REQUEST_ID_LENGTH = 128
+
+
+def _incoming_request_id(scope: Scope) -> str | None:
+    for name, value in scope["headers"]:
+        if name == REQUEST_ID_HEADER:
+            if len(value) <= MAX_REQUEST_ID_LENGTH and value.isascii():
+                request_id: str = value.decode()
+                return request_id
+            return None
+    return None
+
+
+class RequestContextMiddleware:
+    """Assign a request id, time the request and write one access-log line.
+
+    Implemented as plain ASGI rather than ``BaseHTTPMiddleware`` so responses
+    are streamed straight through without an extra task and memory stream.
+    """
+
+    def __init__(self, app: ASGIApp, access_log: bool = True) -> None:
+        self.app = app
+        self.access_log = access_log
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _incoming_request_id(scope) or uuid.uuid4().hex
+        timings = RequestTimings()
+        request_id_token = request_id_var.set(request_id)
+        timings_token = timings_var.set(timings)
+        status_code = 500
+        start = perf_counter()
+
+        async def send_with_request_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER, request_id.encode()))
+                headers.append(
+                    (
+                        b"server-timing",
+                        f"db;dur={timings.db * 1000:.1f}, "
+                        f"auth;dur={timings.auth * 1000:.1f}".encode(),
+                    )
+                )
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            if self.access_log and access_logger.isEnabledFor(logging.INFO):
+                total_ms = (perf_counter() - start) * 1000
+                path = scope["path"]
+                if scope["query_string"]:
+                    path = f"{path}?{scope['query_string'].decode('latin-1')}"
+                access_logger.info(
+                    "%s %s %d %.1fms db=%.1fms/%dq auth=%.1fms",
+                    scope["method"],
+                    path,
+                    status_code,
+                    total_ms,
+                    timings.db * 1000,
+                    timings.db_queries,
+                    timings.auth * 1000,
+                    extra={
+                        "method": scope["method"],
+                        "path": path,
+                        "status": status_code,
+                        "duration_ms": round(total_ms, 2),
+                        "db_ms": round(timings.db * 1000, 2),
+                        "db_queries": timings.db_queries,
+                        "auth_ms": round(timings.auth * 1000, 2),
+                    },
+                )
+            timings_var.reset(timings_token)
+            request_id_var.reset(request_id_token)
@@ -0,0 +1,201 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from fastapi import Request, Response
+
+from src.core.config import get_settings
+from src.core.exceptions import TooManyRequestsError
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimit:
+    """Token-bucket policy: ``capacity`` burst, refilled at ``rate`` tokens/second."""
+
+    name: str
+    capacity: int
+    rate: float
+
+    @classmethod
+    def per_minute(cls, name: str, requests: int) -> "RateLimit":
+        return cls(name=name, capacity=requests, rate=requests / 60)
+
+
+@dataclass(slots=True)
+class Bucket:
+    tokens: float
+    updated: float
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float
+    retry_after: float
+
+    def headers(self) -> dict[str, str]:
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(math.ceil(self.retry_after))
+        return headers
+
+
+def take_token(
+    bucket: Bucket | None, limit: RateLimit, now: float
+) -> tuple[Bucket, RateLimitResult]:
+    """Refill ``bucket`` up to ``now`` and try to take one token from it."""
+    if bucket is None:
+        tokens = float(limit.capacity)
+    else:
+        elapsed = max(0.0, now - bucket.updated)
+        tokens = min(float(limit.capacity), bucket.tokens + elapsed * limit.rate)
+
+    allowed = tokens >= 1
+    if allowed:
+        tokens -= 1
+    result = RateLimitResult(
+        allowed=allowed,
+        limit=limit.capacity,
+        remaining=int(tokens),
+        reset_after=(limit.capacity - tokens) / limit.rate,
+        retry_after=0.0 if allowed else (1 - tokens) / limit.rate,
+    )
+    return Bucket(tokens=tokens, updated=now), result
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    async def hit(self, key: str, limit: RateLimit) -> RateLimitResult: ...
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Per-process buckets.
+
+    No lock is needed: the read-modify-write in ``hit`` never awaits, so it
+    runs atomically on the event loop.
+    """
+
+    def __init__(
+        self, max_keys: int = 100_000, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: dict[str, Bucket] = {}
+
+    async def hit(self, key: str, limit: RateLimit) -> RateLimitResult:
+        now = self.clock()
+        bucket, result = take_token(self._buckets.get(key), limit, now)
+        self._buckets[key] = bucket
+        if len(self._buckets) > self.max_keys:
+            self._evict(limit, now)
+        return result
+
+    def _evict(self, limit: RateLimit, now: float) -> None:
+        # A bucket idle long enough to have refilled is equivalent to no bucket.
+        idle = limit.capacity / limit.rate
+        for key in [k for k, b in self._buckets.items() if now - b.updated > idle]:
+            del self._buckets[key]
+        while len(self._buckets) > self.max_keys:
+            del self._buckets[next(iter(self._buckets))]
+
+
+class SharedStore(ABC):
+    """Minimal key-value contract a shared store (e.g. Redis) must provide."""
+
+    @abstractmethod
+    async def get(self, key: str) -> str | None: ...
+
+    @abstractmethod
+    async def compare_and_set(
+        self, key: str, expected: str | None, value: str, ttl: float
+    ) -> bool:
+        """Set ``key`` to ``value`` only if it currently equals ``expected``."""
+
+
+class InMemorySharedStore(SharedStore):
+    """Process-local stand-in for a shared store, used in tests."""
+
+    def __init__(self) -> None:
+        self._data: dict[str, tuple[str, float]] = {}
+
+    async def get(self, key: str) -> str | None:
+        entry = self._data.get(key)
+        if entry is None or entry[1] < time.time():
+            return None
+        return entry[0]
+
+    async def compare_and_set(
+        self, key: str, expected: str | None, value: str, ttl: float
+    ) -> bool:
+        if await self.get(key) != expected:
+            return False
+        self._data[key] = (value, time.time() + ttl)
+        return True
+
+
+class SharedStoreRateLimitBackend(RateLimitBackend):
+    """Buckets kept in a store shared by all workers, updated optimistically."""
+
+    def __init__(self, store: SharedStore, max_attempts: int = 5) -> None:
+        self.store = store
+        self.max_attempts = max_attempts
+
+    async def hit(self, key: str, limit: RateLimit) -> RateLimitResult:
+        ttl = limit.capacity / limit.rate + 1
+        for _ in range(self.max_attempts):
+            raw = await self.store.get(key)
+            bucket = None
+            if raw is not None:
+                tokens, updated = raw.split(":")
+                bucket = Bucket(tokens=float(tokens), updated=float(updated))
+            new_bucket, result = take_token(bucket, limit, time.time())
+            value = f"{new_bucket.tokens}:{new_bucket.updated}"
+            if await self.store.compare_and_set(key, raw, value, ttl):
+                return result
+        # Heavy contention on one key: fail open rather than reject.
+        return result
+
+
+_backend: RateLimitBackend = InMemoryRateLimitBackend()
+
+
+def get_rate_limit_backend() -> RateLimitBackend:
+    return _backend
+
+
+def set_rate_limit_backend(backend: RateLimitBackend) -> None:
+    global _backend
+    _backend = backend
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+async def enforce_rate_limit(
+    limit: RateLimit, identity: str, response: Response
+) -> None:
+    if not get_settings().RATE_LIMIT_ENABLED:
+        return
+    result = await _backend.hit(f"{limit.name}:{identity}", limit)
+    if not result.allowed:
+        raise TooManyRequestsError(headers=result.headers())
+    response.headers.update(result.headers())
+
+
+class RateLimiter:
+    """Route dependency enforcing a per-IP ``RateLimit``."""
+
+    def __init__(self, limit: RateLimit) -> None:
+        self.limit = limit
+
+    async def __call__(self, request: Request, response: Response) -> None:
+        await enforce_rate_limit(self.limit, f"ip:{client_ip(request)}", response)
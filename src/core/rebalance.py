@@ -0,0 +1,194 @@
+"""Move one user's rows to another shard.
+
+    uv run python -m src.core.rebalance --user-id 42 --to-shard 1
+
+The user is frozen (``moving``) in the directory first, so requests for them
+fail fast with 503 instead of writing to the source shard mid-copy. Workers
+cache placements for ``SHARD_CACHE_TTL_SECONDS``, so the move waits that long
+before copying. Rows are copied table by table in dependency order and keep
+their primary keys, which the directory hands out unique across shards (see
+``IdBlock``), so todo, category and tag ids survive a move. Archived todos are
+copied back into ``todo``. Columns naming the table they refer to in
+``info["references"]`` find child rows like foreign keys do.
+"""
+
+import argparse
+import asyncio
+from typing import Any
+
+from sqlalchemy import Column, Table, delete, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# Import all models so they are registered with Base.metadata
+from src.auth.models import User  # noqa: F401
+from src.categories.models import Category  # noqa: F401
+from src.core.cache import apply_pending_invalidations, invalidate_user
+from src.core.config import get_settings
+from src.core.database import Base, dispose_databases, get_databases
+from src.core.sharding import UserDirectory, shard_map
+from src.outbox.models import OutboxMessage  # noqa: F401
+from src.tags.models import Tag  # noqa: F401
+from src.todos.models import Todo  # noqa: F401
+from src.webhooks.models import Webhook  # noqa: F401
+
+settings = get_settings()
+
+USER_TABLE = "user"
+
+
+def _user_tables() -> list[Table]:
+    return [
+        table
+        for table in Base.metadata.sorted_tables
+        if not table.info.get("directory")
+    ]
+
+
+def _references(table: Table) -> list[tuple[Column[Any], Table]]:
+    """``(column, referenced table)`` for each foreign key, declared or not."""
+    references = [(fk.parent, fk.column.table) for fk in table.foreign_keys]
+    references += [
+        (column, Base.metadata.tables[column.info["references"]])
+        for column in table.c
+        if "references" in column.info
+    ]
+    return references
+
+
+def _owned_rows(table: Table, user_id: int, ids: dict[str, set[Any]]) -> Any:
+    """WHERE clause selecting ``table``'s rows that belong to the user, or None."""
+    if table.name == USER_TABLE:
+        return table.c.id == user_id
+    if "user_id" in table.c:
+        return table.c.user_id == user_id
+    # Child rows reached only through a foreign key to a copied table.
+    clauses = [
+        column.in_(list(ids[referenced.name]))
+        for column, referenced in _references(table)
+        if referenced is not table and ids.get(referenced.name)
+    ]
+    return or_(*clauses) if clauses else None
+
+
+async def copy_user_rows(
+    source: AsyncConnection, target: AsyncConnection, user_id: int
+) -> dict[str, set[Any]]:
+    """Copy the user's rows, keys unchanged; return ``{table: {copied pks}}``."""
+    ids: dict[str, set[Any]] = {}
+    for table in _user_tables():
+        where = _owned_rows(table, user_id, ids)
+        if where is None:
+            continue
+        # Archived rows go back into their hot table; the archiver moves them
+        # out again.
+        into = Base.metadata.tables.get(table.info.get("archive_of", ""), table)
+        pk = list(into.primary_key.columns)
+        self_refs = [
+            fk.parent.name for fk in into.foreign_keys if fk.column.table is into
+        ]
+        copied = ids.setdefault(into.name, set())
+        rows = (await source.execute(select(table).where(where))).mappings().all()
+        deferred: list[tuple[Any, dict[str, Any]]] = []
+        for row in rows:
+            values = {name: value for name, value in row.items() if name in into.c}
+            key = tuple(values[column.name] for column in pk)
+            # Self-references are set once every row they may point at exists.
+            patches = {name: values.pop(name) for name in self_refs}
+            await target.execute(insert(into).values(**values))
+            copied.add(key[0] if len(pk) == 1 else key)
+            if any(value is not None for value in patches.values()):
+                deferred.append((key[0], patches))
+        for row_id, patches in deferred:
+            # A reference to a row that was not copied (e.g. an archived
+            # subtask's deleted parent) is dropped.
+            await target.execute(
+                update(into)
+                .where(pk[0] == row_id)
+                .values(
+                    **{name: v if v in copied else None for name, v in patches.items()}
+                )
+            )
+    return ids
+
+
+async def delete_user_rows(source: AsyncConnection, user_id: int) -> None:
+    ids: dict[str, set[Any]] = {}
+    tables = []
+    for table in _user_tables():
+        where = _owned_rows(table, user_id, ids)
+        if where is None:
+            continue
+        pk = list(table.primary_key.columns)
+        if len(pk) == 1:
+            result = await source.execute(select(pk[0]).where(where))
+            ids[table.name] = set(result.scalars())
+        tables.append((table, where))
+    for table, where in reversed(tables):
+        await source.execute(delete(table).where(where))
+
+
+async def _set_moving(user_id: int, moving: bool, shard: int | None = None) -> int:
+    async with get_databases().session_factory() as db:
+        entry = await db.get(UserDirectory, user_id)
+        if entry is None:
+            raise SystemExit(f"user {user_id} not in directory")
+        entry.moving = moving
+        if shard is not None:
+            entry.shard = shard
+        current = entry.shard
+        await invalidate_user(db, user_id)
+        await db.commit()
+        await apply_pending_invalidations(db)
+    await shard_map.forget(user_id)
+    return current
+
+
+async def move_user(user_id: int, to_shard: int, settle_seconds: float) -> None:
+    if not shard_map.is_sharded:
+        raise SystemExit("DATABASE_SHARD_URLS is not configured")
+    shards = get_databases().shards
+    if not 0 <= to_shard < len(shards):
+        raise SystemExit(f"shard must be in 0..{len(shards) - 1}")
+    from_shard = await _set_moving(user_id, True)
+    if from_shard == to_shard:
+        await _set_moving(user_id, False)
+        return
+    try:
+        await asyncio.sleep(settle_seconds)
+        async with (
+            shards[from_shard].primary.connect() as source,
+            shards[to_shard].primary.begin() as target,
+        ):
+            await copy_user_rows(source, target, user_id)
+    except BaseException:
+        await _set_moving(user_id, False)
+        raise
+    await _set_moving(user_id, False, shard=to_shard)
+    # The directory now points at the copy; the source rows are unreachable.
+    async with shards[from_shard].primary.begin() as source:
+        await delete_user_rows(source, user_id)
+
+
+async def run(user_id: int, to_shard: int, settle_seconds: float) -> None:
+    try:
+        await move_user(user_id, to_shard, settle_seconds)
+    finally:
+        await dispose_databases()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--to-shard", type=int, required=True)
+    parser.add_argument(
+        "--settle-seconds",
+        type=float,
+        default=settings.SHARD_CACHE_TTL_SECONDS + 5,
+        help="wait for workers' cached placements to expire before copying",
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args.user_id, args.to_shard, args.settle_seconds))
+
+
+if __name__ == "__main__":
+    main()
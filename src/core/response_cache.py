@@ -0,0 +1,77 @@
+import gzip
+import hashlib
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+
+from src.core.cache import cached, get_cache, get_user_revision
+from src.core.config import get_settings
+
+GZIP_MIN_SIZE = 500
+
+
+@dataclass(frozen=True, slots=True)
+class EncodedResponse:
+    """A JSON body encoded once, with its ETag and a pre-compressed variant."""
+
+    body: bytes
+    gzip_body: bytes | None
+    etag: str
+
+    @classmethod
+    def encode(cls, body: bytes) -> "EncodedResponse":
+        etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        gzip_body = gzip.compress(body, 6) if len(body) >= GZIP_MIN_SIZE else None
+        return cls(body=body, gzip_body=gzip_body, etag=etag)
+
+    def to_response(self, request: Request, headers: dict[str, str]) -> Response:
+        headers = {
+            **headers,
+            "ETag": self.etag,
+            "Cache-Control": "private, no-cache",
+            "Vary": "Authorization, Accept-Encoding",
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and self.etag in if_none_match.split(", "):
+            return Response(status_code=304, headers=headers)
+        if self.gzip_body is not None and "gzip" in request.headers.get(
+            "accept-encoding", ""
+        ):
+            headers["Content-Encoding"] = "gzip"
+            return Response(
+                self.gzip_body, media_type="application/json", headers=headers
+            )
+        return Response(self.body, media_type="application/json", headers=headers)
+
+
+def _cache_key(request: Request, user_id: int, revision: int) -> str:
+    query = urlencode(sorted(request.query_params.multi_items()))
+    return f"resp:{user_id}:{revision}:{request.url.path}?{query}"
+
+
+async def cached_json_response(
+    request: Request,
+    response: Response,
+    user_id: int,
+    render: Callable[[], Awaitable[bytes]],
+) -> Response:
+    """Serve a per-user GET response from cached bytes, rendering on a miss.
+
+    ``render`` must return the JSON body. Entries are keyed by the user's
+    cache revision, so any write that calls ``invalidate_user`` retires them,
+    in this worker and, once it commits, in the others.
+    Headers set on ``response`` by dependencies (e.g. rate limits) are kept.
+    """
+    settings = get_settings()
+    if not settings.CACHE_ENABLED:
+        encoded = EncodedResponse.encode(await render())
+        return encoded.to_response(request, dict(response.headers))
+
+    key = _cache_key(request, user_id, await get_user_revision(user_id))
+    hit: EncodedResponse | None = await cached("responses", key)
+    if hit is None:
+        hit = EncodedResponse.encode(await render())
+        await get_cache().set(key, hit, ttl=settings.CACHE_TTL_SECONDS)
+    return hit.to_response(request, dict(response.headers))
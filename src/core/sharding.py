@@ -0,0 +1,233 @@
+import logging
+from collections.abc import AsyncIterator, Iterable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, cast
+
+from sqlalchemy import (
+    Boolean,
+    Engine,
+    String,
+    Table,
+    delete,
+    event,
+    false,
+    insert,
+    select,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, Mapper, Session, mapped_column, object_mapper
+
+from src.core.cache import get_cache
+from src.core.config import get_settings
+from src.core.database import Base, RoutingSession, get_databases
+from src.core.exceptions import ServiceUnavailableError
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Ids per IdBlock row. Block n covers ids (n - 1) * ID_BLOCK_SIZE + 1 to
+# n * ID_BLOCK_SIZE, so changing it would hand out ids again.
+ID_BLOCK_SIZE = 1000
+
+
+class UserDirectory(Base):
+    """Global ``email -> user id -> shard`` map, kept on the directory database.
+
+    User ids are allocated here so they stay unique across shards.
+    """
+
+    __tablename__ = "user_directory"
+    __table_args__ = {"info": {"directory": True}}
+
+    user_id: Mapped[int] = mapped_column(primary_key=True)
+    email: Mapped[str] = mapped_column(String(255), unique=True, index=True)
+    shard: Mapped[int] = mapped_column()
+    # Set while a rebalance copies the user's rows; requests are refused.
+    moving: Mapped[bool] = mapped_column(Boolean, server_default=false())
+
+
+class IdBlock(Base):
+    """A block of ``ID_BLOCK_SIZE`` row ids, claimed by one worker.
+
+    Sharded, rows on the shards take their ids from these blocks rather than
+    from their shard's sequence, so ids are unique across shards and a user's
+    rows keep them when the rebalancer moves the user.
+    """
+
+    __tablename__ = "id_block"
+    __table_args__ = {"info": {"directory": True}}
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+
+class IdAllocator:
+    """Hand out ids from the blocks this process claimed."""
+
+    def __init__(self) -> None:
+        self._directory: Engine | None = None
+        self._next = self._end = 0
+
+    def take(self, directory: Engine, count: int) -> list[int]:
+        ids: list[int] = []
+        while len(ids) < count:
+            if directory is self._directory and self._next < self._end:
+                ids.append(self._next)
+                self._next += 1
+                continue
+            # A block of its own, committed at once: claiming it must not
+            # wait for, or hold locks until, the caller's commit.
+            with directory.begin() as conn:
+                block = conn.execute(insert(IdBlock).returning(IdBlock.id)).scalar_one()
+            self._directory = directory
+            self._next = (block - 1) * ID_BLOCK_SIZE + 1
+            self._end = block * ID_BLOCK_SIZE + 1
+        return ids
+
+
+id_allocator = IdAllocator()
+
+
+def _global_id_key(mapper: Mapper[Any]) -> str | None:
+    """Attribute of ``mapper``'s generated key, if it needs a global id."""
+    table = cast(Table, mapper.local_table)
+    if table.info.get("directory") or len(mapper.primary_key) != 1:
+        return None
+    [column] = mapper.primary_key
+    if column.autoincrement not in (True, "auto"):
+        return None
+    return mapper.get_property_by_column(column).key
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _assign_global_ids(
+    session: Session, flush_context: Any, instances: Iterable[Any] | None
+) -> None:
+    if not shard_map.is_sharded:
+        return
+    pending = [
+        (obj, key)
+        for obj in session.new
+        if (key := _global_id_key(object_mapper(obj))) is not None
+        and getattr(obj, key) is None
+    ]
+    if pending:
+        # Flushes run in the session's greenlet, so the sync engine works.
+        directory = get_databases().directory.sync_engine
+        for (obj, key), row_id in zip(
+            pending, id_allocator.take(directory, len(pending)), strict=True
+        ):
+            setattr(obj, key, row_id)
+
+
+class UserMovingError(ServiceUnavailableError):
+    code = "USER_MOVING"
+    message = "Account is being migrated, retry shortly"
+
+
+@dataclass(frozen=True, slots=True)
+class Placement:
+    shard: int
+    moving: bool
+
+
+class ShardMap:
+    """Resolve which shard holds a user's rows."""
+
+    def __init__(self, shard_count: int) -> None:
+        self.shard_count = shard_count
+
+    @property
+    def is_sharded(self) -> bool:
+        return self.shard_count > 1
+
+    def initial_shard(self, user_id: int) -> int:
+        return user_id % self.shard_count
+
+    def _cache_key(self, user_id: int) -> str:
+        return f"shard:user:{user_id}"
+
+    async def placement(self, db: AsyncSession, user_id: int) -> Placement | None:
+        cache = get_cache()
+        placement: Placement | None = await cache.get(self._cache_key(user_id))
+        if placement is None:
+            entry = await db.get(UserDirectory, user_id)
+            if entry is None:
+                return None
+            placement = Placement(shard=entry.shard, moving=entry.moving)
+            await cache.set(
+                self._cache_key(user_id),
+                placement,
+                ttl=settings.SHARD_CACHE_TTL_SECONDS,
+            )
+        return placement
+
+    async def shard_for(self, db: AsyncSession, user_id: int) -> int:
+        if not self.is_sharded:
+            return 0
+        placement = await self.placement(db, user_id)
+        if placement is None:
+            # Unknown user: any shard will report it missing.
+            return self.initial_shard(user_id)
+        if placement.moving:
+            raise UserMovingError()
+        return placement.shard
+
+    async def lookup_email(self, db: AsyncSession, email: str) -> int | None:
+        result = await db.execute(
+            select(UserDirectory.user_id).where(UserDirectory.email == email)
+        )
+        return result.scalar_one_or_none()
+
+    async def register(self, email: str) -> int | None:
+        """Allocate a global user id for ``email`` and place it on a shard.
+
+        Commits at once, so the email is claimed before the shard write; the
+        caller must ``unregister`` the id if that write never commits. Returns
+        None if the email is already taken.
+        """
+        async with get_databases().session_factory() as db:
+            entry = UserDirectory(email=email, shard=0)
+            db.add(entry)
+            try:
+                await db.flush()
+            except IntegrityError:
+                return None
+            entry.shard = self.initial_shard(entry.user_id)
+            await db.commit()
+        return entry.user_id
+
+    async def unregister(self, user_id: int) -> None:
+        """Free an id whose registration failed on its shard."""
+        try:
+            async with get_databases().session_factory() as db:
+                await db.execute(
+                    delete(UserDirectory).where(UserDirectory.user_id == user_id)
+                )
+                await db.commit()
+        except Exception:
+            logger.exception("Failed to release directory entry %s", user_id)
+        await self.forget(user_id)
+
+    async def forget(self, user_id: int) -> None:
+        await get_cache().delete(self._cache_key(user_id))
+
+
+shard_map = ShardMap(max(len(settings.DATABASE_SHARD_URLS), 1))
+
+
+async def bind_session_user(db: AsyncSession, user_id: int) -> None:
+    """Point ``db`` at ``user_id``'s shard.
+
+    Must run before the session's first query for that user's data.
+    """
+    db.info["shard"] = await shard_map.shard_for(db, user_id)
+
+
+@asynccontextmanager
+async def shard_session(shard: int) -> AsyncIterator[AsyncSession]:
+    """Read-write session on one shard, for jobs that sweep every shard."""
+    async with get_databases().session_factory(info={"shard": shard}) as session:
+        yield session
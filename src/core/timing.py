@@ -0,0 +1,65 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, ExceptionContext
+
+
+@dataclass(slots=True)
+class RequestTimings:
+    """Seconds spent in each section of the current request."""
+
+    db: float = 0.0
+    db_queries: int = 0
+    auth: float = 0.0
+
+
+timings_var: ContextVar[RequestTimings | None] = ContextVar("timings", default=None)
+
+
+@contextmanager
+def track_auth() -> Iterator[None]:
+    timings = timings_var.get()
+    if timings is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        timings.auth += perf_counter() - start
+
+
+def _before_cursor_execute(
+    conn: Any, cursor: Any, statement: Any, parameters: Any, context: Any, *args: Any
+) -> None:
+    conn.info.setdefault("query_start", []).append((context, perf_counter()))
+
+
+def _after_cursor_execute(conn: Any, *args: Any) -> None:
+    _, start = conn.info["query_start"].pop()
+    timings = timings_var.get()
+    if timings is not None:
+        timings.db += perf_counter() - start
+        timings.db_queries += 1
+
+
+def _handle_error(context: ExceptionContext) -> None:
+    # A failed query never reaches after_cursor_execute; drop its start time.
+    if context.connection is None:
+        return
+    starts = context.connection.info.get("query_start")
+    if starts and starts[-1][0] is context.execution_context:
+        starts.pop()
+
+
+def instrument_engines() -> None:
+    """Attribute cursor execution time on every engine to the current request."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
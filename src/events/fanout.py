@@ -0,0 +1,146 @@
+import asyncio
+import os
+import socket
+import stat
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from pathlib import Path
+
+from src.core.config import get_settings
+from src.core.metrics import metrics
+from src.events.schemas import Event
+
+Deliver = Callable[[Event], None]
+
+
+class FanoutBackend(ABC):
+    """Relays events published in one worker process to the others."""
+
+    @abstractmethod
+    async def start(self, deliver: Deliver) -> None:
+        """Begin passing events from other workers to ``deliver``."""
+
+    @abstractmethod
+    def publish(self, event: Event) -> None:
+        """Send ``event`` to the other workers without blocking."""
+
+    @abstractmethod
+    async def stop(self) -> None: ...
+
+
+class LocalFanout(FanoutBackend):
+    """Single worker: events never leave the process."""
+
+    async def start(self, deliver: Deliver) -> None:
+        pass
+
+    def publish(self, event: Event) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class UnixSocketFanout(FanoutBackend):
+    """Workers on one host, each bound to a datagram socket in ``directory``.
+
+    Publishing sends one datagram per peer and never blocks: if a peer's
+    buffer is full, or the event is larger than a datagram, that peer misses
+    the event. Sockets left behind by dead workers are removed on first use.
+    The peer list is re-read when the directory changes, and at least every
+    ``PEERS_MAX_AGE`` seconds since its mtime is coarse. Anyone who can
+    write to ``directory`` could inject events, so it must be private to the
+    app's user: it is created 0700, and an existing one that isn't owned by
+    the user or is open to others is refused.
+    """
+
+    MAX_DATAGRAM = 262_144
+    PEERS_MAX_AGE = 1.0
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+        self.path = self.directory / f"{os.getpid()}.sock"
+        self._sock: socket.socket | None = None
+        self._peers: list[str] = []
+        self._peers_mtime: int | None = None
+        self._peers_read_at = 0.0
+
+    def _check_directory(self) -> None:
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        info = self.directory.lstat()
+        if (
+            not stat.S_ISDIR(info.st_mode)
+            or info.st_uid != os.getuid()
+            or info.st_mode & 0o077
+        ):
+            raise RuntimeError(
+                f"{self.directory} must be a directory owned by this user "
+                "and closed to others (mode 0700)"
+            )
+
+    def _current_peers(self) -> list[str]:
+        mtime = self.directory.stat().st_mtime_ns
+        now = time.monotonic()
+        if mtime != self._peers_mtime or now - self._peers_read_at > self.PEERS_MAX_AGE:
+            self._peers_mtime = mtime
+            self._peers_read_at = now
+            self._peers = [
+                str(peer) for peer in self.directory.glob("*.sock") if peer != self.path
+            ]
+        return self._peers
+
+    async def start(self, deliver: Deliver) -> None:
+        self._check_directory()
+        self.path.unlink(missing_ok=True)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(str(self.path))
+        sock.setblocking(False)
+        self._sock = sock
+
+        def on_readable() -> None:
+            while True:
+                try:
+                    raw = sock.recv(self.MAX_DATAGRAM)
+                except BlockingIOError:
+                    return
+                deliver(Event.decode(raw))
+
+        asyncio.get_running_loop().add_reader(sock.fileno(), on_readable)
+
+    def publish(self, event: Event) -> None:
+        if self._sock is None:
+            return
+        raw = event.encode()
+        for peer in self._current_peers():
+            try:
+                self._sock.sendto(raw, peer)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Changes the directory, so the next publish re-reads it.
+                Path(peer).unlink(missing_ok=True)
+            except OSError:
+                metrics.incr("events.fanout_dropped")
+
+    async def stop(self) -> None:
+        if self._sock is None:
+            return
+        asyncio.get_running_loop().remove_reader(self._sock.fileno())
+        self._sock.close()
+        self._sock = None
+        self.path.unlink(missing_ok=True)
+
+
+def default_socket_dir() -> Path:
+    """``$XDG_RUNTIME_DIR/todo-api-events``, else a per-user temp directory."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "todo-api-events"
+    return Path(tempfile.gettempdir()) / f"todo-api-events-{os.getuid()}"
+
+
+def build_fanout_backend() -> FanoutBackend:
+    settings = get_settings()
+    if settings.EVENTS_FANOUT == "unix":
+        return UnixSocketFanout(settings.EVENTS_SOCKET_DIR or default_socket_dir())
+    return LocalFanout()
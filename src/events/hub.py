@@ -0,0 +1,138 @@
+import asyncio
+import contextlib
+from collections import defaultdict
+from collections.abc import Callable, Coroutine, Iterator
+from functools import partial
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.cache import apply_relayed_invalidation, set_invalidation_relay
+from src.core.config import get_settings
+from src.core.database import on_commit
+from src.core.metrics import metrics
+from src.events.fanout import FanoutBackend
+from src.events.schemas import Event
+from src.reminders.scheduler import reminders
+
+# Relayed between workers only, never sent to streams.
+CACHE_INVALIDATED = "cache.invalidated"
+REMINDER_RESCHEDULED = "reminder.rescheduled"
+
+
+class Subscription:
+    """One open event stream, buffering at most ``max_buffer`` events.
+
+    A stream that falls further behind is dropped rather than buffered
+    without bound: ``get`` then returns None and the client reconnects and
+    refetches.
+    """
+
+    def __init__(self, max_buffer: int) -> None:
+        self._queue: asyncio.Queue[Event | None] = asyncio.Queue(max_buffer)
+        self.dropped = False
+
+    def offer(self, event: Event) -> bool:
+        """Buffer ``event``; return False if that dropped the subscription."""
+        if self.dropped:
+            return True
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped = True
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(None)
+            return False
+        return True
+
+    async def get(self) -> Event | None:
+        return await self._queue.get()
+
+
+class EventHub:
+    """In-process pub/sub from committed writes to open event streams.
+
+    Event types with a handler (see ``handle``) are internal messages between
+    workers: ``relay`` sends them to the other workers, whose hub passes them
+    to the handler instead of to streams.
+    """
+
+    def __init__(self, buffer_size: int) -> None:
+        self.buffer_size = buffer_size
+        self._subscriptions: defaultdict[int, set[Subscription]] = defaultdict(set)
+        self._fanout: FanoutBackend | None = None
+        self._handlers: dict[str, Callable[[Event], Coroutine[Any, Any, None]]] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def __len__(self) -> int:
+        return sum(len(subs) for subs in self._subscriptions.values())
+
+    @contextlib.contextmanager
+    def subscribe(self, user_id: int) -> Iterator[Subscription]:
+        subscription = Subscription(self.buffer_size)
+        self._subscriptions[user_id].add(subscription)
+        try:
+            yield subscription
+        finally:
+            subs = self._subscriptions[user_id]
+            subs.discard(subscription)
+            if not subs:
+                del self._subscriptions[user_id]
+
+    def publish(self, event: Event) -> None:
+        self.deliver(event)
+        if self._fanout is not None:
+            self._fanout.publish(event)
+
+    def relay(self, event: Event) -> None:
+        """Send ``event`` to the other workers only."""
+        if self._fanout is not None:
+            self._fanout.publish(event)
+
+    def handle(
+        self, type: str, handler: Callable[[Event], Coroutine[Any, Any, None]]
+    ) -> None:
+        """Pass relayed events of ``type`` to ``handler`` instead of streams."""
+        self._handlers[type] = handler
+
+    def deliver(self, event: Event) -> None:
+        """Hand ``event`` to this process's streams only."""
+        handler = self._handlers.get(event.type)
+        if handler is not None:
+            task = asyncio.create_task(handler(event))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            return
+        for subscription in self._subscriptions.get(event.user_id, ()):
+            if not subscription.offer(event):
+                metrics.incr("events.dropped_subscribers")
+
+    async def start(self, fanout: FanoutBackend) -> None:
+        await fanout.start(self.deliver)
+        self._fanout = fanout
+
+    async def stop(self) -> None:
+        if self._fanout is not None:
+            await self._fanout.stop()
+            self._fanout = None
+
+
+def publish_on_commit(db: AsyncSession, event: Event) -> None:
+    on_commit(db, partial(hub.publish, event))
+
+
+hub = EventHub(get_settings().EVENTS_BUFFER_SIZE)
+metrics.register_gauge("events.subscriptions", lambda: len(hub))
+
+# Other workers' commits retire this worker's cached results too.
+hub.handle(CACHE_INVALIDATED, lambda event: apply_relayed_invalidation(event.user_id))
+set_invalidation_relay(
+    lambda user_id: hub.relay(Event(user_id, CACHE_INVALIDATED, "null"))
+)
+
+# The worker running the reminder scheduler applies other workers' writes.
+hub.handle(REMINDER_RESCHEDULED, lambda event: reminders.apply_relayed(event.data))
+reminders.set_relay(
+    lambda user_id, message: hub.relay(Event(user_id, REMINDER_RESCHEDULED, message))
+)
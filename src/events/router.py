@@ -0,0 +1,116 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+
+from src.auth.dependencies import get_stream_user, verify_access_token
+from src.auth.revocation import revocations
+from src.auth.schemas import CurrentUser
+from src.core.config import get_settings
+from src.core.exceptions import AppException
+from src.events.hub import Subscription, hub
+from src.events.schemas import Event
+
+router = APIRouter()
+
+settings = get_settings()
+
+WS_AUTH_TIMEOUT_SECONDS = 10.0
+
+
+async def next_events(
+    subscription: Subscription, user: CurrentUser
+) -> AsyncIterator[Event | None]:
+    """Yield events, or None after each idle keepalive interval.
+
+    Ends when the subscription is dropped, the access token expires or the
+    user's session is revoked (by logout or by closing the account), so a
+    stream never outlives the token it was opened with; the client reconnects
+    with a fresh one.
+    """
+    while True:
+        timeout = settings.EVENTS_KEEPALIVE_SECONDS
+        if user.expires_at is not None:
+            timeout = min(timeout, max(user.expires_at - time.time(), 0))
+        try:
+            event = await asyncio.wait_for(subscription.get(), timeout)
+        except TimeoutError:
+            event = None
+        else:
+            if event is None:
+                return
+        if user.expires_at is not None and user.expires_at <= time.time():
+            return
+        if user.session_id is not None and user.session_id in revocations:
+            return
+        yield event
+
+
+async def sse_stream(user: CurrentUser) -> AsyncIterator[str]:
+    with hub.subscribe(user.id) as subscription:
+        yield ": connected\n\n"
+        async for event in next_events(subscription, user):
+            yield ": keepalive\n\n" if event is None else event.to_sse()
+
+
+@router.get(
+    "/events",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def todo_events(
+    current_user: Annotated[CurrentUser, Depends(get_stream_user)],
+) -> StreamingResponse:
+    """Stream the current user's todo and category changes as Server-Sent Events."""
+    return StreamingResponse(
+        sse_stream(current_user),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/events/ws")
+async def todo_events_ws(websocket: WebSocket) -> None:
+    """WebSocket variant of ``/events``.
+
+    Browsers cannot set headers on a WebSocket, and query strings end up in
+    access logs, so the first message from the client is the access token.
+    """
+    await websocket.accept()
+    try:
+        token = await asyncio.wait_for(
+            websocket.receive_text(), WS_AUTH_TIMEOUT_SECONDS
+        )
+        user = verify_access_token(token)
+    except WebSocketDisconnect:
+        return
+    except (AppException, TimeoutError):
+        await websocket.close(status.WS_1008_POLICY_VIOLATION)
+        return
+
+    with hub.subscribe(user.id) as subscription:
+
+        async def forward() -> None:
+            async for event in next_events(subscription, user):
+                if event is not None:
+                    await websocket.send_text(event.to_json())
+            await websocket.close()
+
+        async def wait_for_disconnect() -> None:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+
+        tasks = {
+            asyncio.create_task(forward()),
+            asyncio.create_task(wait_for_disconnect()),
+        }
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,38 @@
+from dataclasses import dataclass
+from typing import Self
+
+from pydantic import BaseModel
+
+
+@dataclass(frozen=True, slots=True)
+class Event:
+    """A committed change, pushed to the owner's open event streams.
+
+    ``data`` is already JSON, encoded once however many streams receive it.
+    """
+
+    user_id: int
+    type: str  # "todo.created", "category.deleted", ...
+    data: str
+
+    @classmethod
+    def of(cls, user_id: int, type: str, snapshot: BaseModel) -> Self:
+        return cls(user_id, type, snapshot.model_dump_json())
+
+    @classmethod
+    def deleted(cls, user_id: int, type: str, id: int) -> Self:
+        return cls(user_id, type, f'{{"id":{id}}}')
+
+    def to_sse(self) -> str:
+        return f"event: {self.type}\ndata: {self.data}\n\n"
+
+    def to_json(self) -> str:
+        return f'{{"type":"{self.type}","data":{self.data}}}'
+
+    def encode(self) -> bytes:
+        return f"{self.user_id}\n{self.type}\n{self.data}".encode()
+
+    @classmethod
+    def decode(cls, raw: bytes) -> Self:
+        user_id, type, data = raw.decode().split("\n", 2)
+        return cls(int(user_id), type, data)
@@ -1,32 +1,104 @@
+import asyncio
 import logging
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 from datetime import UTC, datetime
+from functools import partial
 
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 
+from src.auth.revocation import revocations
+from src.auth.revocation import run_purge as purge_refresh_tokens
 from src.auth.router import router as auth_router
+from src.auth.service import create_access_token, decode_access_token
 from src.categories.router import router as categories_router
+from src.categories.service import CategoryService
 from src.core.config import get_settings
+from src.core.database import (
+    Databases,
+    LastWriteCookieMiddleware,
+    dispose_databases,
+    get_databases,
+)
 from src.core.exceptions import AppException
+from src.core.idempotency import run_purge as purge_idempotency_keys
+from src.core.leases import run_with_lease
+from src.core.logging import configure_logging
+from src.core.metrics import metrics
+from src.core.middleware import RequestContextMiddleware
 from src.core.schemas import ErrorResponse, HealthResponse
+from src.core.timing import instrument_engines
+from src.events.fanout import build_fanout_backend
+from src.events.hub import hub
+from src.events.router import router as events_router
+from src.outbox.worker import outbox_worker
+from src.reminders.scheduler import REMINDERS_LEASE, reminders
+from src.tags.router import router as tags_router
+from src.todos.archive import ARCHIVE_LEASE, run_archiver
 from src.todos.router import router as todos_router
+from src.todos.service import TodoService
+from src.webhooks.delivery import dispatcher as webhook_dispatcher
+from src.webhooks.router import router as webhooks_router
 
 settings = get_settings()
 
-logging.basicConfig(
-    level=logging.INFO if settings.is_production else logging.DEBUG,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
+configure_logging(settings)
+instrument_engines()
 logger = logging.getLogger(__name__)
 
 
+async def warm_up(databases: Databases) -> None:
+    # Build the token codec (importing python-jose if that backend is set).
+    decode_access_token(create_access_token(0))
+    await databases.warm_up(settings.DB_POOL_WARMUP)
+    await revocations.sync()
+    # Run the hot read queries once per shard so real requests find them in
+    # SQLAlchemy's compiled statement cache.
+    for shard in range(len(databases.shards)):
+        async with databases.read_session_factory(info={"shard": shard}) as db:
+            await TodoService(db).list_by_user(0)
+            await CategoryService(db).list_by_user(0)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     logger.info("Starting application...")
+    # Engines are created here, not at import, so importing the app stays
+    # cheap. Workers report ready only after startup, so a reload never
+    # routes traffic to a cold worker.
+    await warm_up(get_databases())
+    await hub.start(build_fanout_backend())
+    background = [
+        asyncio.create_task(revocations.run(settings.REVOCATION_SYNC_SECONDS)),
+        asyncio.create_task(purge_idempotency_keys(settings.IDEMPOTENCY_PURGE_SECONDS)),
+        asyncio.create_task(purge_refresh_tokens(settings.REFRESH_TOKEN_PURGE_SECONDS)),
+    ]
+    if settings.REMINDERS_ENABLED:
+        background.append(
+            asyncio.create_task(run_with_lease(REMINDERS_LEASE, reminders.run))
+        )
+    if settings.OUTBOX_WORKER_ENABLED:
+        background.append(asyncio.create_task(outbox_worker.run()))
+    if settings.ARCHIVE_ENABLED:
+        background.append(
+            asyncio.create_task(
+                run_with_lease(
+                    ARCHIVE_LEASE,
+                    partial(run_archiver, settings.ARCHIVE_INTERVAL_SECONDS),
+                )
+            )
+        )
     yield
     logger.info("Shutting down application...")
+    for task in background:
+        task.cancel()
+    # Let them unwind before the hub, the webhook client and the engines they
+    # use are closed under them.
+    await asyncio.gather(*background, return_exceptions=True)
+    await hub.stop()
+    await webhook_dispatcher.close()
+    await dispose_databases()
 
 
 app = FastAPI(
@@ -37,6 +109,8 @@ app = FastAPI(
     redoc_url=None if settings.is_production else "/redoc",
     lifespan=lifespan,
 )
+app.add_middleware(LastWriteCookieMiddleware)
+app.add_middleware(RequestContextMiddleware, access_log=settings.ACCESS_LOG)
 
 
 @app.exception_handler(AppException)
@@ -50,13 +124,12 @@ async def app_exception_handler(request: Request, exc: AppException) -> JSONResp
     return JSONResponse(
         status_code=exc.status_code,
         content=ErrorResponse(detail=exc.message, code=exc.code).model_dump(),
+        headers=exc.headers,
     )
 
 
 @app.exception_handler(Exception)
-async def unhandled_exception_handler(
-    request: Request, exc: Exception
-) -> JSONResponse:
+async def unhandled_exception_handler(request: Request, exc: Exception) -> JSONResponse:
     logger.exception("Unhandled exception: %s - %s", type(exc).__name__, request.url)
     return JSONResponse(
         status_code=500,
@@ -72,7 +145,16 @@ async def health_check() -> HealthResponse:
     return HealthResponse(status="ok", timestamp=datetime.now(UTC))
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics() -> dict[str, float]:
+    return metrics.snapshot()
+
+
 # Mount routers
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(categories_router, prefix="/categories", tags=["categories"])
+# Before the todos router, whose /{todo_id} would shadow /events.
+app.include_router(events_router, prefix="/todos", tags=["events"])
 app.include_router(todos_router, prefix="/todos", tags=["todos"])
+app.include_router(tags_router, prefix="/tags", tags=["tags"])
+app.include_router(webhooks_router, prefix="/webhooks", tags=["webhooks"])
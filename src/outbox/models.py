@@ -0,0 +1,38 @@
+from datetime import UTC, datetime
+
+from sqlalchemy import Index, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.core.database import Base, UTCDateTime
+
+
+class OutboxMessage(Base):
+    """Work to do after a write, inserted in the write's own transaction.
+
+    A message is claimed by pushing ``available_at`` past the claim's lease,
+    deleted once handled, and retried from ``available_at`` otherwise. After
+    too many attempts ``failed_at`` is set and the message is kept for
+    inspection.
+    """
+
+    __tablename__ = "outbox"
+    __table_args__ = (Index("ix_outbox_available_at", "available_at"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # No foreign key: messages about a user outlive the user's rows.
+    user_id: Mapped[int]
+    topic: Mapped[str] = mapped_column(String(100))
+    payload: Mapped[str] = mapped_column(Text)  # JSON
+    attempts: Mapped[int] = mapped_column(default=0, server_default="0")
+    last_error: Mapped[str | None] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(
+        UTCDateTime,
+        default=lambda: datetime.now(UTC),
+        server_default=func.now(),
+    )
+    available_at: Mapped[datetime] = mapped_column(
+        UTCDateTime,
+        default=lambda: datetime.now(UTC),
+        server_default=func.now(),
+    )
+    failed_at: Mapped[datetime | None] = mapped_column(UTCDateTime)
@@ -0,0 +1,61 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Iterable, Sequence
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.database import on_commit
+from src.events.schemas import Event
+from src.outbox.models import OutboxMessage
+
+
+@dataclass(frozen=True, slots=True)
+class OutboxEntry:
+    id: int
+    user_id: int
+    topic: str
+    payload: str  # JSON
+    attempts: int
+    created_at: datetime
+    shard: int
+
+
+# Called with the claimed messages on the handler's topics, in commit order.
+# Delivery is at least once, so handlers must be idempotent; raising retries
+# every message passed in, except with PartialFailure.
+Handler = Callable[[Sequence[OutboxEntry]], Awaitable[None]]
+
+
+class PartialFailure(Exception):
+    """Raised by a handler to retry only some of its messages."""
+
+    def __init__(self, errors: dict[int, str]) -> None:
+        super().__init__(f"{len(errors)} messages failed")
+        self.errors = errors  # by message id
+
+
+_handlers: list[tuple[frozenset[str], Handler]] = []
+
+# Set when messages are committed, so idle workers in this process need not
+# wait for their next poll.
+wakeups: set[asyncio.Event] = set()
+
+
+def register_handler(topics: Iterable[str], handler: Handler) -> None:
+    _handlers.append((frozenset(topics), handler))
+
+
+def get_handlers() -> list[tuple[frozenset[str], Handler]]:
+    return _handlers
+
+
+def enqueue(db: AsyncSession, event: Event) -> None:
+    """Queue ``event`` for the outbox workers in ``db``'s transaction."""
+    db.add(OutboxMessage(user_id=event.user_id, topic=event.type, payload=event.data))
+    on_commit(db, wake_workers)
+
+
+def wake_workers() -> None:
+    for wakeup in wakeups:
+        wakeup.set()
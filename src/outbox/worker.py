@@ -0,0 +1,266 @@
+"""Process outbox messages.
+
+    uv run python -m src.outbox.worker --concurrency 4
+
+Workers run inside each app process (``OUTBOX_WORKER_ENABLED``) or as this
+separate command; any number of them can share the outbox. A claim moves
+``available_at`` past a lease, in one ``UPDATE`` whose subquery uses
+``FOR UPDATE SKIP LOCKED`` on PostgreSQL, so concurrent claims pass over
+each other's rows instead of waiting. SQLite has no row locks but runs each
+write statement alone, so the same ``UPDATE`` claims atomically there. A
+worker that dies mid-batch loses only its lease: the messages reappear once
+it expires.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import random
+import time
+from collections import deque
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import get_settings
+from src.core.database import dispose_databases, get_databases
+from src.core.metrics import metrics
+from src.outbox.models import OutboxMessage
+from src.outbox.service import OutboxEntry, PartialFailure, get_handlers, wakeups
+
+logger = logging.getLogger(__name__)
+
+THROUGHPUT_WINDOW_SECONDS = 60.0
+
+
+class OutboxWorker:
+    """A pool of ``concurrency`` tasks, each claiming batches from every shard."""
+
+    def __init__(
+        self,
+        concurrency: int,
+        batch_size: int,
+        lease_seconds: float,
+        poll_seconds: float,
+        max_attempts: int,
+        backoff_base_seconds: float,
+        backoff_max_seconds: float,
+    ) -> None:
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        # Age of the oldest message in the latest claimed batch.
+        self.lag_seconds = 0.0
+        self._processed: deque[tuple[float, int]] = deque()
+
+    def throughput(self, now: float | None = None) -> float:
+        """Messages handled per second over the last minute."""
+        cutoff = (now or time.monotonic()) - THROUGHPUT_WINDOW_SECONDS
+        while self._processed and self._processed[0][0] < cutoff:
+            self._processed.popleft()
+        return sum(n for _, n in self._processed) / THROUGHPUT_WINDOW_SECONDS
+
+    def backoff(self, attempts: int) -> float:
+        delay = self.backoff_base_seconds * 2.0 ** (attempts - 1)
+        # Jitter spreads out retries of messages that failed together.
+        return min(delay, self.backoff_max_seconds) * random.uniform(0.5, 1)
+
+    async def claim(self, db: AsyncSession) -> list[OutboxEntry]:
+        now = datetime.now(UTC)
+        due = (
+            select(OutboxMessage.id)
+            .where(OutboxMessage.available_at <= now, OutboxMessage.failed_at.is_(None))
+            .order_by(OutboxMessage.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = await db.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(due.scalar_subquery()))
+            .values(
+                available_at=now + timedelta(seconds=self.lease_seconds),
+                attempts=OutboxMessage.attempts + 1,
+            )
+            .returning(
+                OutboxMessage.id,
+                OutboxMessage.user_id,
+                OutboxMessage.topic,
+                OutboxMessage.payload,
+                OutboxMessage.attempts,
+                OutboxMessage.created_at,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        shard = db.info.get("shard", 0)
+        entries = sorted(
+            (
+                OutboxEntry(
+                    id=row.id,
+                    user_id=row.user_id,
+                    topic=row.topic,
+                    payload=row.payload,
+                    attempts=row.attempts,
+                    created_at=row.created_at,
+                    shard=shard,
+                )
+                for row in result
+            ),
+            key=lambda e: e.id,
+        )
+        await db.commit()
+        if entries:
+            oldest = min(entry.created_at for entry in entries)
+            self.lag_seconds = (now - oldest).total_seconds()
+            metrics.incr("outbox.claimed", len(entries))
+        return entries
+
+    async def handle(self, entries: list[OutboxEntry]) -> dict[int, str]:
+        """Run the handlers; return errors by message id."""
+        errors: dict[int, str] = {}
+        for topics, handler in get_handlers():
+            batch = [entry for entry in entries if entry.topic in topics]
+            if not batch:
+                continue
+            try:
+                await handler(batch)
+            except PartialFailure as exc:
+                logger.warning("Outbox handler %s failed: %s", handler, exc)
+                errors.update(exc.errors)
+            except Exception as exc:
+                logger.exception("Outbox handler %s failed", handler)
+                errors.update((entry.id, repr(exc)) for entry in batch)
+        return errors
+
+    async def finish(
+        self, db: AsyncSession, entries: list[OutboxEntry], errors: dict[int, str]
+    ) -> None:
+        """Delete handled messages and schedule retries for the rest."""
+        now = datetime.now(UTC)
+        done = [entry.id for entry in entries if entry.id not in errors]
+        if done:
+            await db.execute(
+                delete(OutboxMessage)
+                .where(OutboxMessage.id.in_(done))
+                .execution_options(synchronize_session=False)
+            )
+        for entry in entries:
+            if entry.id not in errors:
+                continue
+            values: dict[str, object] = {"last_error": errors[entry.id]}
+            if entry.attempts >= self.max_attempts:
+                values["failed_at"] = now
+                metrics.incr("outbox.dead")
+            else:
+                retry_in = self.backoff(entry.attempts)
+                values["available_at"] = now + timedelta(seconds=retry_in)
+                metrics.incr("outbox.retried")
+            await db.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id == entry.id)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+        await db.commit()
+        metrics.incr("outbox.processed", len(done))
+        self._processed.append((time.monotonic(), len(done)))
+
+    async def run_once(self, shard: int = 0) -> int:
+        """Claim and process one batch from ``shard``; return its size."""
+        session_factory = get_databases().session_factory
+        async with session_factory(info={"shard": shard}) as db:
+            entries = await self.claim(db)
+        if not entries:
+            return 0
+        errors = await self.handle(entries)
+        async with session_factory(info={"shard": shard}) as db:
+            await self.finish(db, entries, errors)
+        return len(entries)
+
+    async def _work(self, wakeup: asyncio.Event) -> None:
+        while True:
+            wakeup.clear()
+            claimed = 0
+            for shard in range(len(get_databases().shards)):
+                try:
+                    claimed += await self.run_once(shard)
+                except Exception:
+                    logger.exception("Outbox batch failed on shard %d", shard)
+            if claimed == 0:
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(wakeup.wait(), self.poll_seconds)
+
+    async def run(self) -> None:
+        """Process messages until cancelled."""
+        wakeup = asyncio.Event()
+        wakeups.add(wakeup)
+        try:
+            async with asyncio.TaskGroup() as tasks:
+                for _ in range(self.concurrency):
+                    tasks.create_task(self._work(wakeup))
+        finally:
+            wakeups.discard(wakeup)
+
+
+def build_outbox_worker() -> OutboxWorker:
+    settings = get_settings()
+    return OutboxWorker(
+        concurrency=settings.OUTBOX_CONCURRENCY,
+        batch_size=settings.OUTBOX_BATCH_SIZE,
+        lease_seconds=settings.OUTBOX_LEASE_SECONDS,
+        poll_seconds=settings.OUTBOX_POLL_SECONDS,
+        max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+        backoff_base_seconds=settings.OUTBOX_BACKOFF_BASE_SECONDS,
+        backoff_max_seconds=settings.OUTBOX_BACKOFF_MAX_SECONDS,
+    )
+
+
+outbox_worker = build_outbox_worker()
+metrics.register_gauge("outbox.lag_seconds", lambda: outbox_worker.lag_seconds)
+metrics.register_gauge("outbox.throughput", outbox_worker.throughput)
+
+
+async def report(worker: OutboxWorker) -> None:
+    """Log the metrics a standalone worker cannot serve on ``/metrics``."""
+    while True:
+        await asyncio.sleep(THROUGHPUT_WINDOW_SECONDS)
+        logger.info(
+            "Outbox: %.1f messages/s, lag %.1fs",
+            worker.throughput(),
+            worker.lag_seconds,
+        )
+
+
+async def run(concurrency: int | None) -> None:
+    # Import the app so the worker has the same models and handlers.
+    import src.main  # noqa: F401
+    from src.events.fanout import build_fanout_backend
+    from src.events.hub import hub
+
+    if concurrency:
+        outbox_worker.concurrency = concurrency
+    # Relays this worker's commits, e.g. reranks, to the app workers' caches.
+    await hub.start(build_fanout_backend())
+    reporter = asyncio.create_task(report(outbox_worker))
+    try:
+        await outbox_worker.run()
+    finally:
+        reporter.cancel()
+        await hub.stop()
+        await dispose_databases()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--concurrency", type=int, help="default: OUTBOX_CONCURRENCY")
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import asyncio
+import contextlib
+import heapq
+import json
+import logging
+from collections.abc import Callable
+from datetime import UTC, date, datetime, timedelta
+
+from sqlalchemy import select, tuple_
+
+from src.core.config import get_settings
+from src.core.database import get_databases
+from src.core.metrics import metrics
+from src.reminders.sinks import Reminder, get_reminder_sink
+from src.todos.models import Todo, TodoStatus
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = [TodoStatus.PENDING.value, TodoStatus.IN_PROGRESS.value]
+
+# Name of the lease whose holder runs the scheduler (see src.core.leases).
+REMINDERS_LEASE = "reminders"
+
+# Sends a reschedule, as (user_id, JSON message), to the other workers.
+Relay = Callable[[int, str], None]
+
+
+class ReminderScheduler:
+    """Fire a reminder ``lead`` before the start (UTC) of each open todo's due date.
+
+    Only reminders due within ``horizon`` are held, in a heap keyed by fire
+    time. The window is loaded in ``(due_date, id)`` order through the
+    ``(due_date, status)`` index and reloaded every ``reload_interval``, which
+    also picks up writes made by other processes. Writes committed through
+    ``TodoService`` apply immediately via ``reschedule``, which also relays
+    them to the other workers (see ``set_relay``), so the one running the
+    scheduler applies them whichever worker made them.
+
+    Delivery is at most once: a reminder whose fire time passed while the
+    scheduler was stopped is not sent, and a failed send is not retried. The
+    app runs ``run`` only in the worker holding ``REMINDERS_LEASE``, so each
+    reminder is sent by one process.
+    """
+
+    def __init__(
+        self,
+        lead: timedelta,
+        horizon: timedelta,
+        reload_interval: float,
+        batch_size: int,
+    ) -> None:
+        self.lead = lead
+        self.horizon = horizon
+        self.reload_interval = reload_interval
+        self.batch_size = batch_size
+        # By todo id, unique across shards.
+        self._entries: dict[int, Reminder] = {}
+        # May hold stale items: an item only fires if its todo is still in
+        # _entries with the same fire time.
+        self._heap: list[tuple[datetime, int]] = []
+        self._loaded_through: date | None = None
+        self._touched: set[int] | None = None
+        self._wakeup = asyncio.Event()
+        self._relay: Relay | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def fire_at(self, due_date: date) -> datetime:
+        return (
+            datetime(due_date.year, due_date.month, due_date.day, tzinfo=UTC)
+            - self.lead
+        )
+
+    def set_relay(self, relay: Relay | None) -> None:
+        """Install how committed reschedules reach the other worker processes."""
+        self._relay = relay
+
+    def reschedule(self, user_id: int, todo_id: int, reminder: Reminder | None) -> None:
+        """Replace the reminder of a todo after a committed write, in every worker."""
+        self._apply(todo_id, reminder)
+        if self._relay is not None:
+            message = {
+                "todo_id": todo_id,
+                "reminder": None if reminder is None else reminder.to_dict(),
+            }
+            self._relay(user_id, json.dumps(message))
+
+    def cancel(self, user_id: int, todo_id: int) -> None:
+        self.reschedule(user_id, todo_id, None)
+
+    async def apply_relayed(self, message: str) -> None:
+        """Apply a reschedule relayed by another worker."""
+        data = json.loads(message)
+        reminder = data["reminder"]
+        self._apply(
+            data["todo_id"], None if reminder is None else Reminder.from_dict(reminder)
+        )
+
+    def _apply(self, todo_id: int, reminder: Reminder | None) -> None:
+        # A no-op unless this worker runs the scheduler.
+        if self._loaded_through is None:
+            return
+        if self._touched is not None:
+            self._touched.add(todo_id)
+        if (
+            reminder is None
+            or reminder.due_date > self._loaded_through
+            or self.fire_at(reminder.due_date) <= datetime.now(UTC)
+        ):
+            # Beyond the window: the reload that reaches it will load it.
+            self._entries.pop(todo_id, None)
+            return
+        self._entries[todo_id] = reminder
+        heapq.heappush(self._heap, (self.fire_at(reminder.due_date), todo_id))
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._rebuild_heap()
+        self._wakeup.set()
+
+    def _rebuild_heap(self) -> None:
+        self._heap = [
+            (self.fire_at(reminder.due_date), todo_id)
+            for todo_id, reminder in self._entries.items()
+        ]
+        heapq.heapify(self._heap)
+
+    async def reload(self, now: datetime | None = None) -> None:
+        """Replace the held reminders with those due in the window from now."""
+        now = now or datetime.now(UTC)
+        start = (now + self.lead).date()
+        through = (now + self.lead + self.horizon).date()
+        # Writes committed while loading may or may not be visible to the
+        # load; the reminder passed to reschedule wins for those todos.
+        self._loaded_through = through
+        self._touched = set()
+        try:
+            loaded = await self._load(start, through)
+        finally:
+            touched, self._touched = self._touched, None
+
+        entries = {
+            todo_id: reminder
+            for todo_id, reminder in loaded.items()
+            if todo_id not in touched and self.fire_at(reminder.due_date) > now
+        }
+        for todo_id in touched:
+            if todo_id in self._entries:
+                entries[todo_id] = self._entries[todo_id]
+        self._entries = entries
+        self._rebuild_heap()
+
+    async def _load(self, start: date, through: date) -> dict[int, Reminder]:
+        loaded: dict[int, Reminder] = {}
+        databases = get_databases()
+        for shard in range(len(databases.shards)):
+            async with databases.read_session_factory(info={"shard": shard}) as db:
+                after: tuple[date, int] = (start, 0)
+                while True:
+                    rows = (
+                        await db.execute(
+                            select(Todo.id, Todo.user_id, Todo.title, Todo.due_date)
+                            .where(
+                                Todo.due_date.between(start, through),
+                                Todo.status.in_(OPEN_STATUSES),
+                                tuple_(Todo.due_date, Todo.id) > after,
+                            )
+                            .order_by(Todo.due_date, Todo.id)
+                            .limit(self.batch_size)
+                        )
+                    ).all()
+                    for todo_id, user_id, title, due_date in rows:
+                        assert due_date is not None  # filtered on
+                        loaded[todo_id] = Reminder(todo_id, user_id, title, due_date)
+                    if len(rows) < self.batch_size:
+                        break
+                    after = (rows[-1].due_date, rows[-1].id)
+        return loaded
+
+    def pop_due(self, now: datetime | None = None) -> list[Reminder]:
+        now = now or datetime.now(UTC)
+        due: list[Reminder] = []
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, todo_id = heapq.heappop(self._heap)
+            reminder = self._entries.get(todo_id)
+            if reminder is not None and self.fire_at(reminder.due_date) == fire_at:
+                del self._entries[todo_id]
+                due.append(reminder)
+        return due
+
+    async def run(self) -> None:
+        """Load the window, then fire reminders until cancelled."""
+        next_reload = datetime.now(UTC)
+        try:
+            while True:
+                now = datetime.now(UTC)
+                if now >= next_reload:
+                    try:
+                        await self.reload(now)
+                    except Exception:
+                        # Keep firing what is held; retry next interval.
+                        logger.exception("Reminder reload failed")
+                    next_reload = now + timedelta(seconds=self.reload_interval)
+
+                due = self.pop_due(now)
+                if due:
+                    try:
+                        await get_reminder_sink().send(due)
+                        metrics.incr("reminders.sent", len(due))
+                    except Exception:
+                        logger.exception("Sending %d reminders failed", len(due))
+                        metrics.incr("reminders.failed", len(due))
+
+                wake_at = next_reload
+                if self._heap:
+                    wake_at = min(wake_at, self._heap[0][0])
+                timeout = max((wake_at - datetime.now(UTC)).total_seconds(), 0)
+                self._wakeup.clear()
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+        finally:
+            self._loaded_through = None
+
+
+def build_reminder_scheduler() -> ReminderScheduler:
+    settings = get_settings()
+    return ReminderScheduler(
+        lead=timedelta(hours=settings.REMINDER_LEAD_HOURS),
+        horizon=timedelta(hours=settings.REMINDER_HORIZON_HOURS),
+        reload_interval=settings.REMINDER_RELOAD_SECONDS,
+        batch_size=settings.REMINDER_BATCH_SIZE,
+    )
+
+
+reminders = build_reminder_scheduler()
+metrics.register_gauge("reminders.scheduled", lambda: len(reminders))
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Any, Self
+
+from src.core.config import get_settings
+from src.todos.models import Todo, TodoStatus
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Reminder:
+    todo_id: int
+    user_id: int
+    title: str
+    due_date: date
+
+    @classmethod
+    def for_todo(cls, todo: Todo) -> Self | None:
+        """The reminder ``todo`` should get, or None if it needs none."""
+        if todo.due_date is None or todo.status == TodoStatus.COMPLETED.value:
+            return None
+        return cls(todo.id, todo.user_id, todo.title, todo.due_date)
+
+    def to_dict(self) -> dict[str, int | str]:
+        return {
+            "todo_id": self.todo_id,
+            "user_id": self.user_id,
+            "title": self.title,
+            "due_date": self.due_date.isoformat(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Self:
+        return cls(
+            data["todo_id"],
+            data["user_id"],
+            data["title"],
+            date.fromisoformat(data["due_date"]),
+        )
+
+
+class ReminderSink(ABC):
+    """Delivers fired reminders (email, push, a queue, ...)."""
+
+    @abstractmethod
+    async def send(self, reminders: Sequence[Reminder]) -> None: ...
+
+
+class LogReminderSink(ReminderSink):
+    async def send(self, reminders: Sequence[Reminder]) -> None:
+        for reminder in reminders:
+            logger.info("Reminder: %s", reminder.to_dict())
+
+
+class FileReminderSink(ReminderSink):
+    """Append reminders to a file as JSON lines."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+
+    async def send(self, reminders: Sequence[Reminder]) -> None:
+        lines = "".join(json.dumps(r.to_dict()) + "\n" for r in reminders)
+        await asyncio.to_thread(self._append, lines)
+
+    def _append(self, lines: str) -> None:
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+class InMemoryReminderSink(ReminderSink):
+    def __init__(self) -> None:
+        self.sent: list[Reminder] = []
+
+    async def send(self, reminders: Sequence[Reminder]) -> None:
+        self.sent.extend(reminders)
+
+
+def build_reminder_sink() -> ReminderSink:
+    settings = get_settings()
+    if settings.REMINDER_SINK == "file":
+        return FileReminderSink(settings.REMINDER_FILE)
+    return LogReminderSink()
+
+
+_sink: ReminderSink | None = None
+
+
+def get_reminder_sink() -> ReminderSink:
+    global _sink
+    if _sink is None:
+        _sink = build_reminder_sink()
+    return _sink
+
+
+def set_reminder_sink(sink: ReminderSink | None) -> None:
+    global _sink
+    _sink = sink
@@ -0,0 +1,110 @@
+"""Production entry point: ``python -m src`` or the ``todo-api`` script.
+
+Runs ``src.main:app`` in ``WORKERS`` uvicorn processes sharing one listening
+socket. Signals to the parent process:
+
+- SIGHUP replaces the workers one at a time; each replacement finishes its
+  warm-up before the worker it replaces is stopped.
+- SIGTTIN / SIGTTOU add or remove a worker.
+- SIGTERM / SIGINT drain in-flight requests and exit.
+"""
+
+import argparse
+import logging
+import os
+import socket
+from importlib.util import find_spec
+
+from uvicorn import Config, Server
+from uvicorn.supervisors import ChangeReload, Multiprocess
+
+from src.core.config import get_settings
+
+APP = "src.main:app"
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def default_workers() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        # Respects CPU pinning, e.g. inside containers.
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if hasattr(socket, "SO_REUSEPORT"):
+        # A new server can bind the port while the old one drains, so
+        # deploys don't refuse connections.
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(prog="todo-api", description="Serve the API.")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument(
+        "--workers", type=int, default=settings.WORKERS or default_workers()
+    )
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=settings.WORKER_MAX_REQUESTS,
+        help="restart a worker after it has served this many requests",
+    )
+    parser.add_argument(
+        "--reload", action="store_true", help="restart on code changes (dev only)"
+    )
+    return parser.parse_args(argv)
+
+
+def build_config(args: argparse.Namespace) -> Config:
+    return Config(
+        APP,
+        host=args.host,
+        port=args.port,
+        workers=1 if args.reload else args.workers,
+        reload=args.reload,
+        # uvloop and httptools come with uvicorn[standard] but not on every
+        # platform; fall back to the pure-Python implementations.
+        loop="uvloop" if find_spec("uvloop") else "asyncio",
+        http="httptools" if find_spec("httptools") else "h11",
+        lifespan="on",
+        limit_max_requests=args.max_requests,
+        # RequestContextMiddleware writes the access log.
+        access_log=False,
+        server_header=False,
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    config = build_config(args)
+    sock = bind_socket(args.host, args.port)
+    settings = get_settings()
+    if config.workers > 1 and settings.EVENTS_FANOUT is None:
+        # Workers relay events and cache invalidations to each other.
+        os.environ["EVENTS_FANOUT"] = "unix"
+    elif config.workers > 1 and settings.EVENTS_FANOUT == "local":
+        # With a local fanout, no worker would hear of the others' writes.
+        if settings.CACHE_ENABLED:
+            logger.warning("EVENTS_FANOUT=local with several workers: no caching")
+        os.environ["CACHE_ENABLED"] = "false"
+    if config.should_reload:
+        ChangeReload(config, target=Server(config).run, sockets=[sock]).run()
+    elif config.workers > 1:
+        # Multiprocess also replaces workers that exit after --max-requests.
+        Multiprocess(config, sockets=[sock]).run()
+    else:
+        Server(config).run(sockets=[sock])
+
+
+if __name__ == "__main__":
+    main()
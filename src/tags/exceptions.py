@@ -0,0 +1,11 @@
+from src.core.exceptions import ConflictError, NotFoundError
+
+
+class TagNotFoundError(NotFoundError):
+    code = "TAG_NOT_FOUND"
+    message = "Tag not found"
+
+
+class TagExistsError(ConflictError):
+    code = "TAG_EXISTS"
+    message = "Tag already exists"
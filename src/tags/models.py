@@ -0,0 +1,50 @@
+from datetime import UTC, datetime
+
+from sqlalchemy import ForeignKey, Index, String, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.core.database import Base, UTCDateTime
+
+
+class Tag(Base):
+    __tablename__ = "tag"
+    __table_args__ = (
+        # Also the autocomplete index: a name prefix is one range of it.
+        UniqueConstraint("user_id", "name", name="uq_tag_user_name"),
+    )
+    __mapper_args__ = {"eager_defaults": True}
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("user.id", ondelete="CASCADE"), index=True
+    )
+    # Byte order on PostgreSQL too, as on SQLite, so that range is exact
+    # whatever the database's locale.
+    name: Mapped[str] = mapped_column(
+        String(50).with_variant(String(50, collation="C"), "postgresql")
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        UTCDateTime,
+        default=lambda: datetime.now(UTC),
+        server_default=func.now(),
+    )
+
+
+class TodoTag(Base):
+    """A tag on a todo, current or archived."""
+
+    __tablename__ = "todo_tag"
+    __table_args__ = (
+        # Tag filters: every todo with a tag, read from the index alone
+        Index("ix_todo_tag_tag_id_todo_id", "tag_id", "todo_id"),
+    )
+
+    # Not a foreign key: archived todos keep their id and their tags, so
+    # rows must outlive the todo's row in ``todo``. The reference is named
+    # for src.core.rebalance, which rewrites it like a foreign key.
+    todo_id: Mapped[int] = mapped_column(
+        primary_key=True, autoincrement=False, info={"references": "todo"}
+    )
+    tag_id: Mapped[int] = mapped_column(
+        ForeignKey("tag.id", ondelete="CASCADE"), primary_key=True
+    )
@@ -0,0 +1,105 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth.dependencies import get_current_user
+from src.auth.schemas import CurrentUser
+from src.core.database import get_db, get_read_db, read_only
+from src.core.idempotency import Idempotency
+from src.core.response_cache import cached_json_response
+from src.tags.models import Tag
+from src.tags.schemas import TagCreate, TagResponse, TagUpdate
+from src.tags.service import TagService
+
+router = APIRouter()
+
+tag_list_adapter = TypeAdapter(list[TagResponse])
+
+
+@router.get(
+    "",
+    response_model=list[TagResponse],
+)
+@read_only
+async def list_tags(
+    request: Request,
+    response: Response,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    prefix: str = Query(default="", max_length=50),
+    limit: int | None = Query(default=None, ge=1, le=100),
+) -> Response:
+    """List the current user's tags by name.
+
+    With ``prefix``, only tags starting with it, for autocomplete.
+    """
+
+    async def render() -> bytes:
+        tags = await TagService(db).list_by_user(current_user.id, prefix, limit)
+        return tag_list_adapter.dump_json(
+            [TagResponse.model_validate(tag) for tag in tags]
+        )
+
+    return await cached_json_response(request, response, current_user.id, render)
+
+
+@router.post(
+    "",
+    response_model=TagResponse,
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        409: {
+            "description": "Tag already exists, or request with this "
+            "Idempotency-Key in progress"
+        }
+    },
+)
+async def create_tag(
+    data: TagCreate,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    idempotency: Annotated[Idempotency, Depends()],
+) -> Response:
+    """Create a new tag."""
+
+    async def render() -> bytes:
+        tag = await TagService(db).create(data, current_user.id)
+        return TagResponse.model_validate(tag).model_dump_json().encode()
+
+    return await idempotency.run(
+        db, f"user:{current_user.id}", render, status.HTTP_201_CREATED
+    )
+
+
+@router.patch(
+    "/{tag_id}",
+    response_model=TagResponse,
+    responses={
+        404: {"description": "Tag not found"},
+        409: {"description": "Tag already exists"},
+    },
+)
+async def update_tag(
+    tag_id: int,
+    data: TagUpdate,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+) -> Tag:
+    """Rename a tag."""
+    return await TagService(db).update(tag_id, data, current_user.id)
+
+
+@router.delete(
+    "/{tag_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={404: {"description": "Tag not found"}},
+)
+async def delete_tag(
+    tag_id: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+) -> None:
+    """Delete a tag, removing it from its todos."""
+    await TagService(db).delete(tag_id, current_user.id)
@@ -0,0 +1,44 @@
+from datetime import datetime
+from enum import StrEnum
+from typing import Annotated
+
+from pydantic import StringConstraints
+
+from src.core.schemas import BaseSchema
+
+# Compared case-insensitively, so stored lowercased. No commas: filters take
+# a comma-separated list.
+TagName = Annotated[
+    str,
+    StringConstraints(
+        strip_whitespace=True,
+        to_lower=True,
+        min_length=1,
+        max_length=50,
+        pattern=r"^[^,]+$",
+    ),
+]
+
+
+def parse_tag_names(value: str) -> list[str]:
+    """Split a comma-separated filter into distinct, normalized names."""
+    return sorted({name.strip().lower() for name in value.split(",")} - {""})
+
+
+class TagMatch(StrEnum):
+    ALL = "all"
+    ANY = "any"
+
+
+class TagCreate(BaseSchema):
+    name: TagName
+
+
+class TagUpdate(BaseSchema):
+    name: TagName
+
+
+class TagResponse(BaseSchema):
+    id: int
+    name: str
+    created_at: datetime
@@ -0,0 +1,153 @@
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy import Insert, delete, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.cache import invalidate_user
+from src.core.database import get_databases
+from src.core.sharding import id_allocator, shard_map
+from src.tags.exceptions import TagExistsError, TagNotFoundError
+from src.tags.models import Tag, TodoTag
+from src.tags.schemas import TagCreate, TagUpdate
+
+
+class TagService:
+    def __init__(self, db: AsyncSession) -> None:
+        self.db = db
+
+    async def get_by_id(self, tag_id: int, user_id: int) -> Tag | None:
+        result = await self.db.execute(
+            select(Tag).where(
+                Tag.id == tag_id,
+                Tag.user_id == user_id,
+            )
+        )
+        return result.scalar_one_or_none()
+
+    async def get_by_id_or_404(self, tag_id: int, user_id: int) -> Tag:
+        tag = await self.get_by_id(tag_id, user_id)
+        if tag is None:
+            raise TagNotFoundError()
+        return tag
+
+    async def list_by_user(
+        self, user_id: int, prefix: str = "", limit: int | None = None
+    ) -> list[Tag]:
+        """The user's tags by name, optionally only those starting with ``prefix``.
+
+        The prefix becomes a range on the ``(user_id, name)`` index rather
+        than a ``LIKE``, which could only use it with the right collation.
+        """
+        query = select(Tag).where(Tag.user_id == user_id)
+        prefix = prefix.strip().lower()
+        if prefix:
+            query = query.where(Tag.name >= prefix)
+            end = _prefix_end(prefix)
+            if end is not None:
+                query = query.where(Tag.name < end)
+        result = await self.db.execute(query.order_by(Tag.name).limit(limit))
+        return list(result.scalars().all())
+
+    async def create(self, data: TagCreate, user_id: int) -> Tag:
+        tag = Tag(name=data.name, user_id=user_id)
+        self.db.add(tag)
+        try:
+            await self.db.flush()
+        except IntegrityError:
+            await self.db.rollback()
+            raise TagExistsError() from None
+        await invalidate_user(self.db, user_id)
+        return tag
+
+    async def update(self, tag_id: int, data: TagUpdate, user_id: int) -> Tag:
+        """Rename the tag, on every todo carrying it."""
+        tag = await self.get_by_id_or_404(tag_id, user_id)
+        tag.name = data.name
+        try:
+            await self.db.flush()
+        except IntegrityError:
+            await self.db.rollback()
+            raise TagExistsError() from None
+        await invalidate_user(self.db, user_id)
+        return tag
+
+    async def delete(self, tag_id: int, user_id: int) -> None:
+        """Delete the tag and take it off its todos."""
+        tag = await self.get_by_id_or_404(tag_id, user_id)
+        # One set-based DELETE in the request's transaction, like un-filing a
+        # deleted category's todos, so the tag never ends up half deleted.
+        await self.db.execute(
+            delete(TodoTag)
+            .where(TodoTag.tag_id == tag_id)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.delete(tag)
+        await self.db.flush()
+        await invalidate_user(self.db, user_id)
+
+    async def get_or_create(self, names: Sequence[str], user_id: int) -> list[Tag]:
+        """The user's tags with these names, creating the missing ones."""
+        names = sorted(set(names))
+        if not names:
+            return []
+        tags = await self._named(names, user_id)
+        missing = [name for name in names if name not in tags]
+        if missing:
+            rows: list[dict[str, Any]] = [
+                {"user_id": user_id, "name": name} for name in missing
+            ]
+            if shard_map.is_sharded:
+                # A core insert skips the before_flush hook handing out ids.
+                directory = get_databases().directory.sync_engine
+                ids = await self.db.run_sync(
+                    lambda _: id_allocator.take(directory, len(rows))
+                )
+                for row, tag_id in zip(rows, ids, strict=True):
+                    row["id"] = tag_id
+            # A tag a concurrent request created first is kept, not an error.
+            await self.db.execute(_insert_missing(self.db), rows)
+            tags |= await self._named(missing, user_id)
+        return [tags[name] for name in names]
+
+    async def _named(self, names: Sequence[str], user_id: int) -> dict[str, Tag]:
+        existing = await self.db.scalars(
+            select(Tag).where(Tag.user_id == user_id, Tag.name.in_(names))
+        )
+        return {tag.name: tag for tag in existing}
+
+    async def set_todo_tags(self, todo_id: int, tags: Sequence[Tag]) -> None:
+        """Replace the todo's tags."""
+        await self.db.execute(delete(TodoTag).where(TodoTag.todo_id == todo_id))
+        if tags:
+            await self.db.execute(
+                insert(TodoTag),
+                [{"todo_id": todo_id, "tag_id": tag.id} for tag in tags],
+            )
+
+
+def _prefix_end(prefix: str) -> str | None:
+    """The first string after every name starting with ``prefix``, if any.
+
+    Trailing U+10FFFF has no successor, so it is dropped and the character
+    before it is bumped instead; surrogates, which no stored name holds, are
+    skipped. None when the prefix is all U+10FFFF: nothing sorts after it.
+    """
+    stem = prefix.rstrip(chr(0x10FFFF))
+    if not stem:
+        return None
+    last = ord(stem[-1]) + 1
+    if 0xD800 <= last <= 0xDFFF:
+        last = 0xE000
+    return stem[:-1] + chr(last)
+
+
+def _insert_missing(db: AsyncSession) -> Insert:
+    """``INSERT`` into ``tag`` that skips names the user already has."""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(Tag).on_conflict_do_nothing(
+            index_elements=["user_id", "name"]
+        )
+    return sqlite.insert(Tag).on_conflict_do_nothing(index_elements=["user_id", "name"])
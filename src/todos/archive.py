@@ -0,0 +1,105 @@
+"""Move long-completed todos out of ``todo`` into ``todo_archive``.
+
+Todos completed, and left untouched, for ``ARCHIVE_AFTER_DAYS`` are moved in
+passes every ``ARCHIVE_INTERVAL_SECONDS``, ``ARCHIVE_BATCH_SIZE`` at a time
+with ``INSERT ... SELECT`` and ``DELETE``, one transaction per batch, by the
+worker holding ``ARCHIVE_LEASE`` (see src.core.leases). This keeps ``todo``
+and the indexes that every list request uses small. A todo
+with subtasks waits until they are archived. Archived todos are read with
+``include_archived=true`` and moved back by ``POST /todos/{id}/restore``.
+"""
+
+import asyncio
+import logging
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import delete, exists, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from src.core.cache import apply_pending_invalidations, invalidate_user
+from src.core.config import get_settings
+from src.core.database import UTCDateTime, get_databases
+from src.core.metrics import metrics
+from src.todos.models import Todo, TodoArchive
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Name of the lease whose holder runs the archiving passes. On SQLite,
+# concurrent passes would pick the same rows and collide on todo_archive's key.
+ARCHIVE_LEASE = "archive"
+
+
+async def archive_completed(
+    db: AsyncSession, completed_before: datetime, batch_size: int
+) -> int:
+    """Archive todos completed and last updated before ``completed_before``.
+
+    Returns how many were archived. Concurrent passes skip each other's rows.
+    """
+    archived = 0
+    subtask = aliased(Todo)
+    columns = [column.name for column in Todo.__table__.c]
+    while True:
+        batch = (
+            await db.execute(
+                select(Todo.id, Todo.user_id)
+                .where(
+                    Todo.completed_at < completed_before,
+                    Todo.updated_at < completed_before,
+                    # Subtasks go first, so a parent never leaves todo
+                    # (taking its open subtasks along) before they do.
+                    ~exists().where(subtask.parent_id == Todo.id),
+                )
+                .order_by(Todo.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+        ).all()
+        if not batch:
+            return archived
+        ids = [todo_id for todo_id, _ in batch]
+        await db.execute(
+            insert(TodoArchive).from_select(
+                [*columns, "archived_at"],
+                select(
+                    *Todo.__table__.c, literal(datetime.now(UTC), UTCDateTime)
+                ).where(Todo.id.in_(ids)),
+            )
+        )
+        await db.execute(delete(Todo).where(Todo.id.in_(ids)))
+        for user_id in {user_id for _, user_id in batch}:
+            await invalidate_user(db, user_id)
+        await db.commit()
+        await apply_pending_invalidations(db)
+        archived += len(batch)
+        metrics.incr("todos.archived", len(batch))
+        if len(batch) < batch_size:
+            return archived
+
+
+async def archive_all_shards() -> int:
+    completed_before = datetime.now(UTC) - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+    databases = get_databases()
+    archived = 0
+    for shard in range(len(databases.shards)):
+        async with databases.session_factory(info={"shard": shard}) as db:
+            archived += await archive_completed(
+                db, completed_before, settings.ARCHIVE_BATCH_SIZE
+            )
+    return archived
+
+
+async def run_archiver(interval: float) -> None:
+    """Archive completed todos every ``interval`` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            archived = await archive_all_shards()
+        except Exception:
+            logger.exception("Archiving todos failed")
+            continue
+        if archived:
+            logger.info("Archived %d todos", archived)
@@ -1,6 +1,26 @@
-from src.core.exceptions import NotFoundError
+from src.core.exceptions import NotFoundError, ValidationError
 
 
 class TodoNotFoundError(NotFoundError):
     code = "TODO_NOT_FOUND"
     message = "Todo not found"
+
+
+class ParentTodoNotFoundError(NotFoundError):
+    code = "PARENT_TODO_NOT_FOUND"
+    message = "Parent todo not found"
+
+
+class SubtaskDepthError(ValidationError):
+    code = "SUBTASK_TOO_DEEP"
+    message = "Subtasks would be nested too deeply"
+
+
+class SubtaskCycleError(ValidationError):
+    code = "SUBTASK_CYCLE"
+    message = "A todo cannot be moved under itself or its subtasks"
+
+
+class AdjacentTodoNotFoundError(NotFoundError):
+    code = "ADJACENT_TODO_NOT_FOUND"
+    message = "Todo to move next to not found"
@@ -1,10 +1,22 @@
 from datetime import UTC, date, datetime
 from enum import Enum
+from typing import cast
 
-from sqlalchemy import CheckConstraint, Date, DateTime, ForeignKey, String, Text
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import (
+    CheckConstraint,
+    Date,
+    ForeignKey,
+    Index,
+    PrimaryKeyConstraint,
+    String,
+    Table,
+    Text,
+    func,
+)
+from sqlalchemy.orm import Mapped, foreign, mapped_column, relationship
 
-from src.core.database import Base
+from src.core.database import Base, UTCDateTime
+from src.tags.models import Tag, TodoTag
 
 
 class TodoStatus(str, Enum):
@@ -13,37 +25,127 @@ class TodoStatus(str, Enum):
     COMPLETED = "completed"
 
 
+TODO_STATUS_VALUES = ", ".join(f"'{s.value}'" for s in TodoStatus)
+
+# Ranks compare by bytes; PostgreSQL's default collation would not.
+RANK_TYPE = String(255).with_variant(String(255, collation="C"), "postgresql")
+
+
 class Todo(Base):
     __tablename__ = "todo"
     __table_args__ = (
         CheckConstraint("priority >= 0 AND priority <= 4", name="ck_todo_priority"),
+        CheckConstraint(f"status IN ({TODO_STATUS_VALUES})", name="ck_todo_status"),
+        # Reminder scheduler: upcoming open todos in due-date order
+        Index("ix_todo_due_date_status", "due_date", "status"),
+        # Archiver: todos completed before the cutoff
+        Index("ix_todo_completed_at", "completed_at"),
+        # Manual order: a user's todos by rank, and each move's neighbours
+        Index("ix_todo_user_id_rank", "user_id", "rank"),
+        # Archived todos keep their id, so SQLite must never hand it out again.
+        {"sqlite_autoincrement": True},
     )
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("user.id"), index=True)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("user.id", ondelete="CASCADE"), index=True
+    )
     category_id: Mapped[int | None] = mapped_column(
         ForeignKey("category.id", ondelete="SET NULL"),
         index=True,
     )
+    # Subtasks: indexed so each level of a subtree is an index range scan.
+    parent_id: Mapped[int | None] = mapped_column(
+        ForeignKey("todo.id", ondelete="CASCADE"),
+        index=True,
+    )
     title: Mapped[str] = mapped_column(String(255))
+    # Position in the manual order; see src.todos.ranks. Rows inserted
+    # without one tie, and ties list by id.
+    rank: Mapped[str] = mapped_column(RANK_TYPE, server_default="a0")
     description: Mapped[str | None] = mapped_column(Text)
     status: Mapped[str] = mapped_column(
         String(20),
         default=TodoStatus.PENDING.value,
+        server_default=TodoStatus.PENDING.value,
     )
     priority: Mapped[int | None] = mapped_column()
     due_date: Mapped[date | None] = mapped_column(Date)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        UTCDateTime,
         default=lambda: datetime.now(UTC),
+        server_default=func.now(),
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        UTCDateTime,
         default=lambda: datetime.now(UTC),
         onupdate=lambda: datetime.now(UTC),
+        server_default=func.now(),
     )
-    completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    completed_at: Mapped[datetime | None] = mapped_column(UTCDateTime)
 
     # Relationships
     user: Mapped["User"] = relationship(back_populates="todos")  # type: ignore[name-defined]  # noqa: F821
     category: Mapped["Category | None"] = relationship(back_populates="todos")  # type: ignore[name-defined]  # noqa: F821
+    # Written through TagService.set_todo_tags; selectin-loaded by the reads,
+    # one query for a whole page of todos.
+    tags: Mapped[list[Tag]] = relationship(
+        secondary=TodoTag.__table__,
+        primaryjoin=lambda: Todo.id == foreign(TodoTag.todo_id),
+        secondaryjoin=lambda: Tag.id == foreign(TodoTag.tag_id),
+        order_by=Tag.name,
+        lazy="raise",
+        viewonly=True,
+    )
+
+
+class TodoArchive(Base):
+    """A completed todo moved out of ``todo`` by ``src.todos.archive``.
+
+    Has every column of ``Todo``, so rows move between the two tables with
+    ``INSERT ... SELECT``, and keeps the todo's id, so it can be restored
+    as it was. Moving a user to another shard copies their archive back into
+    ``todo`` there, ids unchanged, and the archiver moves it out again.
+    """
+
+    __tablename__ = "todo_archive"
+    __table_args__ = (
+        # Leads with user_id, so it also serves the per-user reads.
+        PrimaryKeyConstraint("user_id", "id"),
+        {"info": {"archive_of": "todo"}},
+    )
+
+    id: Mapped[int] = mapped_column(autoincrement=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"))
+    category_id: Mapped[int | None] = mapped_column(
+        ForeignKey("category.id", ondelete="SET NULL"),
+        index=True,
+    )
+    # Not a foreign key: the parent may be archived too, or gone.
+    parent_id: Mapped[int | None] = mapped_column()
+    title: Mapped[str] = mapped_column(String(255))
+    rank: Mapped[str] = mapped_column(RANK_TYPE)
+    description: Mapped[str | None] = mapped_column(Text)
+    status: Mapped[str] = mapped_column(String(20))
+    priority: Mapped[int | None] = mapped_column()
+    due_date: Mapped[date | None] = mapped_column(Date)
+    created_at: Mapped[datetime] = mapped_column(UTCDateTime)
+    updated_at: Mapped[datetime] = mapped_column(UTCDateTime)
+    completed_at: Mapped[datetime | None] = mapped_column(UTCDateTime)
+    archived_at: Mapped[datetime] = mapped_column(UTCDateTime)
+
+    tags: Mapped[list[Tag]] = relationship(
+        secondary=TodoTag.__table__,
+        primaryjoin=lambda: TodoArchive.id == foreign(TodoTag.todo_id),
+        secondaryjoin=lambda: Tag.id == foreign(TodoTag.tag_id),
+        order_by=Tag.name,
+        lazy="raise",
+        viewonly=True,
+    )
+
+
+# todo_tag refers to both without a foreign key; order it after them anyway,
+# for the rebalancer's table-by-table copy.
+cast(Table, TodoTag.__table__).add_is_dependent_on(cast(Table, Todo.__table__))
+cast(Table, TodoTag.__table__).add_is_dependent_on(cast(Table, TodoArchive.__table__))
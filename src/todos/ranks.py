@@ -0,0 +1,222 @@
+"""Manual order of todos as fractional rank keys.
+
+A todo's ``rank`` is a string key, and the manual order is the keys' byte
+order. There is always a key between two others, so moving a todo rewrites
+only its own rank; ``key_between`` picks the shortest one it can.
+
+A key is an "integer" part, whose first character gives its length
+(``a`` = 2 characters, ``b`` = 3, ...; ``Z``, ``Y``, ... the same below
+``a0``), followed by an optional base-62 fraction. Appending at either end
+steps the integer, so keys grow only logarithmically with the list. Moves
+into the same gap halve it each time, adding a character about every six
+moves. Past ``RANK_REBALANCE_LENGTH`` characters the move queues a
+``todos.rerank`` message, and an outbox worker rewrites the user's ranks as
+short, evenly spaced keys in the same order.
+
+Adapted from David Greenspan's "Implementing Fractional Indexing".
+"""
+
+import json
+import logging
+from collections.abc import Sequence
+from typing import Any, cast
+
+from sqlalchemy import func, literal, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.cache import apply_pending_invalidations, invalidate_user
+from src.core.config import get_settings
+from src.core.database import get_databases
+from src.core.metrics import metrics
+from src.events.schemas import Event
+from src.outbox.service import OutboxEntry, enqueue, register_handler
+from src.todos.models import Todo, TodoArchive
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+# The lowest integer part has no key below it.
+SMALLEST_INTEGER = "A" + "0" * 26
+
+TODOS_RERANK = "todos.rerank"
+
+
+def _integer_length(head: str) -> int:
+    if "a" <= head <= "z":
+        return ord(head) - ord("a") + 2
+    if "A" <= head <= "Z":
+        return ord("Z") - ord(head) + 2
+    raise ValueError(f"invalid rank head: {head!r}")
+
+
+def _split(key: str) -> tuple[str, str]:
+    """The key's integer part and fraction."""
+    integer = key[: _integer_length(key[0])]
+    fraction = key[len(integer) :]
+    if len(integer) < _integer_length(key[0]) or fraction.endswith(DIGITS[0]):
+        raise ValueError(f"invalid rank: {key!r}")
+    return integer, fraction
+
+
+def _midpoint(low: str, high: str | None) -> str:
+    """A fraction strictly between two fractions; ``None`` is 1."""
+    if high is not None:
+        # Keep the common prefix, treating the shorter as padded with zeros.
+        n = 0
+        while n < len(high) and (low[n] if n < len(low) else DIGITS[0]) == high[n]:
+            n += 1
+        if n:
+            return high[:n] + _midpoint(low[n:], high[n:])
+    low_digit = DIGITS.index(low[0]) if low else 0
+    high_digit = DIGITS.index(high[0]) if high is not None else len(DIGITS)
+    if high_digit - low_digit > 1:
+        return DIGITS[(low_digit + high_digit + 1) // 2]
+    # Adjacent digits: the rest of the fraction must make room.
+    if high is not None and len(high) > 1:
+        return high[0]
+    return DIGITS[low_digit] + _midpoint(low[1:], None)
+
+
+def _increment(integer: str) -> str | None:
+    head, digits = integer[0], list(integer[1:])
+    for i in reversed(range(len(digits))):
+        digit = DIGITS.index(digits[i]) + 1
+        if digit < len(DIGITS):
+            digits[i] = DIGITS[digit]
+            return head + "".join(digits)
+        digits[i] = DIGITS[0]
+    # Carried out of every digit: the next head, one digit longer or shorter.
+    if head == "Z":
+        return "a" + DIGITS[0]
+    if head == "z":
+        return None
+    head = chr(ord(head) + 1)
+    if head > "a":
+        digits.append(DIGITS[0])
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+
+def _decrement(integer: str) -> str | None:
+    head, digits = integer[0], list(integer[1:])
+    for i in reversed(range(len(digits))):
+        digit = DIGITS.index(digits[i]) - 1
+        if digit >= 0:
+            digits[i] = DIGITS[digit]
+            return head + "".join(digits)
+        digits[i] = DIGITS[-1]
+    if head == "a":
+        return "Z" + DIGITS[-1]
+    if head == "A":
+        return None
+    head = chr(ord(head) - 1)
+    if head < "Z":
+        digits.append(DIGITS[-1])
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+
+def key_between(low: str | None, high: str | None) -> str:
+    """A rank after ``low`` and before ``high``; ``None`` is an open end."""
+    if low is not None and high is not None and low >= high:
+        raise ValueError(f"rank {low!r} is not below {high!r}")
+    if low is None and high is None:
+        return "a" + DIGITS[0]
+    if low is None:
+        assert high is not None
+        integer, fraction = _split(high)
+        if integer == SMALLEST_INTEGER:
+            return integer + _midpoint("", fraction)
+        if fraction:
+            return integer
+        lower = _decrement(integer)
+        if lower is None:
+            raise ValueError("no rank below the smallest")
+        return lower
+    integer, fraction = _split(low)
+    if high is None:
+        higher = _increment(integer)
+        return integer + _midpoint(fraction, None) if higher is None else higher
+    high_integer, high_fraction = _split(high)
+    if integer == high_integer:
+        return integer + _midpoint(fraction, high_fraction)
+    higher = _increment(integer)
+    if higher is not None and higher < high:
+        return higher
+    return integer + _midpoint(fraction, None)
+
+
+async def first_rank(db: AsyncSession, user_id: int) -> str | None:
+    """The rank at the top of the user's manual order, where new todos go."""
+    return cast(
+        str | None,
+        await db.scalar(select(func.min(Todo.rank)).where(Todo.user_id == user_id)),
+    )
+
+
+def queue_rerank(db: AsyncSession, user_id: int) -> None:
+    """Have an outbox worker shorten the user's ranks after this commit."""
+    enqueue(db, Event(user_id, TODOS_RERANK, json.dumps({"user_id": user_id})))
+
+
+async def rerank(db: AsyncSession, user_id: int, max_length: int) -> int:
+    """Rewrite the user's ranks, in order, if any is longer than ``max_length``.
+
+    Returns the number of todos reranked. All of them get new ranks in one
+    transaction: their relative order is all that carries over. Archived
+    todos are reranked with the live ones, so ``include_archived`` lists keep
+    them in place.
+    """
+    too_long = await db.scalar(
+        select(Todo.id)
+        .where(Todo.user_id == user_id, func.length(Todo.rank) > max_length)
+        .limit(1)
+    )
+    if too_long is None:
+        return 0
+    ranked = union_all(
+        select(Todo.rank, Todo.id, literal(False).label("archived")).where(
+            Todo.user_id == user_id
+        ),
+        select(TodoArchive.rank, TodoArchive.id, literal(True)).where(
+            TodoArchive.user_id == user_id
+        ),
+    ).subquery()
+    result = await db.execute(
+        select(ranked.c.id, ranked.c.archived).order_by(ranked.c.rank, ranked.c.id)
+    )
+    rank = None
+    rows: list[dict[str, Any]] = []
+    archived_rows: list[dict[str, Any]] = []
+    for todo_id, archived in result:
+        rank = key_between(rank, None)
+        if archived:
+            archived_rows.append({"user_id": user_id, "id": todo_id, "rank": rank})
+        else:
+            rows.append({"id": todo_id, "rank": rank})
+    # Bulk UPDATEs by primary key, without loading the todos.
+    await db.execute(update(Todo), rows)
+    if archived_rows:
+        await db.execute(update(TodoArchive), archived_rows)
+    await invalidate_user(db, user_id)
+    return len(rows) + len(archived_rows)
+
+
+async def handle_rerank(entries: Sequence[OutboxEntry]) -> None:
+    session_factory = get_databases().session_factory
+    # Every long move queues a message; one rerank per user answers them all.
+    for shard, user_id in sorted({(entry.shard, entry.user_id) for entry in entries}):
+        async with session_factory(info={"shard": shard}) as db:
+            reranked = await rerank(db, user_id, settings.RANK_REBALANCE_LENGTH)
+            await db.commit()
+            await apply_pending_invalidations(db)
+        if reranked:
+            metrics.incr("todos.reranked")
+            logger.info("Reranked %d todos of user %d", reranked, user_id)
+
+
+register_handler([TODOS_RERANK], handle_rerank)
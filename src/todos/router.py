@@ -1,57 +1,112 @@
 from datetime import date
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.auth.dependencies import get_current_user
-from src.auth.models import User
-from src.core.database import get_db
-from src.todos.dependencies import get_todo_or_404
-from src.todos.models import Todo, TodoStatus
-from src.todos.schemas import TodoCreate, TodoFilters, TodoResponse, TodoUpdate
+from src.auth.dependencies import UserRateLimiter, get_current_user
+from src.auth.schemas import CurrentUser
+from src.core.database import get_db, get_read_db, read_only
+from src.core.idempotency import Idempotency
+from src.core.ratelimit import RateLimit
+from src.core.response_cache import cached_json_response
+from src.tags.schemas import TagMatch, parse_tag_names
+from src.todos.models import Todo, TodoArchive, TodoStatus
+from src.todos.schemas import (
+    SubtreeNode,
+    TodoCreate,
+    TodoFilters,
+    TodoMove,
+    TodoOrder,
+    TodoResponse,
+    TodoUpdate,
+)
 from src.todos.service import TodoService
 
 router = APIRouter()
 
+LIST_TODOS_RATE_LIMIT = RateLimit.per_minute("todos-list", 120)
+
+todo_list_adapter = TypeAdapter(list[TodoResponse])
+subtree_adapter = TypeAdapter(list[SubtreeNode])
+
 
 @router.get(
     "",
     response_model=list[TodoResponse],
+    responses={429: {"description": "Too many requests"}},
+    dependencies=[Depends(UserRateLimiter(LIST_TODOS_RATE_LIMIT))],
 )
+@read_only
 async def list_todos(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    request: Request,
+    response: Response,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
     status: TodoStatus | None = Query(default=None),
     priority: int | None = Query(default=None, ge=0, le=4),
     category_id: int | None = Query(default=None),
     due_before: date | None = Query(default=None),
     due_after: date | None = Query(default=None),
-) -> list[Todo]:
-    """List all todos for the current user with optional filters."""
+    include_archived: bool = Query(default=False),
+    tags: str | None = Query(
+        default=None, description="Comma-separated tag names", examples=["work,urgent"]
+    ),
+    match: TagMatch = Query(
+        default=TagMatch.ALL, description="Whether todos need all the tags or any"
+    ),
+    order: TodoOrder = Query(default=TodoOrder.CREATED),
+) -> Response:
+    """List all todos for the current user with optional filters.
+
+    Newest first, or in the manual order with ``order=rank``. Archived todos
+    are left out unless ``include_archived`` is set.
+    """
     filters = TodoFilters(
         status=status,
         priority=priority,
         category_id=category_id,
         due_before=due_before,
         due_after=due_after,
+        include_archived=include_archived,
+        tags=parse_tag_names(tags) if tags is not None else None,
+        match=match,
+        order=order,
     )
-    return await TodoService(db).list_by_user(current_user.id, filters)
+
+    async def render() -> bytes:
+        todos = await TodoService(db).list_by_user_cached(current_user.id, filters)
+        return todo_list_adapter.dump_json(todos)
+
+    return await cached_json_response(request, response, current_user.id, render)
 
 
 @router.post(
     "",
     response_model=TodoResponse,
     status_code=status.HTTP_201_CREATED,
-    responses={404: {"description": "Category not found"}},
+    responses={
+        404: {"description": "Category or parent todo not found"},
+        409: {"description": "Request with this Idempotency-Key in progress"},
+        422: {"description": "Subtasks nested too deeply"},
+    },
 )
 async def create_todo(
     data: TodoCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
-) -> Todo:
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    idempotency: Annotated[Idempotency, Depends()],
+) -> Response:
     """Create a new todo."""
-    return await TodoService(db).create(data, current_user.id)
+
+    async def render() -> bytes:
+        todo = await TodoService(db).create(data, current_user.id)
+        return TodoResponse.model_validate(todo).model_dump_json().encode()
+
+    return await idempotency.run(
+        db, f"user:{current_user.id}", render, status.HTTP_201_CREATED
+    )
 
 
 @router.get(
@@ -59,26 +114,115 @@ async def create_todo(
     response_model=TodoResponse,
     responses={404: {"description": "Todo not found"}},
 )
+@read_only
 async def get_todo(
-    todo: Annotated[Todo, Depends(get_todo_or_404)],
-) -> Todo:
-    """Get a todo by ID."""
-    return todo
+    todo_id: int,
+    request: Request,
+    response: Response,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    include_archived: bool = Query(default=False),
+) -> Response:
+    """Get a todo by ID, or an archived one with ``include_archived``."""
+
+    async def render() -> bytes:
+        service = TodoService(db)
+        todo: Todo | TodoArchive
+        if include_archived:
+            todo = await service.get_including_archived_or_404(todo_id, current_user.id)
+        else:
+            todo = await service.get_by_id_or_404(todo_id, current_user.id)
+        return TodoResponse.model_validate(todo).model_dump_json().encode()
+
+    return await cached_json_response(request, response, current_user.id, render)
 
 
 @router.patch(
     "/{todo_id}",
     response_model=TodoResponse,
-    responses={404: {"description": "Todo or category not found"}},
+    responses={
+        404: {"description": "Todo or category not found"},
+        409: {"description": "Request with this Idempotency-Key in progress"},
+    },
 )
 async def update_todo(
     todo_id: int,
     data: TodoUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
-) -> Todo:
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    idempotency: Annotated[Idempotency, Depends()],
+) -> Response:
     """Update a todo."""
-    return await TodoService(db).update(todo_id, data, current_user.id)
+
+    async def render() -> bytes:
+        todo = await TodoService(db).update(todo_id, data, current_user.id)
+        return TodoResponse.model_validate(todo).model_dump_json().encode()
+
+    return await idempotency.run(db, f"user:{current_user.id}", render)
+
+
+@router.get(
+    "/{todo_id}/subtree",
+    response_model=list[SubtreeNode],
+    responses={404: {"description": "Todo not found"}},
+)
+@read_only
+async def get_subtree(
+    todo_id: int,
+    request: Request,
+    response: Response,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+) -> Response:
+    """Get a todo and all its subtasks, with completion rolled up.
+
+    Nodes are listed level by level; rebuild the tree from ``parent_id``.
+    """
+
+    async def render() -> bytes:
+        nodes = await TodoService(db).get_subtree(todo_id, current_user.id)
+        return subtree_adapter.dump_json(nodes)
+
+    return await cached_json_response(request, response, current_user.id, render)
+
+
+@router.patch(
+    "/{todo_id}/move",
+    response_model=TodoResponse,
+    responses={
+        404: {"description": "Todo, parent todo or todo to move next to not found"},
+        422: {"description": "Subtasks nested too deeply, or under themselves"},
+    },
+)
+async def move_todo(
+    todo_id: int,
+    data: TodoMove,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+) -> TodoResponse:
+    """Move a todo and its subtasks under another todo, or to the top level.
+
+    ``before_id`` or ``after_id`` also places it in the manual order, next to
+    that todo. Leave ``parent_id`` out to reorder only; send ``null`` to move
+    the todo to the top level.
+    """
+    todo = await TodoService(db).move(todo_id, data, current_user.id)
+    return TodoResponse.model_validate(todo)
+
+
+@router.post(
+    "/{todo_id}/restore",
+    response_model=TodoResponse,
+    responses={404: {"description": "Archived todo not found"}},
+)
+async def restore_todo(
+    todo_id: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+) -> TodoResponse:
+    """Move an archived todo back among the current ones."""
+    todo = await TodoService(db).restore(todo_id, current_user.id)
+    return TodoResponse.model_validate(todo)
 
 
 @router.delete(
@@ -89,7 +233,7 @@ async def update_todo(
 async def delete_todo(
     todo_id: int,
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
 ) -> None:
-    """Delete a todo."""
+    """Delete a todo and its subtasks."""
     await TodoService(db).delete(todo_id, current_user.id)
@@ -1,8 +1,11 @@
 from datetime import date, datetime
+from enum import StrEnum
+from typing import Self
 
-from pydantic import Field
+from pydantic import Field, field_validator, model_validator
 
 from src.core.schemas import BaseSchema
+from src.tags.schemas import TagMatch, TagName
 from src.todos.models import TodoStatus
 
 
@@ -12,6 +15,8 @@ class TodoCreate(BaseSchema):
     priority: int | None = Field(default=None, ge=0, le=4)
     due_date: date | None = None
     category_id: int | None = None
+    parent_id: int | None = None
+    tags: list[TagName] = Field(default_factory=list, max_length=20)
 
 
 class TodoUpdate(BaseSchema):
@@ -21,6 +26,8 @@ class TodoUpdate(BaseSchema):
     priority: int | None = Field(default=None, ge=0, le=4)
     due_date: date | None = None
     category_id: int | None = None
+    # Replaces the todo's tags.
+    tags: list[TagName] | None = Field(default=None, max_length=20)
 
 
 class TodoResponse(BaseSchema):
@@ -31,9 +38,44 @@ class TodoResponse(BaseSchema):
     priority: int | None
     due_date: date | None
     category_id: int | None
+    parent_id: int | None
     created_at: datetime
     updated_at: datetime
     completed_at: datetime | None
+    archived_at: datetime | None = None
+    tags: list[str] = []
+
+    @field_validator("tags", mode="before")
+    @classmethod
+    def _tag_names(cls, tags: list[object]) -> list[object]:
+        # Read from the model, the tags are Tag rows.
+        return [getattr(tag, "name", tag) for tag in tags]
+
+
+class TodoMove(BaseSchema):
+    # Left out, the todo keeps its parent; null moves it to the top level.
+    parent_id: int | None = None
+    # Where the todo goes in the manual order; without either, it stays put.
+    before_id: int | None = None
+    after_id: int | None = None
+
+    @model_validator(mode="after")
+    def _one_position(self) -> Self:
+        if self.before_id is not None and self.after_id is not None:
+            raise ValueError("give before_id or after_id, not both")
+        return self
+
+
+class SubtreeNode(TodoResponse):
+    depth: int  # 0 for the subtree's root
+    subtasks: int  # all descendants, not just children
+    subtasks_completed: int
+    progress: float | None  # percent of subtasks completed; None without any
+
+
+class TodoOrder(StrEnum):
+    CREATED = "created"  # newest first
+    RANK = "rank"  # the manual order
 
 
 class TodoFilters(BaseSchema):
@@ -42,3 +84,7 @@ class TodoFilters(BaseSchema):
     category_id: int | None = None
     due_before: date | None = None
     due_after: date | None = None
+    include_archived: bool = False
+    tags: list[str] | None = None
+    match: TagMatch = TagMatch.ALL
+    order: TodoOrder = TodoOrder.CREATED
@@ -1,13 +1,47 @@
+import heapq
 from datetime import UTC, datetime
+from functools import partial
+from operator import attrgetter
 
-from sqlalchemy import select
+from sqlalchemy import CTE, Float, Select, cast, delete, func, literal, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
+from src.auth.models import User
 from src.categories.exceptions import CategoryNotFoundError
 from src.categories.service import CategoryService
-from src.todos.exceptions import TodoNotFoundError
-from src.todos.models import Todo, TodoStatus
-from src.todos.schemas import TodoCreate, TodoFilters, TodoUpdate
+from src.core.cache import cached, get_cache, get_user_revision, invalidate_user
+from src.core.config import get_settings
+from src.core.database import on_commit
+from src.events.hub import publish_on_commit
+from src.events.schemas import Event
+from src.outbox.service import enqueue
+from src.reminders.scheduler import reminders
+from src.reminders.sinks import Reminder
+from src.tags.models import Tag, TodoTag
+from src.tags.schemas import TagMatch
+from src.tags.service import TagService
+from src.todos.exceptions import (
+    AdjacentTodoNotFoundError,
+    ParentTodoNotFoundError,
+    SubtaskCycleError,
+    SubtaskDepthError,
+    TodoNotFoundError,
+)
+from src.todos.models import Todo, TodoArchive, TodoStatus
+from src.todos.ranks import first_rank, key_between, queue_rerank
+from src.todos.schemas import (
+    SubtreeNode,
+    TodoCreate,
+    TodoFilters,
+    TodoMove,
+    TodoOrder,
+    TodoResponse,
+    TodoUpdate,
+)
+
+settings = get_settings()
 
 
 class TodoService:
@@ -16,10 +50,12 @@ class TodoService:
 
     async def get_by_id(self, todo_id: int, user_id: int) -> Todo | None:
         result = await self.db.execute(
-            select(Todo).where(
+            select(Todo)
+            .where(
                 Todo.id == todo_id,
                 Todo.user_id == user_id,
             )
+            .options(selectinload(Todo.tags))
         )
         return result.scalar_one_or_none()
 
@@ -29,30 +65,171 @@ class TodoService:
             raise TodoNotFoundError()
         return todo
 
+    async def get_archived_by_id(
+        self, todo_id: int, user_id: int
+    ) -> TodoArchive | None:
+        return await self.db.get(
+            TodoArchive, (user_id, todo_id), options=[selectinload(TodoArchive.tags)]
+        )
+
+    async def get_including_archived_or_404(
+        self, todo_id: int, user_id: int
+    ) -> Todo | TodoArchive:
+        todo = await self.get_by_id(todo_id, user_id)
+        if todo is not None:
+            return todo
+        archived = await self.get_archived_by_id(todo_id, user_id)
+        if archived is None:
+            raise TodoNotFoundError()
+        return archived
+
     async def list_by_user(
         self, user_id: int, filters: TodoFilters | None = None
-    ) -> list[Todo]:
-        query = select(Todo).where(Todo.user_id == user_id)
-
-        if filters:
-            if filters.status is not None:
-                query = query.where(Todo.status == filters.status.value)
-            if filters.priority is not None:
-                query = query.where(Todo.priority == filters.priority)
-            if filters.category_id is not None:
-                query = query.where(Todo.category_id == filters.category_id)
-            if filters.due_before is not None:
-                query = query.where(Todo.due_date <= filters.due_before)
-            if filters.due_after is not None:
-                query = query.where(Todo.due_date >= filters.due_after)
-
-        query = query.order_by(Todo.created_at.desc())
-        result = await self.db.execute(query)
-        return list(result.scalars().all())
-
-    async def _validate_category(
-        self, category_id: int | None, user_id: int
+    ) -> list[Todo | TodoArchive]:
+        todos: list[Todo | TodoArchive] = list(
+            await self.db.scalars(_list_query(Todo, user_id, filters))
+        )
+        if filters is None or not filters.include_archived:
+            return todos
+        archived = list(
+            await self.db.scalars(_list_query(TodoArchive, user_id, filters))
+        )
+        # Both are in the same order; keep it across the two tables.
+        if filters.order == TodoOrder.RANK:
+            return list(heapq.merge(todos, archived, key=attrgetter("rank", "id")))
+        return list(
+            heapq.merge(todos, archived, key=attrgetter("created_at"), reverse=True)
+        )
+
+    async def list_by_user_cached(
+        self, user_id: int, filters: TodoFilters | None = None
+    ) -> list[TodoResponse]:
+        """Read-through variant of ``list_by_user`` returning response snapshots."""
+        if not settings.CACHE_ENABLED:
+            todos = await self.list_by_user(user_id, filters)
+            return [TodoResponse.model_validate(todo) for todo in todos]
+
+        revision = await get_user_revision(user_id)
+        normalized = (filters or TodoFilters()).model_dump_json(exclude_none=True)
+        key = f"todos:list:{user_id}:{revision}:{normalized}"
+
+        snapshot: tuple[TodoResponse, ...] | None = await cached("todos", key)
+        if snapshot is None:
+            todos = await self.list_by_user(user_id, filters)
+            snapshot = tuple(TodoResponse.model_validate(todo) for todo in todos)
+            await get_cache().set(key, snapshot, ttl=settings.CACHE_TTL_SECONDS)
+        return list(snapshot)
+
+    async def get_subtree(self, todo_id: int, user_id: int) -> list[SubtreeNode]:
+        """The todo and all its subtasks, level by level, with completion rolled up.
+
+        One query: a recursive CTE walks down from the todo through the
+        ``parent_id`` index, a second pairs every node with each of its
+        descendants, and the roll-up is a ``GROUP BY`` over those pairs.
+        """
+        tree = _subtree(todo_id, user_id)
+        closure = select(
+            tree.c.id.label("ancestor"),
+            tree.c.id.label("descendant"),
+            literal(0).label("distance"),
+        ).cte("closure", recursive=True)
+        child = aliased(Todo)
+        closure = closure.union_all(
+            select(closure.c.ancestor, child.id, closure.c.distance + 1)
+            .join(closure, child.parent_id == closure.c.descendant)
+            .where(closure.c.distance < settings.SUBTASK_MAX_DEPTH)
+        )
+        descendant = aliased(Todo)
+        rollup = (
+            select(
+                closure.c.ancestor,
+                func.count().label("subtasks"),
+                func.count()
+                .filter(descendant.status == TodoStatus.COMPLETED.value)
+                .label("completed"),
+            )
+            .join(descendant, descendant.id == closure.c.descendant)
+            .where(closure.c.descendant != closure.c.ancestor)
+            .group_by(closure.c.ancestor)
+            .subquery()
+        )
+        result = await self.db.execute(
+            select(
+                Todo,
+                tree.c.depth,
+                func.coalesce(rollup.c.subtasks, 0),
+                func.coalesce(rollup.c.completed, 0),
+                cast(100.0 * rollup.c.completed / rollup.c.subtasks, Float),
+            )
+            .join(tree, Todo.id == tree.c.id)
+            .outerjoin(rollup, rollup.c.ancestor == Todo.id)
+            .order_by(tree.c.depth, Todo.created_at, Todo.id)
+            .options(selectinload(Todo.tags))
+        )
+        nodes = [
+            SubtreeNode(
+                **TodoResponse.model_validate(todo).model_dump(),
+                depth=depth,
+                subtasks=subtasks,
+                subtasks_completed=completed,
+                progress=progress,
+            )
+            for todo, depth, subtasks, completed, progress in result
+        ]
+        if not nodes:
+            raise TodoNotFoundError()
+        return nodes
+
+    async def _check_parent(
+        self, parent_id: int, user_id: int, moving: int | None = None
     ) -> None:
+        """Check ``moving`` (or a new todo) may go under ``parent_id``.
+
+        Holds the user's row lock from then on, so concurrent moves check one
+        after the other instead of each passing and together forming a cycle.
+        """
+        await self.db.execute(
+            select(User.id).where(User.id == user_id).with_for_update()
+        )
+        height = 0
+        if moving is not None:
+            tree = _subtree(moving, user_id)
+            height = await self.db.scalar(select(func.max(tree.c.depth))) or 0
+        ancestors = _ancestors(parent_id, user_id)
+        chain = list(await self.db.scalars(select(ancestors.c.id)))
+        if not chain:
+            raise ParentTodoNotFoundError()
+        if moving in chain:
+            raise SubtaskCycleError()
+        # The chain holds the parent and its ancestors: the new subtask's depth.
+        if len(chain) + height > settings.SUBTASK_MAX_DEPTH:
+            raise SubtaskDepthError()
+
+    async def _rank_beside(
+        self, todo_id: int, adjacent_id: int, user_id: int, before: bool
+    ) -> str:
+        """A rank just before (or after) another todo's, for ``todo_id``.
+
+        Two seeks on the ``(user_id, rank)`` index: the other todo's rank and
+        the nearest rank on the far side of it.
+        """
+        adjacent = await self.db.scalar(
+            select(Todo.rank).where(Todo.id == adjacent_id, Todo.user_id == user_id)
+        )
+        if adjacent is None:
+            raise AdjacentTodoNotFoundError()
+        others = (Todo.user_id == user_id, Todo.id != todo_id)
+        if before:
+            low = await self.db.scalar(
+                select(func.max(Todo.rank)).where(*others, Todo.rank < adjacent)
+            )
+            return key_between(low, adjacent)
+        high = await self.db.scalar(
+            select(func.min(Todo.rank)).where(*others, Todo.rank > adjacent)
+        )
+        return key_between(adjacent, high)
+
+    async def _validate_category(self, category_id: int | None, user_id: int) -> None:
         if category_id is not None:
             category = await CategoryService(self.db).get_by_id(category_id, user_id)
             if category is None:
@@ -60,18 +237,25 @@ class TodoService:
 
     async def create(self, data: TodoCreate, user_id: int) -> Todo:
         await self._validate_category(data.category_id, user_id)
+        if data.parent_id is not None:
+            await self._check_parent(data.parent_id, user_id)
+        tags = await TagService(self.db).get_or_create(data.tags, user_id)
 
         todo = Todo(
             user_id=user_id,
+            rank=key_between(None, await first_rank(self.db, user_id)),
             title=data.title,
             description=data.description,
             priority=data.priority,
             due_date=data.due_date,
             category_id=data.category_id,
+            parent_id=data.parent_id,
         )
         self.db.add(todo)
         await self.db.flush()
-        await self.db.refresh(todo)
+        await self._set_tags(todo, tags)
+        await invalidate_user(self.db, user_id)
+        self._after_write(todo, "todo.created")
         return todo
 
     async def update(self, todo_id: int, data: TodoUpdate, user_id: int) -> Todo:
@@ -82,6 +266,7 @@ class TodoService:
             await self._validate_category(data.category_id, user_id)
 
         update_data = data.model_dump(exclude_unset=True)
+        tag_names = update_data.pop("tags", None)
 
         # Handle status changes for completed_at
         if "status" in update_data:
@@ -89,19 +274,198 @@ class TodoService:
             if isinstance(new_status, TodoStatus):
                 update_data["status"] = new_status.value
 
-            if new_status == TodoStatus.COMPLETED and todo.status != TodoStatus.COMPLETED.value:
+            if (
+                new_status == TodoStatus.COMPLETED
+                and todo.status != TodoStatus.COMPLETED.value
+            ):
                 update_data["completed_at"] = datetime.now(UTC)
-            elif new_status != TodoStatus.COMPLETED and todo.status == TodoStatus.COMPLETED.value:
+            elif (
+                new_status != TodoStatus.COMPLETED
+                and todo.status == TodoStatus.COMPLETED.value
+            ):
                 update_data["completed_at"] = None
 
+        if tag_names is not None:
+            # Not a column of todo, so it would not bump updated_at itself.
+            update_data["updated_at"] = datetime.now(UTC)
+
         for key, value in update_data.items():
             setattr(todo, key, value)
 
         await self.db.flush()
-        await self.db.refresh(todo)
+        if tag_names is not None:
+            tags = await TagService(self.db).get_or_create(tag_names, user_id)
+            await self._set_tags(todo, tags)
+        await invalidate_user(self.db, user_id)
+        self._after_write(todo, "todo.updated")
         return todo
 
     async def delete(self, todo_id: int, user_id: int) -> None:
+        """Delete the todo and all its subtasks."""
+        await self.get_by_id_or_404(todo_id, user_id)
+        tree = _subtree(todo_id, user_id)
+        # Tags are not removed by a foreign key; see TodoTag.
+        await self.db.execute(
+            delete(TodoTag).where(TodoTag.todo_id.in_(select(tree.c.id)))
+        )
+        deleted = await self.db.scalars(
+            delete(Todo).where(Todo.id.in_(select(tree.c.id))).returning(Todo.id)
+        )
+        await invalidate_user(self.db, user_id)
+        for deleted_id in deleted.all():
+            on_commit(self.db, partial(reminders.cancel, user_id, deleted_id))
+            event = Event.deleted(user_id, "todo.deleted", deleted_id)
+            publish_on_commit(self.db, event)
+            enqueue(self.db, event)
+
+    async def move(self, todo_id: int, data: TodoMove, user_id: int) -> Todo:
+        """Move the todo, with its subtasks, under another todo or to the top.
+
+        Without ``parent_id`` it keeps its parent. With ``before_id`` or ``after_id`` it also takes a new place in the
+        manual order, which changes only its own rank.
+        """
         todo = await self.get_by_id_or_404(todo_id, user_id)
-        await self.db.delete(todo)
+        # An explicit null is the top level, so unset is told apart from None.
+        reparent = "parent_id" in data.model_fields_set
+        if reparent and data.parent_id is not None:
+            await self._check_parent(data.parent_id, user_id, todo_id)
+        if reparent:
+            # Only the subtree's root changes; its subtasks follow it.
+            todo.parent_id = data.parent_id
+        adjacent_id = data.before_id if data.before_id is not None else data.after_id
+        if adjacent_id is not None and adjacent_id != todo_id:
+            todo.rank = await self._rank_beside(
+                todo_id, adjacent_id, user_id, before=data.before_id is not None
+            )
+            if len(todo.rank) > settings.RANK_REBALANCE_LENGTH:
+                queue_rerank(self.db, user_id)
         await self.db.flush()
+        if reparent and data.parent_id is not None:
+            # SQLite ignores FOR UPDATE and read the check's rows outside the
+            # write transaction. Now that the UPDATE holds the write lock, a
+            # move committed since shows up as a cycle here.
+            await self._check_parent(data.parent_id, user_id, todo_id)
+        await invalidate_user(self.db, user_id)
+        self._after_write(todo, "todo.updated")
+        return todo
+
+    async def restore(self, todo_id: int, user_id: int) -> Todo:
+        """Move an archived todo back into ``todo``."""
+        archived = await self.get_archived_by_id(todo_id, user_id)
+        if archived is None:
+            raise TodoNotFoundError()
+        values = {
+            column.key: getattr(archived, column.key) for column in Todo.__table__.c
+        }
+        # Restored todos count as touched, so the archiver leaves them alone
+        # for another ARCHIVE_AFTER_DAYS.
+        values["updated_at"] = datetime.now(UTC)
+        # Back on top, like a new todo: its old place may be taken or gone.
+        values["rank"] = key_between(None, await first_rank(self.db, user_id))
+        if archived.parent_id is not None:
+            try:
+                await self._check_parent(archived.parent_id, user_id)
+            except (ParentTodoNotFoundError, SubtaskDepthError):
+                # The parent was deleted, is archived or is now too deep.
+                values["parent_id"] = None
+        todo = Todo(**values)
+        # The tags stayed in todo_tag under the same id.
+        set_committed_value(todo, "tags", archived.tags)
+        await self.db.delete(archived)
+        self.db.add(todo)
+        await self.db.flush()
+        await invalidate_user(self.db, user_id)
+        self._after_write(todo, "todo.updated")
+        return todo
+
+    async def _set_tags(self, todo: Todo, tags: list[Tag]) -> None:
+        await TagService(self.db).set_todo_tags(todo.id, tags)
+        set_committed_value(todo, "tags", tags)
+
+    def _after_write(self, todo: Todo, event_type: str) -> None:
+        # Snapshot now: attributes may be expired by the time the commit runs.
+        on_commit(
+            self.db,
+            partial(
+                reminders.reschedule, todo.user_id, todo.id, Reminder.for_todo(todo)
+            ),
+        )
+        event = Event.of(todo.user_id, event_type, TodoResponse.model_validate(todo))
+        publish_on_commit(self.db, event)
+        enqueue(self.db, event)
+
+
+def _list_query[Listed: (Todo, TodoArchive)](
+    model: type[Listed], user_id: int, filters: TodoFilters | None
+) -> Select[tuple[Listed]]:
+    query = (
+        select(model).where(model.user_id == user_id).options(selectinload(model.tags))
+    )
+
+    if filters:
+        if filters.status is not None:
+            query = query.where(model.status == filters.status.value)
+        if filters.priority is not None:
+            query = query.where(model.priority == filters.priority)
+        if filters.category_id is not None:
+            query = query.where(model.category_id == filters.category_id)
+        if filters.due_before is not None:
+            query = query.where(model.due_date <= filters.due_before)
+        if filters.due_after is not None:
+            query = query.where(model.due_date >= filters.due_after)
+        if filters.tags:
+            query = query.where(model.id.in_(_tagged(user_id, filters)))
+
+    if filters and filters.order == TodoOrder.RANK:
+        return query.order_by(model.rank, model.id)
+    return query.order_by(model.created_at.desc())
+
+
+def _tagged(user_id: int, filters: TodoFilters) -> Select[tuple[int]]:
+    """Ids of the todos carrying all (or any) of the filter's tags.
+
+    The names resolve to tag ids through the ``(user_id, name)`` index, and
+    ``todo_tag``'s ``(tag_id, todo_id)`` index yields each tag's todos; with
+    ``match=all``, a todo qualifies if it turns up once per tag.
+    """
+    tags = set(filters.tags or [])
+    query = (
+        select(TodoTag.todo_id)
+        .join(Tag, Tag.id == TodoTag.tag_id)
+        .where(Tag.user_id == user_id, Tag.name.in_(tags))
+    )
+    if filters.match == TagMatch.ALL:
+        query = query.group_by(TodoTag.todo_id).having(func.count() == len(tags))
+    return query
+
+
+def _subtree(todo_id: int, user_id: int) -> CTE:
+    """Recursive CTE of ``(id, depth)`` for the todo and its subtasks."""
+    tree = (
+        select(Todo.id, literal(0).label("depth"))
+        .where(Todo.id == todo_id, Todo.user_id == user_id)
+        .cte("subtree", recursive=True)
+    )
+    child = aliased(Todo)
+    return tree.union_all(
+        select(child.id, tree.c.depth + 1)
+        .join(tree, child.parent_id == tree.c.id)
+        # Stops even if a cycle slipped in; no subtree is deeper anyway.
+        .where(tree.c.depth < settings.SUBTASK_MAX_DEPTH)
+    )
+
+
+def _ancestors(todo_id: int, user_id: int) -> CTE:
+    """Recursive CTE of ``id``s from the todo up to its top-level ancestor."""
+    chain = (
+        select(Todo.id, Todo.parent_id, literal(0).label("level"))
+        .where(Todo.id == todo_id, Todo.user_id == user_id)
+        .cte("ancestors", recursive=True)
+    )
+    parent = aliased(Todo)
+    return chain.union_all(
+        select(parent.id, parent.parent_id, chain.c.level + 1)
+        .join(chain, parent.id == chain.c.parent_id)
+        # Stops even if a cycle slipped in; deeper chains are rejected anyway.
+        .where(chain.c.level <= settings.SUBTASK_MAX_DEPTH)
+    )
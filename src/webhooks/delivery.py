@@ -0,0 +1,357 @@
+"""Deliver todo and category events to users' webhooks.
+
+Runs as an outbox handler. Each claimed batch becomes at most one POST per
+webhook, with changes to the same todo or category coalesced into their net
+effect. The body is signed with the webhook's secret::
+
+    X-Webhook-Signature: t=<unix time>,v1=<hex HMAC-SHA256 of "<t>.<body>">
+
+``X-Webhook-Id`` identifies the delivery. A delivery that still fails after
+its immediate retries is queued as a ``webhook.retry`` message of its own,
+with its body and id, so the outbox retries that webhook alone and the id
+stays the same however often it is sent.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import random
+import time
+from collections import defaultdict
+from collections.abc import Sequence
+from dataclasses import replace
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlsplit
+
+from src.core.config import get_settings
+from src.core.database import get_databases
+from src.core.metrics import metrics
+from src.outbox.models import OutboxMessage
+from src.outbox.service import (
+    OutboxEntry,
+    PartialFailure,
+    register_handler,
+)
+from src.webhooks.models import Webhook
+from src.webhooks.schemas import is_public_address
+from src.webhooks.service import WebhookService
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+WEBHOOK_TOPICS = [
+    f"{entity}.{action}"
+    for entity in ("todo", "category")
+    for action in ("created", "updated", "deleted")
+]
+WEBHOOK_RETRY = "webhook.retry"
+
+
+class WebhookDeliveryError(Exception):
+    pass
+
+
+class WebhookDestinationError(WebhookDeliveryError):
+    pass
+
+
+def coalesce(entries: Sequence[OutboxEntry]) -> list[OutboxEntry]:
+    """Reduce each todo's or category's changes to one event.
+
+    The last change wins, except that something created in the same batch
+    stays "created", and is left out entirely if it was also deleted.
+    """
+    first_action: dict[tuple[str, int], str] = {}
+    latest: dict[tuple[str, int], OutboxEntry] = {}
+    for entry in entries:
+        entity, action = entry.topic.split(".")
+        key = (entity, json.loads(entry.payload)["id"])
+        first_action.setdefault(key, action)
+        latest[key] = entry
+
+    coalesced = []
+    for key, entry in latest.items():
+        if first_action[key] == "created":
+            if entry.topic.endswith(".deleted"):
+                continue
+            entry = replace(entry, topic=f"{key[0]}.created")
+        coalesced.append(entry)
+    return sorted(coalesced, key=lambda entry: entry.id)
+
+
+def render(entries: Sequence[OutboxEntry]) -> bytes:
+    # Payloads are already JSON; splice them in rather than re-encoding.
+    events = ",".join(
+        f'{{"type":"{entry.topic}","created_at":"{entry.created_at.isoformat()}",'
+        f'"data":{entry.payload}}}'
+        for entry in entries
+    )
+    return f'{{"events":[{events}]}}'.encode()
+
+
+def sign(secret: str, timestamp: int, body: bytes) -> str:
+    message = f"{timestamp}.".encode() + body
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def delivery_id(webhook_id: int, entries: Sequence[OutboxEntry]) -> str:
+    ids = ",".join(str(entry.id) for entry in entries)
+    return hashlib.sha256(f"{webhook_id}:{ids}".encode()).hexdigest()[:32]
+
+
+class WebhookDispatcher:
+    """Sends deliveries through one pooled HTTP client.
+
+    At most ``host_concurrency`` requests are in flight per destination
+    host, so one slow receiver cannot take every pooled connection. Failed
+    requests are retried ``attempts`` times with full jitter, all within
+    ``deadline_seconds``, before the delivery is handed to the outbox for a
+    later retry. Connections to a private or loopback address are refused
+    unless ``allow_private`` is set.
+    """
+
+    def __init__(
+        self,
+        timeout: float,
+        max_connections: int,
+        host_concurrency: int,
+        attempts: int,
+        backoff_base_seconds: float,
+        deadline_seconds: float,
+        allow_private: bool = False,
+    ) -> None:
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.host_concurrency = host_concurrency
+        self.attempts = attempts
+        self.backoff_base_seconds = backoff_base_seconds
+        self.deadline_seconds = deadline_seconds
+        self.allow_private = allow_private
+        self._client: httpx.AsyncClient | None = None
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+
+    def client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            # Imported on first delivery to keep app startup cheap.
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                headers={"User-Agent": "todo-api-webhooks"},
+            )
+        return self._client
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.host_concurrency)
+        return self._host_limits[host]
+
+    async def _check_peer(self, event: str, info: dict[str, Any]) -> None:
+        """httpcore trace hook: refuse connections to non-public addresses.
+
+        Runs once a connection is open and before anything is sent on it, so
+        the address checked is the one connected to. Resolving the host to
+        check it beforehand would not do: the second lookup, when connecting,
+        could be answered differently (DNS rebinding).
+        """
+        if event != "connection.connect_tcp.complete":
+            return
+        stream = info["return_value"]
+        address = stream.get_extra_info("server_addr")
+        host = None if address is None else str(address[0])
+        if host is None or not is_public_address(host):
+            await stream.aclose()
+            raise WebhookDestinationError(f"{host} is not a public address")
+
+    async def send(self, webhook: Webhook, body: bytes, delivery: str) -> None:
+        try:
+            async with asyncio.timeout(self.deadline_seconds):
+                await self._send(webhook, body, delivery)
+        except WebhookDestinationError as exc:
+            logger.warning("Webhook %d refused: %s", webhook.id, exc)
+            metrics.incr("webhooks.refused")
+        except TimeoutError:
+            metrics.incr("webhooks.failed")
+            raise WebhookDeliveryError(
+                f"webhook {webhook.id}: no success in {self.deadline_seconds}s"
+            ) from None
+
+    async def _send(self, webhook: Webhook, body: bytes, delivery: str) -> None:
+        import httpx
+
+        error = ""
+        extensions = {} if self.allow_private else {"trace": self._check_peer}
+        async with self._host_limit(webhook.url):
+            for attempt in range(self.attempts):
+                if attempt:
+                    cap = self.backoff_base_seconds * 2 ** (attempt - 1)
+                    await asyncio.sleep(random.uniform(0, cap))
+                timestamp = int(time.time())
+                headers = {
+                    "Content-Type": "application/json",
+                    "X-Webhook-Id": delivery,
+                    "X-Webhook-Signature": (
+                        f"t={timestamp},v1={sign(webhook.secret, timestamp, body)}"
+                    ),
+                }
+                try:
+                    response = await self.client().post(
+                        webhook.url,
+                        content=body,
+                        headers=headers,
+                        extensions=extensions,
+                    )
+                except httpx.HTTPError as exc:
+                    error = repr(exc)
+                    continue
+                if response.is_success:
+                    metrics.incr("webhooks.delivered")
+                    return
+                if response.is_client_error and response.status_code not in (408, 429):
+                    # The receiver refuses this delivery; retrying won't help.
+                    logger.warning(
+                        "Webhook %d rejected delivery %s: HTTP %d",
+                        webhook.id,
+                        delivery,
+                        response.status_code,
+                    )
+                    metrics.incr("webhooks.rejected")
+                    return
+                error = f"HTTP {response.status_code}"
+        metrics.incr("webhooks.failed")
+        raise WebhookDeliveryError(f"webhook {webhook.id}: {error}")
+
+    async def _webhooks_for(self, entries: Sequence[OutboxEntry]) -> list[Webhook]:
+        users_by_shard: defaultdict[int, set[int]] = defaultdict(set)
+        for entry in entries:
+            users_by_shard[entry.shard].add(entry.user_id)
+        webhooks: list[Webhook] = []
+        session_factory = get_databases().session_factory
+        for shard, user_ids in users_by_shard.items():
+            async with session_factory(info={"shard": shard}) as db:
+                webhooks += await WebhookService(db).list_by_users(sorted(user_ids))
+        return webhooks
+
+    async def handle(self, entries: Sequence[OutboxEntry]) -> None:
+        webhooks = await self._webhooks_for(entries)
+        if not webhooks:
+            return
+        by_user: defaultdict[int, list[OutboxEntry]] = defaultdict(list)
+        for entry in entries:
+            by_user[entry.user_id].append(entry)
+        events = {user_id: coalesce(batch) for user_id, batch in by_user.items()}
+
+        deliveries = [
+            (
+                webhook,
+                render(events[webhook.user_id]),
+                delivery_id(webhook.id, events[webhook.user_id]),
+            )
+            for webhook in webhooks
+            if events[webhook.user_id]
+        ]
+        results = await asyncio.gather(
+            *(self.send(*delivery) for delivery in deliveries),
+            return_exceptions=True,
+        )
+        shards = {entry.user_id: entry.shard for entry in entries}
+        retries: defaultdict[int, list[OutboxMessage]] = defaultdict(list)
+        for (webhook, body, delivery), result in zip(deliveries, results, strict=True):
+            if not isinstance(result, BaseException):
+                continue
+            if not isinstance(result, Exception):
+                raise result
+            payload = {"webhook_id": webhook.id, "id": delivery, "body": body.decode()}
+            retries[shards[webhook.user_id]].append(
+                OutboxMessage(
+                    user_id=webhook.user_id,
+                    topic=WEBHOOK_RETRY,
+                    payload=json.dumps(payload),
+                    # The attempt just made counts towards OUTBOX_MAX_ATTEMPTS.
+                    attempts=1,
+                    last_error=repr(result),
+                    available_at=datetime.now(UTC)
+                    + timedelta(seconds=settings.OUTBOX_BACKOFF_BASE_SECONDS),
+                )
+            )
+        # If this fails, the whole batch is retried instead.
+        session_factory = get_databases().session_factory
+        for shard, messages in retries.items():
+            async with session_factory(info={"shard": shard}) as db:
+                db.add_all(messages)
+                await db.commit()
+
+    async def retry(self, entries: Sequence[OutboxEntry]) -> None:
+        """Resend deliveries queued by ``handle``; only failed ones are retried."""
+        payloads = {entry.id: json.loads(entry.payload) for entry in entries}
+        webhooks: dict[int, Webhook] = {}
+        session_factory = get_databases().session_factory
+        for shard in {entry.shard for entry in entries}:
+            webhook_ids = [
+                payloads[entry.id]["webhook_id"]
+                for entry in entries
+                if entry.shard == shard
+            ]
+            async with session_factory(info={"shard": shard}) as db:
+                for webhook in await WebhookService(db).list_by_ids(webhook_ids):
+                    webhooks[webhook.id] = webhook
+
+        # Deliveries to webhooks deleted since are dropped.
+        pending = [
+            entry for entry in entries if payloads[entry.id]["webhook_id"] in webhooks
+        ]
+        results = await asyncio.gather(
+            *(
+                self.send(
+                    webhooks[payloads[entry.id]["webhook_id"]],
+                    payloads[entry.id]["body"].encode(),
+                    payloads[entry.id]["id"],
+                )
+                for entry in pending
+            ),
+            return_exceptions=True,
+        )
+        errors: dict[int, str] = {}
+        for entry, result in zip(pending, results, strict=True):
+            if isinstance(result, Exception):
+                errors[entry.id] = repr(result)
+            elif isinstance(result, BaseException):
+                raise result
+        if errors:
+            raise PartialFailure(errors)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def build_webhook_dispatcher() -> WebhookDispatcher:
+    return WebhookDispatcher(
+        timeout=settings.WEBHOOK_TIMEOUT_SECONDS,
+        max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+        host_concurrency=settings.WEBHOOK_HOST_CONCURRENCY,
+        attempts=settings.WEBHOOK_ATTEMPTS,
+        backoff_base_seconds=settings.WEBHOOK_BACKOFF_BASE_SECONDS,
+        # A batch can run both webhook handlers; the last third of the claim's
+        # lease is left for the other handlers and for finishing the batch.
+        deadline_seconds=settings.OUTBOX_LEASE_SECONDS / 3,
+        allow_private=settings.WEBHOOK_ALLOW_PRIVATE_URLS,
+    )
+
+
+dispatcher = build_webhook_dispatcher()
+register_handler(WEBHOOK_TOPICS, dispatcher.handle)
+register_handler([WEBHOOK_RETRY], dispatcher.retry)
@@ -0,0 +1,11 @@
+from src.core.exceptions import ConflictError, NotFoundError
+
+
+class WebhookNotFoundError(NotFoundError):
+    code = "WEBHOOK_NOT_FOUND"
+    message = "Webhook not found"
+
+
+class WebhookLimitError(ConflictError):
+    code = "WEBHOOK_LIMIT"
+    message = "Webhook limit reached"
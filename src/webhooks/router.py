@@ -0,0 +1,59 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth.dependencies import get_current_user
+from src.auth.schemas import CurrentUser
+from src.core.database import get_db, get_read_db, read_only
+from src.webhooks.models import Webhook
+from src.webhooks.schemas import (
+    WebhookCreate,
+    WebhookCreatedResponse,
+    WebhookResponse,
+)
+from src.webhooks.service import WebhookService
+
+router = APIRouter()
+
+
+@router.get("", response_model=list[WebhookResponse])
+@read_only
+async def list_webhooks(
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+) -> list[Webhook]:
+    """List the current user's webhooks."""
+    return await WebhookService(db).list_by_user(current_user.id)
+
+
+@router.post(
+    "",
+    response_model=WebhookCreatedResponse,
+    status_code=status.HTTP_201_CREATED,
+    responses={409: {"description": "Webhook limit reached"}},
+)
+async def create_webhook(
+    data: WebhookCreate,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+) -> Webhook:
+    """Register a URL to receive the current user's todo and category events.
+
+    The response includes the signing secret; it is not shown again.
+    """
+    return await WebhookService(db).create(data, current_user.id)
+
+
+@router.delete(
+    "/{webhook_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={404: {"description": "Webhook not found"}},
+)
+async def delete_webhook(
+    webhook_id: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+) -> None:
+    """Delete a webhook."""
+    await WebhookService(db).delete(webhook_id, current_user.id)
@@ -0,0 +1,54 @@
+import ipaddress
+from datetime import datetime
+
+from pydantic import AnyHttpUrl, Field, field_validator
+
+from src.core.config import get_settings
+from src.core.schemas import BaseSchema
+
+settings = get_settings()
+
+
+def is_public_address(address: str) -> bool:
+    """Whether ``address`` is an IP that is routable on the internet.
+
+    False for loopback, private (RFC 1918), link-local (such as the cloud
+    metadata endpoint 169.254.169.254) and other reserved ranges.
+    """
+    ip = ipaddress.ip_address(address)
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global
+
+
+class WebhookCreate(BaseSchema):
+    url: AnyHttpUrl = Field(max_length=2048)
+
+    @field_validator("url")
+    @classmethod
+    def _public_destination(cls, url: AnyHttpUrl) -> AnyHttpUrl:
+        # Names are checked at each delivery, against the address connected to.
+        if settings.WEBHOOK_ALLOW_PRIVATE_URLS:
+            return url
+        host = (url.host or "").strip("[]").lower()
+        if host == "localhost" or host.endswith(".localhost"):
+            raise ValueError("must not point to a loopback address")
+        try:
+            public = is_public_address(host)
+        except ValueError:
+            return url  # a name
+        if not public:
+            raise ValueError("must not point to a private or loopback address")
+        return url
+
+
+class WebhookResponse(BaseSchema):
+    id: int
+    url: str
+    created_at: datetime
+
+
+class WebhookCreatedResponse(WebhookResponse):
+    """Returned once, on creation: the only time the secret is shown."""
+
+    secret: str
@@ -0,0 +1,63 @@
+import secrets
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import get_settings
+from src.webhooks.exceptions import WebhookLimitError, WebhookNotFoundError
+from src.webhooks.models import Webhook
+from src.webhooks.schemas import WebhookCreate
+
+settings = get_settings()
+
+
+class WebhookService:
+    def __init__(self, db: AsyncSession) -> None:
+        self.db = db
+
+    async def get_by_id_or_404(self, webhook_id: int, user_id: int) -> Webhook:
+        result = await self.db.execute(
+            select(Webhook).where(Webhook.id == webhook_id, Webhook.user_id == user_id)
+        )
+        webhook = result.scalar_one_or_none()
+        if webhook is None:
+            raise WebhookNotFoundError()
+        return webhook
+
+    async def list_by_user(self, user_id: int) -> list[Webhook]:
+        result = await self.db.execute(
+            select(Webhook).where(Webhook.user_id == user_id).order_by(Webhook.id)
+        )
+        return list(result.scalars().all())
+
+    async def list_by_users(self, user_ids: list[int]) -> list[Webhook]:
+        result = await self.db.execute(
+            select(Webhook).where(Webhook.user_id.in_(user_ids)).order_by(Webhook.id)
+        )
+        return list(result.scalars().all())
+
+    async def list_by_ids(self, webhook_ids: list[int]) -> list[Webhook]:
+        result = await self.db.execute(
+            select(Webhook).where(Webhook.id.in_(webhook_ids)).order_by(Webhook.id)
+        )
+        return list(result.scalars().all())
+
+    async def create(self, data: WebhookCreate, user_id: int) -> Webhook:
+        count = await self.db.scalar(
+            select(func.count()).where(Webhook.user_id == user_id)
+        )
+        if count is not None and count >= settings.WEBHOOK_MAX_PER_USER:
+            raise WebhookLimitError()
+        webhook = Webhook(
+            user_id=user_id,
+            url=str(data.url),
+            secret=secrets.token_urlsafe(32),
+        )
+        self.db.add(webhook)
+        await self.db.flush()
+        return webhook
+
+    async def delete(self, webhook_id: int, user_id: int) -> None:
+        webhook = await self.get_by_id_or_404(webhook_id, user_id)
+        await self.db.delete(webhook)
+        await self.db.flush()
@@ -1,31 +1,97 @@
-from collections.abc import AsyncGenerator
+import os
+import tempfile
+from collections.abc import AsyncGenerator, Iterator
 
 import pytest
 from httpx import ASGITransport, AsyncClient
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
+from src.auth.passwords import BcryptHasher, set_password_hasher
 from src.auth.schemas import UserCreate
 from src.auth.service import AuthService, create_access_token
-from src.core.database import Base, get_db
+from src.auth.throttle import login_throttle
+from src.core import database
+from src.core.cache import InMemoryCache, set_cache
+from src.core.database import Base, Databases, Shard, get_db, get_read_db
+from src.core.ratelimit import InMemoryRateLimitBackend, set_rate_limit_backend
 from src.main import app
+from src.outbox import service as outbox_service
 
-# Test database URL (in-memory SQLite)
+# Tests always run against in-memory SQLite. Set TEST_POSTGRES_URL to a
+# postgresql+asyncpg:// URL (or to "embedded" to start a throwaway server via
+# the pgserver package) to run every database test against PostgreSQL too.
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+TEST_POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+DATABASE_BACKENDS = ["sqlite"] + (["postgresql"] if TEST_POSTGRES_URL else [])
+
+
+@pytest.fixture(scope="session")
+def postgres_url() -> Iterator[str]:
+    assert TEST_POSTGRES_URL is not None
+    if TEST_POSTGRES_URL != "embedded":
+        yield TEST_POSTGRES_URL
+        return
+
+    import pgserver
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        server = pgserver.get_server(data_dir, cleanup_mode="stop")
+        yield server.get_uri().replace("postgresql://", "postgresql+asyncpg://", 1)
+        server.cleanup()
+
+
+@pytest.fixture(params=DATABASE_BACKENDS)
+async def test_engine(request: pytest.FixtureRequest) -> AsyncGenerator[AsyncEngine]:
+    if request.param == "postgresql":
+        url = request.getfixturevalue("postgres_url")
+    else:
+        url = TEST_DATABASE_URL
+    engine = create_async_engine(url, echo=False)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limits() -> None:
+    """Give each test fresh rate-limit buckets."""
+    set_rate_limit_backend(InMemoryRateLimitBackend())
 
-test_engine = create_async_engine(TEST_DATABASE_URL, echo=False)
-test_async_session = async_sessionmaker(
-    test_engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+
+@pytest.fixture(autouse=True)
+def fast_password_hashing() -> None:
+    """Use the minimum bcrypt cost; tests check behaviour, not hash strength."""
+    set_password_hasher(BcryptHasher(rounds=4))
+
+
+@pytest.fixture(autouse=True)
+def reset_cache() -> None:
+    """Database ids restart in every test, so cached results must not leak."""
+    set_cache(InMemoryCache())
+
+
+@pytest.fixture(autouse=True)
+def reset_login_throttle() -> None:
+    """Failure counters live in the throttle, outside the cache."""
+    login_throttle.clear()
 
 
 @pytest.fixture
-async def db() -> AsyncGenerator[AsyncSession]:
+async def db(test_engine: AsyncEngine) -> AsyncGenerator[AsyncSession]:
     """Create a fresh database for each test."""
     async with test_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
+    test_async_session = async_sessionmaker(
+        test_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
     async with test_async_session() as session:
         yield session
         await session.rollback()
@@ -34,6 +100,22 @@ async def db() -> AsyncGenerator[AsyncSession]:
         await conn.run_sync(Base.metadata.drop_all)
 
 
+@pytest.fixture
+def test_databases(test_engine: AsyncEngine, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Point ``get_databases()``, and so background jobs, at the test engine."""
+    monkeypatch.setattr(
+        database,
+        "_databases",
+        Databases(test_engine, [Shard(test_engine, test_engine)]),
+    )
+
+
+@pytest.fixture
+def isolated_outbox(test_databases: None, monkeypatch: pytest.MonkeyPatch) -> None:
+    """The test databases, with no outbox handlers registered."""
+    monkeypatch.setattr(outbox_service, "_handlers", [])
+
+
 @pytest.fixture
 async def client(db: AsyncSession) -> AsyncGenerator[AsyncClient]:
     """Create an async test client with database override."""
@@ -42,6 +124,7 @@ async def client(db: AsyncSession) -> AsyncGenerator[AsyncClient]:
         yield db
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
 
     transport = ASGITransport(app=app)  # type: ignore[arg-type]
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
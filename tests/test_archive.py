@@ -0,0 +1,213 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth.deletion import purge_user
+from src.auth.models import User
+from src.core.cache import get_user_revision
+from src.core.database import Base
+from src.todos.archive import archive_all_shards, archive_completed
+from src.todos.models import Todo, TodoArchive, TodoStatus
+
+pytestmark = pytest.mark.usefixtures("test_databases")
+
+NOW = datetime.now(UTC)
+CUTOFF = NOW - timedelta(days=30)
+
+
+async def count(db: AsyncSession, model: type[Base]) -> int:
+    return await db.scalar(select(func.count()).select_from(model)) or 0
+
+
+async def add_todo(
+    db: AsyncSession,
+    title: str,
+    completed_days_ago: float | None = None,
+    updated_days_ago: float = 0,
+    user_id: int = 1,
+    category_id: int | None = None,
+) -> int:
+    completed = completed_days_ago is not None
+    todo_id = await db.scalar(
+        insert(Todo)
+        .values(
+            user_id=user_id,
+            title=title,
+            category_id=category_id,
+            status=TodoStatus.COMPLETED.value if completed else "pending",
+            completed_at=NOW - timedelta(days=completed_days_ago)
+            if completed
+            else None,
+            created_at=NOW - timedelta(days=60, seconds=-len(title)),
+            updated_at=NOW - timedelta(days=updated_days_ago),
+        )
+        .returning(Todo.id)
+    )
+    await db.commit()
+    assert todo_id is not None
+    return todo_id
+
+
+async def user_id(db: AsyncSession) -> int:
+    first = await db.scalar(select(User.id).order_by(User.id))
+    assert first is not None
+    return first
+
+
+@pytest.mark.usefixtures("auth_headers")
+class TestArchiver:
+    async def test_moves_only_long_completed_untouched_todos(
+        self, db: AsyncSession
+    ) -> None:
+        owner = await user_id(db)
+        old = [await add_todo(db, f"old {n}", 40, 40, owner) for n in range(5)]
+        await add_todo(db, "open", updated_days_ago=40, user_id=owner)
+        await add_todo(db, "recent", 5, 5, owner)
+        await add_todo(db, "edited", 40, 1, owner)
+        revision = await get_user_revision(owner)
+
+        assert await archive_completed(db, CUTOFF, batch_size=2) == 5
+        db.expire_all()
+        archived = (
+            await db.scalars(select(TodoArchive).order_by(TodoArchive.id))
+        ).all()
+        assert [todo.id for todo in archived] == old
+        assert all(todo.archived_at >= NOW for todo in archived)
+        assert archived[0].title == "old 0"
+        assert archived[0].status == TodoStatus.COMPLETED.value
+        assert set(await db.scalars(select(Todo.title))) == {"open", "recent", "edited"}
+        assert await get_user_revision(owner) > revision
+
+        assert await archive_completed(db, CUTOFF, batch_size=2) == 0
+
+    async def test_archive_all_shards(self, db: AsyncSession) -> None:
+        owner = await user_id(db)
+        await add_todo(db, "old", 40, 40, owner)
+        assert await archive_all_shards() == 1
+
+    async def test_account_purge_includes_archive(self, db: AsyncSession) -> None:
+        owner = await user_id(db)
+        await add_todo(db, "old", 40, 40, owner)
+        await archive_completed(db, CUTOFF, batch_size=10)
+        await purge_user(db, owner, batch_size=10)
+        assert await count(db, TodoArchive) == 0
+
+
+class TestArchivedReads:
+    async def test_listed_only_with_include_archived(
+        self, client: AsyncClient, db: AsyncSession, auth_headers: dict[str, str]
+    ) -> None:
+        owner = await user_id(db)
+        await add_todo(db, "archived", 40, 40, owner)
+        await add_todo(db, "current", user_id=owner)
+        await add_todo(db, "also archived", 40, 40, owner)
+        await archive_completed(db, CUTOFF, batch_size=10)
+
+        response = await client.get("/todos", headers=auth_headers)
+        assert [todo["title"] for todo in response.json()] == ["current"]
+
+        response = await client.get(
+            "/todos", params={"include_archived": "true"}, headers=auth_headers
+        )
+        todos = response.json()
+        # Newest first across both tables.
+        assert [todo["title"] for todo in todos] == [
+            "also archived",
+            "archived",
+            "current",
+        ]
+        assert todos[0]["archived_at"] is not None
+        assert todos[2]["archived_at"] is None
+
+        response = await client.get(
+            "/todos",
+            params={"include_archived": "true", "status": "pending"},
+            headers=auth_headers,
+        )
+        assert [todo["title"] for todo in response.json()] == ["current"]
+
+    async def test_get_by_id(
+        self, client: AsyncClient, db: AsyncSession, auth_headers: dict[str, str]
+    ) -> None:
+        todo_id = await add_todo(db, "archived", 40, 40, await user_id(db))
+        await archive_completed(db, CUTOFF, batch_size=10)
+
+        response = await client.get(f"/todos/{todo_id}", headers=auth_headers)
+        assert response.status_code == 404
+        response = await client.get(
+            f"/todos/{todo_id}",
+            params={"include_archived": "true"},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+        assert response.json()["title"] == "archived"
+        response = await client.patch(
+            f"/todos/{todo_id}", json={"title": "x"}, headers=auth_headers
+        )
+        assert response.status_code == 404
+
+
+class TestRestore:
+    async def test_restore_keeps_id_and_stays_current(
+        self, client: AsyncClient, db: AsyncSession, auth_headers: dict[str, str]
+    ) -> None:
+        todo_id = await add_todo(db, "archived", 40, 40, await user_id(db))
+        await archive_completed(db, CUTOFF, batch_size=10)
+        # Never handed out again while the todo is archived.
+        response = await client.post(
+            "/todos", json={"title": "new"}, headers=auth_headers
+        )
+        assert response.json()["id"] != todo_id
+
+        response = await client.post(f"/todos/{todo_id}/restore", headers=auth_headers)
+        assert response.status_code == 200
+        restored = response.json()
+        assert restored["id"] == todo_id
+        assert restored["status"] == "completed"
+        assert restored["archived_at"] is None
+        await db.commit()
+
+        response = await client.get("/todos", headers=auth_headers)
+        assert {todo["title"] for todo in response.json()} == {"archived", "new"}
+        # Restoring counts as a change, so the next pass leaves it.
+        assert await archive_completed(db, CUTOFF, batch_size=10) == 0
+
+        response = await client.post(f"/todos/{todo_id}/restore", headers=auth_headers)
+        assert response.status_code == 404
+
+    async def test_cannot_restore_other_users_todo(
+        self,
+        client: AsyncClient,
+        db: AsyncSession,
+        auth_headers: dict[str, str],
+        second_user_headers: dict[str, str],
+    ) -> None:
+        todo_id = await add_todo(db, "archived", 40, 40, await user_id(db))
+        await archive_completed(db, CUTOFF, batch_size=10)
+        response = await client.post(
+            f"/todos/{todo_id}/restore", headers=second_user_headers
+        )
+        assert response.status_code == 404
+        assert response.json()["code"] == "TODO_NOT_FOUND"
+
+
+async def test_category_delete_unfiles_archived_todos(
+    client: AsyncClient, db: AsyncSession, auth_headers: dict[str, str]
+) -> None:
+    category = await client.post(
+        "/categories", json={"name": "Work"}, headers=auth_headers
+    )
+    category_id = category.json()["id"]
+    await db.commit()
+    await add_todo(db, "archived", 40, 40, await user_id(db), category_id)
+    await archive_completed(db, CUTOFF, batch_size=10)
+
+    response = await client.delete(f"/categories/{category_id}", headers=auth_headers)
+    assert response.status_code == 204
+    db.expire_all()
+    archived = await db.scalar(select(TodoArchive))
+    assert archived is not None
+    assert archived.category_id is None
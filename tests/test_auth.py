@@ -1,4 +1,27 @@
+import time
+from datetime import UTC, datetime, timedelta
+
+import pytest
 from httpx import AsyncClient
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth.models import RefreshToken
+from src.auth.revocation import RevocationList, purge_expired_tokens
+
+CREDENTIALS = {"email": "session@example.com", "password": "securepass123"}
+
+
+async def login(client: AsyncClient) -> dict[str, str]:
+    await client.post("/auth/register", json=CREDENTIALS)
+    response = await client.post("/auth/login", json=CREDENTIALS)
+    assert response.status_code == 200
+    tokens: dict[str, str] = response.json()
+    return tokens
+
+
+def bearer(tokens: dict[str, str]) -> dict[str, str]:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
 
 
 class TestRegister:
@@ -54,7 +77,9 @@ class TestLogin:
         assert response.status_code == 200
         data = response.json()
         assert "access_token" in data
+        assert "refresh_token" in data
         assert data["token_type"] == "bearer"
+        assert data["expires_in"] == 15 * 60
 
     async def test_login_wrong_password(self, client: AsyncClient) -> None:
         await client.post(
@@ -98,3 +123,135 @@ class TestMe:
         )
         assert response.status_code == 401
         assert response.json()["code"] == "INVALID_TOKEN"
+
+
+class TestRefresh:
+    async def test_refresh_rotates_tokens(self, client: AsyncClient) -> None:
+        tokens = await login(client)
+        response = await client.post(
+            "/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+        )
+        assert response.status_code == 200
+        rotated = response.json()
+        assert rotated["refresh_token"] != tokens["refresh_token"]
+
+        response = await client.get("/auth/me", headers=bearer(rotated))
+        assert response.json()["email"] == CREDENTIALS["email"]
+
+    async def test_reused_refresh_token_revokes_session(
+        self, client: AsyncClient
+    ) -> None:
+        tokens = await login(client)
+        old = {"refresh_token": tokens["refresh_token"]}
+        rotated = (await client.post("/auth/refresh", json=old)).json()
+
+        response = await client.post("/auth/refresh", json=old)
+        assert response.status_code == 401
+        assert response.json()["code"] == "TOKEN_REVOKED"
+        # The legitimate holder's tokens die with the session.
+        response = await client.post(
+            "/auth/refresh", json={"refresh_token": rotated["refresh_token"]}
+        )
+        assert response.json()["code"] == "TOKEN_REVOKED"
+        response = await client.get("/auth/me", headers=bearer(rotated))
+        assert response.json()["code"] == "TOKEN_REVOKED"
+
+    async def test_expired_refresh_token(
+        self, client: AsyncClient, db: AsyncSession
+    ) -> None:
+        tokens = await login(client)
+        await db.execute(
+            update(RefreshToken).values(
+                expires_at=datetime.now(UTC) - timedelta(seconds=1)
+            )
+        )
+        response = await client.post(
+            "/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+        )
+        assert response.status_code == 401
+        assert response.json()["code"] == "TOKEN_EXPIRED"
+
+    @pytest.mark.parametrize("token", ["garbage", "1.garbage", "1"])
+    async def test_unknown_refresh_token(self, client: AsyncClient, token: str) -> None:
+        await login(client)
+        response = await client.post("/auth/refresh", json={"refresh_token": token})
+        assert response.status_code == 401
+        assert response.json()["code"] == "INVALID_TOKEN"
+
+
+class TestLogout:
+    async def test_logout_revokes_access_and_refresh(self, client: AsyncClient) -> None:
+        tokens = await login(client)
+        other_session = (await client.post("/auth/login", json=CREDENTIALS)).json()
+        response = await client.post(
+            "/auth/logout", json={"refresh_token": tokens["refresh_token"]}
+        )
+        assert response.status_code == 204
+
+        response = await client.get("/todos", headers=bearer(tokens))
+        assert response.status_code == 401
+        assert response.json()["code"] == "TOKEN_REVOKED"
+        response = await client.post(
+            "/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+        )
+        assert response.json()["code"] == "TOKEN_REVOKED"
+        # Other sessions of the same user are unaffected.
+        response = await client.get("/todos", headers=bearer(other_session))
+        assert response.status_code == 200
+
+
+class TestRevocationList:
+    def test_prune_drops_entries_older_than_token_lifetime(self) -> None:
+        revoked = RevocationList(token_lifetime=60)
+        now = time.time()
+        revoked.revoke("old", now - 61)
+        revoked.revoke("new", now - 59)
+        revoked.prune(now)
+        assert "old" not in revoked
+        assert "new" in revoked
+
+    @pytest.mark.usefixtures("test_databases")
+    async def test_sync_loads_other_workers_revocations(
+        self, client: AsyncClient, db: AsyncSession
+    ) -> None:
+        tokens = await login(client)
+        await client.post(
+            "/auth/logout", json={"refresh_token": tokens["refresh_token"]}
+        )
+        await db.commit()
+
+        # A worker that did not see the logout learns about it on sync.
+        revoked = RevocationList(token_lifetime=60)
+        await revoked.sync()
+        assert len(revoked) == 1
+
+    @pytest.mark.usefixtures("test_databases")
+    async def test_purge_deletes_expired_and_long_revoked_tokens(
+        self, client: AsyncClient, db: AsyncSession
+    ) -> None:
+        sessions = [await login(client) for _ in range(4)]
+        for tokens in sessions[:2]:
+            await client.post(
+                "/auth/logout", json={"refresh_token": tokens["refresh_token"]}
+            )
+        ids = (
+            await db.scalars(select(RefreshToken.id).order_by(RefreshToken.id))
+        ).all()
+        now = datetime.now(UTC)
+        await db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.id == ids[0])
+            .values(revoked_at=now - timedelta(days=1))
+        )
+        await db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.id == ids[2])
+            .values(expires_at=now - timedelta(seconds=1))
+        )
+        await db.commit()
+
+        assert await purge_expired_tokens(batch_size=1) == 2
+        db.expire_all()
+        remaining = await db.scalars(select(RefreshToken.id).order_by(RefreshToken.id))
+        # The recent logout stays for sync; the live session is untouched.
+        assert remaining.all() == [ids[1], ids[3]]
@@ -0,0 +1,261 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth.schemas import UserCreate
+from src.auth.service import AuthService
+from src.categories.models import Category
+from src.core.cache import (
+    InMemoryCache,
+    apply_pending_invalidations,
+    set_invalidation_relay,
+)
+from src.core.metrics import metrics
+from src.events.hub import CACHE_INVALIDATED, hub
+from src.events.schemas import Event
+from src.todos.models import Todo
+from src.todos.schemas import TodoCreate, TodoFilters
+from src.todos.service import TodoService
+
+
+class TestInMemoryCache:
+    async def test_lru_eviction(self) -> None:
+        cache = InMemoryCache(max_entries=2)
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        await cache.get("a")  # "b" is now least recently used
+        await cache.set("c", 3)
+        assert await cache.get("a") == 1
+        assert await cache.get("b") is None
+        assert await cache.get("c") == 3
+
+    async def test_ttl_expiry(self) -> None:
+        cache = InMemoryCache()
+        await cache.set("a", 1, ttl=-1)
+        assert await cache.get("a") is None
+
+    async def test_counters_survive_eviction(self) -> None:
+        cache = InMemoryCache(max_entries=1)
+        await cache.incr("rev")
+        await cache.incr("rev")
+        await cache.set("x", 1)
+        await cache.set("y", 2)
+        assert await cache.get("rev") == 2
+
+
+class TestTodoListCache:
+    def counts(self) -> tuple[float, float]:
+        return metrics.get("cache.todos.hit"), metrics.get("cache.todos.miss")
+
+    async def test_repeat_reads_hit(self, db: AsyncSession) -> None:
+        user = await AuthService(db).create_user(
+            UserCreate(email="cache@example.com", password="testpassword123")
+        )
+        service = TodoService(db)
+        await service.create(TodoCreate(title="Cached"), user.id)
+        hits, misses = self.counts()
+
+        first = await service.list_by_user_cached(user.id, TodoFilters())
+        second = await service.list_by_user_cached(user.id, None)
+
+        assert first == second
+        assert self.counts() == (hits + 1, misses + 1)
+
+    async def test_distinct_filters_cached_separately(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        await client.post(
+            "/todos", json={"title": "P1", "priority": 1}, headers=auth_headers
+        )
+        all_todos = await client.get("/todos", headers=auth_headers)
+        filtered = await client.get("/todos?priority=2", headers=auth_headers)
+        assert len(all_todos.json()) == 1
+        assert filtered.json() == []
+
+    async def test_invalidated_by_todo_writes(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        created = await client.post(
+            "/todos", json={"title": "Original"}, headers=auth_headers
+        )
+        todo_id = created.json()["id"]
+        await client.get("/todos", headers=auth_headers)
+
+        await client.patch(
+            f"/todos/{todo_id}", json={"title": "Renamed"}, headers=auth_headers
+        )
+        response = await client.get("/todos", headers=auth_headers)
+        assert response.json()[0]["title"] == "Renamed"
+
+        await client.delete(f"/todos/{todo_id}", headers=auth_headers)
+        response = await client.get("/todos", headers=auth_headers)
+        assert response.json() == []
+
+    async def test_invalidated_by_category_delete(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        category = await client.post(
+            "/categories", json={"name": "Work"}, headers=auth_headers
+        )
+        category_id = category.json()["id"]
+        await client.post(
+            "/todos",
+            json={"title": "Report", "category_id": category_id},
+            headers=auth_headers,
+        )
+        await client.get("/todos", headers=auth_headers)
+
+        await client.delete(f"/categories/{category_id}", headers=auth_headers)
+        response = await client.get("/todos", headers=auth_headers)
+        assert response.json()[0]["category_id"] is None
+
+    async def test_isolated_per_user(
+        self,
+        client: AsyncClient,
+        auth_headers: dict[str, str],
+        second_user_headers: dict[str, str],
+    ) -> None:
+        await client.post("/todos", json={"title": "Mine"}, headers=auth_headers)
+        await client.get("/todos", headers=auth_headers)
+        response = await client.get("/todos", headers=second_user_headers)
+        assert response.json() == []
+
+    async def test_commits_relayed_to_other_workers(
+        self, db: AsyncSession, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        relayed: list[int] = []
+        monkeypatch.setattr("src.core.cache._relay", None)
+        set_invalidation_relay(relayed.append)
+        user = await AuthService(db).create_user(
+            UserCreate(email="relay@example.com", password="testpassword123")
+        )
+        await TodoService(db).create(TodoCreate(title="Relayed"), user.id)
+        assert relayed == []  # not before the commit
+
+        await db.commit()
+        await apply_pending_invalidations(db)
+        assert relayed == [user.id]
+
+    async def test_invalidated_by_other_workers(self, db: AsyncSession) -> None:
+        user = await AuthService(db).create_user(
+            UserCreate(email="other@example.com", password="testpassword123")
+        )
+        service = TodoService(db)
+        assert await service.list_by_user_cached(user.id, None) == []
+
+        # Another worker's write: the database changes, this cache does not.
+        db.add(Todo(title="Elsewhere", user_id=user.id))
+        await db.flush()
+        assert await service.list_by_user_cached(user.id, None) == []
+
+        hub.deliver(Event(user.id, CACHE_INVALIDATED, "null"))
+        await asyncio.sleep(0)
+        todos = await service.list_by_user_cached(user.id, None)
+        assert [todo.title for todo in todos] == ["Elsewhere"]
+
+
+class TestResponseCache:
+    def counts(self) -> tuple[float, float]:
+        return metrics.get("cache.responses.hit"), metrics.get("cache.responses.miss")
+
+    async def test_repeat_reads_served_from_bytes(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        await client.post("/todos", json={"title": "Cached"}, headers=auth_headers)
+        hits, misses = self.counts()
+
+        first = await client.get("/todos?status=pending", headers=auth_headers)
+        second = await client.get("/todos?status=pending", headers=auth_headers)
+
+        assert first.content == second.content
+        assert first.headers["etag"] == second.headers["etag"]
+        assert self.counts() == (hits + 1, misses + 1)
+
+    async def test_query_order_normalized(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        await client.get("/todos?priority=1&status=pending", headers=auth_headers)
+        hits, _ = self.counts()
+        await client.get("/todos?status=pending&priority=1", headers=auth_headers)
+        assert self.counts()[0] == hits + 1
+
+    async def test_not_modified(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        first = await client.get("/categories", headers=auth_headers)
+        response = await client.get(
+            "/categories",
+            headers={**auth_headers, "If-None-Match": first.headers["etag"]},
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+
+    async def test_invalidated_by_other_workers(
+        self, client: AsyncClient, db: AsyncSession, auth_headers: dict[str, str]
+    ) -> None:
+        me = (await client.get("/auth/me", headers=auth_headers)).json()
+        first = await client.get("/categories", headers=auth_headers)
+        db.add(Category(name="Elsewhere", user_id=me["id"]))
+        await db.flush()
+
+        hub.deliver(Event(me["id"], CACHE_INVALIDATED, "null"))
+        await asyncio.sleep(0)
+        response = await client.get(
+            "/categories",
+            headers={**auth_headers, "If-None-Match": first.headers["etag"]},
+        )
+        assert response.status_code == 200
+        assert [c["name"] for c in response.json()] == ["Elsewhere"]
+
+    async def test_gzip_variant(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        for i in range(20):
+            await client.post(
+                "/todos", json={"title": f"Todo number {i}"}, headers=auth_headers
+            )
+        response = await client.get(
+            "/todos", headers={**auth_headers, "Accept-Encoding": "gzip"}
+        )
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(response.json()) == 20
+
+    async def test_category_writes_invalidate(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        await client.get("/categories", headers=auth_headers)
+        created = await client.post(
+            "/categories", json={"name": "Home"}, headers=auth_headers
+        )
+        category_id = created.json()["id"]
+        response = await client.get("/categories", headers=auth_headers)
+        assert [c["name"] for c in response.json()] == ["Home"]
+
+        await client.get(f"/categories/{category_id}", headers=auth_headers)
+        await client.patch(
+            f"/categories/{category_id}", json={"name": "House"}, headers=auth_headers
+        )
+        response = await client.get(f"/categories/{category_id}", headers=auth_headers)
+        assert response.json()["name"] == "House"
+
+    async def test_keeps_rate_limit_headers(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        await client.get("/todos", headers=auth_headers)
+        response = await client.get("/todos", headers=auth_headers)
+        assert response.headers["RateLimit-Remaining"] == "118"
+
+    async def test_not_found_not_cached(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        response = await client.get("/todos/999", headers=auth_headers)
+        assert response.status_code == 404
+        created = await client.post(
+            "/todos", json={"title": "New"}, headers=auth_headers
+        )
+        response = await client.get(
+            f"/todos/{created.json()['id']}", headers=auth_headers
+        )
+        assert response.status_code == 200
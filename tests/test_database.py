@@ -0,0 +1,117 @@
+from collections.abc import AsyncGenerator
+from datetime import UTC
+from pathlib import Path
+from typing import Any
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event, insert, select
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from src.auth.models import User
+from src.auth.service import create_access_token
+from src.core import database
+from src.core.database import (
+    Base,
+    Databases,
+    Shard,
+    read_only_engine,
+)
+from src.main import app
+from src.todos.models import Todo
+
+
+async def insert_user(db: AsyncSession) -> int:
+    result = await db.execute(
+        insert(User)
+        .values(email="core@example.com", hashed_password="x")
+        .returning(User.id)
+    )
+    return result.scalar_one()
+
+
+class TestServerDefaults:
+    async def test_core_insert_gets_defaults(self, db: AsyncSession) -> None:
+        user_id = await insert_user(db)
+        result = await db.execute(
+            insert(Todo)
+            .values(user_id=user_id, title="Raw")
+            .returning(Todo.status, Todo.created_at, Todo.updated_at)
+        )
+        status, created_at, updated_at = result.one()
+        assert status == "pending"
+        assert created_at is not None
+        assert updated_at is not None
+
+    async def test_invalid_status_rejected(self, db: AsyncSession) -> None:
+        user_id = await insert_user(db)
+        with pytest.raises(IntegrityError):
+            await db.execute(
+                insert(Todo).values(user_id=user_id, title="Bad", status="done")
+            )
+
+
+class TestTimestamps:
+    async def test_read_back_as_aware_utc(self, db: AsyncSession) -> None:
+        await insert_user(db)
+        db.expire_all()
+        user = (await db.execute(select(User))).scalar_one()
+        assert user.created_at.tzinfo is not None
+        assert user.created_at.utcoffset() == UTC.utcoffset(None)
+
+
+class TestReadOnlySessions:
+    async def test_read_only_engine(self, test_engine: AsyncEngine) -> None:
+        async with test_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        async with read_only_engine(test_engine).connect() as conn:
+            if test_engine.dialect.name == "postgresql":
+                with pytest.raises(DBAPIError, match="read-only"):
+                    await conn.execute(
+                        insert(User).values(email="ro@example.com", hashed_password="x")
+                    )
+            else:
+                raw = await conn.get_raw_connection()
+                assert raw.dbapi_connection.isolation_level is None  # autocommit
+
+        async with test_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+
+    @pytest.fixture
+    async def file_engine(self, tmp_path: Path) -> AsyncGenerator[AsyncEngine]:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(
+                insert(User).values(id=1, email="ro@example.com", hashed_password="x")
+            )
+        yield engine
+        await engine.dispose()
+
+    async def test_get_routes_never_commit(
+        self, file_engine: AsyncEngine, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(
+            database,
+            "_databases",
+            Databases(file_engine, [Shard(file_engine, file_engine)]),
+        )
+        commits: list[Any] = []
+        event.listen(file_engine.sync_engine, "commit", commits.append)
+
+        transport = ASGITransport(app=app)  # type: ignore[arg-type]
+        headers = {"Authorization": f"Bearer {create_access_token(1)}"}
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/todos", json={"title": "A"}, headers=headers)
+            assert response.status_code == 201
+            assert len(commits) == 1
+
+            for path in ("/todos", "/categories", "/auth/me"):
+                response = await client.get(path, headers=headers)
+                assert response.status_code == 200
+            response = await client.get("/health")
+            assert response.status_code == 200
+
+        assert len(commits) == 1
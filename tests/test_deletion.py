@@ -0,0 +1,181 @@
+import tracemalloc
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth.deletion import USER_DELETED, handle_deleted_users, purge_user
+from src.auth.models import RefreshToken, User
+from src.categories.models import Category
+from src.core.database import Base
+from src.outbox.models import OutboxMessage
+from src.outbox.service import register_handler
+from src.outbox.worker import OutboxWorker
+from src.tags.models import Tag, TodoTag
+from src.todos.models import Todo
+from src.webhooks.models import Webhook
+
+pytestmark = pytest.mark.usefixtures("isolated_outbox")
+
+
+async def count(db: AsyncSession, model: type[Base]) -> int:
+    return await db.scalar(select(func.count()).select_from(model)) or 0
+
+
+CREDENTIALS = {"email": "test@example.com", "password": "testpassword123"}
+
+
+async def login(client: AsyncClient) -> dict[str, str]:
+    await client.post("/auth/register", json=CREDENTIALS)
+    response = await client.post("/auth/login", json=CREDENTIALS)
+    tokens: dict[str, str] = response.json()
+    return tokens
+
+
+async def add_todos(db: AsyncSession, user_id: int, n: int) -> None:
+    await db.execute(
+        insert(Todo), [{"user_id": user_id, "title": f"Todo {i}"} for i in range(n)]
+    )
+    await db.commit()
+
+
+def worker() -> OutboxWorker:
+    return OutboxWorker(
+        concurrency=1,
+        batch_size=100,
+        lease_seconds=60,
+        poll_seconds=1,
+        max_attempts=3,
+        backoff_base_seconds=60,
+        backoff_max_seconds=600,
+    )
+
+
+class TestDeleteAccount:
+    async def test_closes_account_and_queues_purge(
+        self, client: AsyncClient, db: AsyncSession
+    ) -> None:
+        tokens = await login(client)
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+        response = await client.delete("/auth/me", headers=headers)
+        await db.commit()
+        assert response.status_code == 202
+
+        response = await client.get("/auth/me", headers=headers)
+        assert response.status_code == 401
+        response = await client.post(
+            "/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+        )
+        assert response.status_code == 401
+        response = await client.post("/auth/login", json=CREDENTIALS)
+        assert response.status_code == 401
+
+        [message] = (await db.scalars(select(OutboxMessage))).all()
+        assert message.topic == USER_DELETED
+
+    async def test_outbox_purges_every_owned_row(
+        self, client: AsyncClient, db: AsyncSession
+    ) -> None:
+        register_handler([USER_DELETED], handle_deleted_users)
+        tokens = await login(client)
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        category = await client.post(
+            "/categories", json={"name": "Work"}, headers=headers
+        )
+        await client.post(
+            "/todos",
+            json={
+                "title": "Buy milk",
+                "category_id": category.json()["id"],
+                "tags": ["errands"],
+            },
+            headers=headers,
+        )
+        await client.post(
+            "/webhooks", json={"url": "https://example.com/hook"}, headers=headers
+        )
+        await client.delete("/auth/me", headers=headers)
+        await db.commit()
+
+        # Each write above queued a message too; only the deletion is handled.
+        await worker().run_once()
+        db.expire_all()
+        for model in (User, Todo, Category, Tag, TodoTag, RefreshToken, Webhook):
+            assert await count(db, model) == 0, model
+
+    @pytest.mark.usefixtures("auth_headers")
+    async def test_purge_keeps_other_users(self, db: AsyncSession) -> None:
+        first = await db.scalar(select(User.id))
+        assert first is not None
+        other = User(email="other@example.com", hashed_password="x")
+        db.add(other)
+        await db.commit()
+        other_id = other.id
+        await add_todos(db, first, 5)
+        await add_todos(db, other_id, 3)
+
+        assert await purge_user(db, first, batch_size=2) == 6
+        db.expire_all()
+        assert await count(db, Todo) == 3
+        assert (await db.scalars(select(User.id))).all() == [other_id]
+
+
+async def test_purge_memory_does_not_grow_with_account(db: AsyncSession) -> None:
+    peaks = []
+    for n in (2000, 8000):
+        user = User(email=f"user{n}@example.com", hashed_password="x")
+        db.add(user)
+        await db.commit()
+        await add_todos(db, user.id, n)
+
+        tracemalloc.start()
+        try:
+            await purge_user(db, user.id, batch_size=500)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    assert await count(db, Todo) == 0
+    small, large = peaks
+    # Four times the rows; loading them would need several times the memory.
+    assert large < small * 2
+
+
+async def test_category_delete_unfiles_todos_in_one_transaction(
+    client: AsyncClient,
+    db: AsyncSession,
+    auth_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    category = await client.post(
+        "/categories", json={"name": "Work"}, headers=auth_headers
+    )
+    category_id = category.json()["id"]
+    for n in range(5):
+        await client.post(
+            "/todos",
+            json={"title": f"Todo {n}", "category_id": category_id},
+            headers=auth_headers,
+        )
+    await db.commit()
+
+    # A delete failing after the un-filing leaves every todo filed.
+    async def fail(*args: object) -> None:
+        raise RuntimeError("delete failed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr("src.categories.service.invalidate_user", fail)
+        with pytest.raises(RuntimeError):
+            await client.delete(f"/categories/{category_id}", headers=auth_headers)
+    await db.rollback()  # as get_db does
+    assert await count(db, Category) == 1
+    filed = select(func.count()).where(Todo.category_id == category_id)
+    assert await db.scalar(filed) == 5
+
+    response = await client.delete(f"/categories/{category_id}", headers=auth_headers)
+    assert response.status_code == 204
+    db.expire_all()
+    assert await count(db, Category) == 0
+    assert await count(db, Todo) == 5
+    assert await db.scalar(select(Todo.id).where(Todo.category_id.is_not(None))) is None
@@ -0,0 +1,261 @@
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth.revocation import RevocationList
+from src.auth.schemas import CurrentUser
+from src.core.metrics import metrics
+from src.events.fanout import UnixSocketFanout
+from src.events.hub import EventHub, hub
+from src.events.router import next_events
+from src.events.schemas import Event
+from src.main import app
+
+Message = dict[str, Any]
+
+
+@asynccontextmanager
+async def asgi_connection(
+    scope: dict[str, Any], first: list[Message]
+) -> AsyncIterator[tuple[asyncio.Queue[Message], asyncio.Queue[Message]]]:
+    """Run ``app`` on one connection; yield its (incoming, outgoing) queues.
+
+    httpx's ASGI transport buffers whole responses, so streams are driven
+    at the ASGI level. Leaving the block disconnects the client.
+    """
+    incoming: asyncio.Queue[Message] = asyncio.Queue()
+    outgoing: asyncio.Queue[Message] = asyncio.Queue()
+    for message in first:
+        incoming.put_nowait(message)
+    scope = {"query_string": b"", "headers": [], **scope}
+    task = asyncio.create_task(app(scope, incoming.get, outgoing.put))
+    try:
+        yield incoming, outgoing
+    finally:
+        incoming.put_nowait({"type": f"{scope['type']}.disconnect", "code": 1000})
+        await asyncio.wait_for(task, 1)
+
+
+def sse_scope(headers: dict[str, str]) -> dict[str, Any]:
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": "/todos/events",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+    }
+
+
+async def next_message(outgoing: asyncio.Queue[Message]) -> Message:
+    return await asyncio.wait_for(outgoing.get(), 1)
+
+
+class TestServerSentEvents:
+    async def test_requires_authentication(self, client: AsyncClient) -> None:
+        response = await client.get("/todos/events")
+        assert response.status_code == 401
+
+    async def test_streams_committed_writes(
+        self,
+        client: AsyncClient,
+        db: AsyncSession,
+        auth_headers: dict[str, str],
+        second_user_headers: dict[str, str],
+    ) -> None:
+        request = {"type": "http.request", "body": b"", "more_body": False}
+        async with asgi_connection(sse_scope(auth_headers), [request]) as (_, out):
+            start = await next_message(out)
+            assert start["status"] == 200
+            assert (b"content-type", b"text/event-stream; charset=utf-8") in start[
+                "headers"
+            ]
+            assert (await next_message(out))["body"] == b": connected\n\n"
+
+            await client.post(
+                "/todos", json={"title": "Other"}, headers=second_user_headers
+            )
+            response = await client.post(
+                "/todos", json={"title": "Mine"}, headers=auth_headers
+            )
+            assert out.empty()  # nothing before the commit
+
+            await db.commit()
+            body = (await next_message(out))["body"].decode()
+            assert body.startswith("event: todo.created\ndata: {")
+            assert f'"id":{response.json()["id"]}' in body
+            assert '"title":"Mine"' in body
+            assert out.empty()  # the other user's todo was not sent
+        assert len(hub) == 0
+
+
+class TestWebSocket:
+    async def test_rejects_invalid_token(self) -> None:
+        scope = {"type": "websocket", "path": "/todos/events/ws"}
+        first = [
+            {"type": "websocket.connect"},
+            {"type": "websocket.receive", "text": "not-a-token"},
+        ]
+        async with asgi_connection(scope, first) as (_, out):
+            assert (await next_message(out))["type"] == "websocket.accept"
+            close = await next_message(out)
+            assert close["type"] == "websocket.close"
+            assert close["code"] == 1008
+
+    async def test_streams_committed_writes(
+        self, client: AsyncClient, db: AsyncSession, auth_headers: dict[str, str]
+    ) -> None:
+        token = auth_headers["Authorization"].removeprefix("Bearer ")
+        scope = {"type": "websocket", "path": "/todos/events/ws"}
+        first = [
+            {"type": "websocket.connect"},
+            {"type": "websocket.receive", "text": token},
+        ]
+        async with asgi_connection(scope, first) as (_, out):
+            assert (await next_message(out))["type"] == "websocket.accept"
+            while len(hub) == 0:
+                await asyncio.sleep(0)
+
+            response = await client.post(
+                "/categories", json={"name": "Work"}, headers=auth_headers
+            )
+            await db.commit()
+            message = await next_message(out)
+            assert message["type"] == "websocket.send"
+            assert json.loads(message["text"]) == {
+                "type": "category.created",
+                "data": response.json(),
+            }
+        assert len(hub) == 0
+
+
+class TestEventHub:
+    async def test_drops_slow_subscriber(self) -> None:
+        events = EventHub(buffer_size=2)
+        dropped = metrics.get("events.dropped_subscribers")
+        with events.subscribe(1) as slow, events.subscribe(1) as fast:
+            for n in range(3):
+                events.publish(Event(1, "todo.updated", str(n)))
+                if n < 2:
+                    assert (await fast.get()) == Event(1, "todo.updated", str(n))
+
+            assert slow.dropped
+            assert await slow.get() is None
+            assert not fast.dropped
+            assert metrics.get("events.dropped_subscribers") == dropped + 1
+
+    async def test_stream_ends_when_session_revoked(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        revoked = RevocationList(token_lifetime=60)
+        monkeypatch.setattr("src.events.router.revocations", revoked)
+        user = CurrentUser(id=1, session_id="s1")
+        events = EventHub(buffer_size=10)
+
+        with events.subscribe(1) as subscription:
+            stream = next_events(subscription, user)
+            events.publish(Event(1, "todo.created", "{}"))
+            assert await anext(stream) == Event(1, "todo.created", "{}")
+
+            revoked.revoke("s1")
+            events.publish(Event(1, "todo.created", "{}"))
+            with pytest.raises(StopAsyncIteration):
+                await anext(stream)
+
+    async def test_stream_ends_when_token_expires(self) -> None:
+        user = CurrentUser(id=1, expires_at=time.time() + 0.1)
+        events = EventHub(buffer_size=10)
+
+        with events.subscribe(1) as subscription:
+            stream = next_events(subscription, user)
+            events.publish(Event(1, "todo.created", "{}"))
+            assert await anext(stream) == Event(1, "todo.created", "{}")
+            # Long before the next keepalive.
+            with pytest.raises(StopAsyncIteration):
+                await asyncio.wait_for(anext(stream), 1)
+
+
+async def test_stream_ends_when_account_closed(client: AsyncClient) -> None:
+    credentials = {"email": "closing@example.com", "password": "password123"}
+    await client.post("/auth/register", json=credentials)
+    tokens = (await client.post("/auth/login", json=credentials)).json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    user_id = (await client.get("/auth/me", headers=headers)).json()["id"]
+
+    request = {"type": "http.request", "body": b"", "more_body": False}
+    async with asgi_connection(sse_scope(headers), [request]) as (_, out):
+        assert (await next_message(out))["status"] == 200
+        assert (await next_message(out))["body"] == b": connected\n\n"
+
+        response = await client.delete("/auth/me", headers=headers)
+        assert response.status_code == 202
+        hub.publish(Event(user_id, "todo.created", "{}"))
+        end = await next_message(out)
+        assert end["body"] == b"" and not end.get("more_body")
+
+
+async def test_unix_socket_fanout_relays_between_workers(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    received: list[Event] = []
+    workers = []
+    for pid in (1, 2):
+        monkeypatch.setattr("os.getpid", lambda pid=pid: pid)
+        workers.append(UnixSocketFanout(tmp_path))
+    # A socket file left behind by a dead worker.
+    (tmp_path / "3.sock").touch()
+
+    await workers[0].start(lambda event: None)
+    await workers[1].start(received.append)
+    try:
+        event = Event(7, "todo.deleted", '{"id":1}')
+        workers[0].publish(event)
+        for _ in range(100):
+            if received:
+                break
+            await asyncio.sleep(0.01)
+        assert received == [event]
+        assert not (tmp_path / "3.sock").exists()
+    finally:
+        for worker in workers:
+            await worker.stop()
+
+
+async def test_unix_socket_fanout_reads_peers_once(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    fanout = UnixSocketFanout(tmp_path)
+    await fanout.start(lambda event: None)
+    scans = 0
+    glob = Path.glob
+
+    def counting_glob(self: Path, pattern: str) -> Any:
+        nonlocal scans
+        scans += 1
+        return glob(self, pattern)
+
+    monkeypatch.setattr(Path, "glob", counting_glob)
+    try:
+        for n in range(10):
+            fanout.publish(Event(1, "todo.created", str(n)))
+        assert scans == 1
+    finally:
+        await fanout.stop()
+
+
+async def test_unix_socket_fanout_refuses_shared_directory(tmp_path: Path) -> None:
+    shared = tmp_path / "events"
+    shared.mkdir(mode=0o777)
+    shared.chmod(0o777)
+    with pytest.raises(RuntimeError):
+        await UnixSocketFanout(shared).start(lambda event: None)
+
+    private = tmp_path / "private"
+    await UnixSocketFanout(private).start(lambda event: None)
+    assert private.stat().st_mode & 0o777 == 0o700
@@ -0,0 +1,272 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import pytest
+from fastapi import Request, Response
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from src.core import database
+from src.core.database import Base, Databases, Shard
+from src.core.idempotency import (
+    REPLAYED_HEADER,
+    Idempotency,
+    IdempotencyInProgressError,
+    IdempotencyKey,
+    purge_expired_keys,
+)
+from src.main import app
+from src.todos.models import Todo
+from src.todos.service import TodoService
+
+pytestmark = pytest.mark.usefixtures("test_databases")
+
+
+def key(value: str) -> dict[str, str]:
+    return {"Idempotency-Key": value}
+
+
+async def count(db: AsyncSession, model: type[Base]) -> int:
+    return await db.scalar(select(func.count()).select_from(model)) or 0
+
+
+class TestIdempotentWrites:
+    async def test_retry_replays_response_without_rerunning(
+        self,
+        client: AsyncClient,
+        db: AsyncSession,
+        auth_headers: dict[str, str],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        headers = {**auth_headers, **key("k1")}
+        first = await client.post("/todos", json={"title": "Buy milk"}, headers=headers)
+        await db.commit()
+        assert first.status_code == 201
+        assert REPLAYED_HEADER not in first.headers
+
+        async def fail(*args: object) -> None:
+            raise AssertionError("retry ran the service")
+
+        monkeypatch.setattr(TodoService, "create", fail)
+        retry = await client.post("/todos", json={"title": "Buy milk"}, headers=headers)
+        assert retry.status_code == 201
+        assert retry.headers[REPLAYED_HEADER] == "true"
+        assert retry.json() == first.json()
+        assert await count(db, Todo) == 1
+
+    async def test_without_key_every_request_runs(
+        self, client: AsyncClient, auth_headers: dict[str, str], db: AsyncSession
+    ) -> None:
+        for _ in range(2):
+            response = await client.post(
+                "/todos", json={"title": "Buy milk"}, headers=auth_headers
+            )
+            assert response.status_code == 201
+        assert await count(db, Todo) == 2
+        assert await count(db, IdempotencyKey) == 0
+
+    async def test_key_reused_for_different_request(
+        self, client: AsyncClient, db: AsyncSession, auth_headers: dict[str, str]
+    ) -> None:
+        headers = {**auth_headers, **key("k1")}
+        await client.post("/todos", json={"title": "Buy milk"}, headers=headers)
+        await db.commit()
+        response = await client.post(
+            "/todos", json={"title": "Buy eggs"}, headers=headers
+        )
+        assert response.status_code == 422
+        assert response.json()["code"] == "IDEMPOTENCY_KEY_REUSED"
+
+    async def test_keys_are_scoped_per_user(
+        self,
+        client: AsyncClient,
+        db: AsyncSession,
+        auth_headers: dict[str, str],
+        second_user_headers: dict[str, str],
+    ) -> None:
+        for headers in (auth_headers, second_user_headers):
+            response = await client.post(
+                "/categories", json={"name": "Work"}, headers={**headers, **key("k1")}
+            )
+            await db.commit()
+            assert response.status_code == 201
+            assert REPLAYED_HEADER not in response.headers
+
+    async def test_update_is_replayed(
+        self, client: AsyncClient, db: AsyncSession, auth_headers: dict[str, str]
+    ) -> None:
+        todo = await client.post(
+            "/todos", json={"title": "Buy milk"}, headers=auth_headers
+        )
+        headers = {**auth_headers, **key("k1")}
+        url = f"/todos/{todo.json()['id']}"
+        first = await client.patch(url, json={"title": "Buy oat milk"}, headers=headers)
+        await db.commit()
+        # Changed meanwhile; the retry must still see its own result.
+        await client.patch(url, json={"title": "Buy tea"}, headers=auth_headers)
+        retry = await client.patch(url, json={"title": "Buy oat milk"}, headers=headers)
+        assert retry.status_code == 200
+        assert retry.json() == first.json()
+        assert retry.json()["title"] == "Buy oat milk"
+
+    async def test_register_is_replayed(
+        self, client: AsyncClient, db: AsyncSession
+    ) -> None:
+        body = {"email": "new@example.com", "password": "testpassword123"}
+        first = await client.post("/auth/register", json=body, headers=key("k1"))
+        await db.commit()
+        retry = await client.post("/auth/register", json=body, headers=key("k1"))
+        assert first.status_code == retry.status_code == 201
+        assert retry.json() == first.json()
+        assert "ratelimit-limit" in retry.headers
+
+    async def test_failed_request_releases_key(
+        self, client: AsyncClient, db: AsyncSession, auth_headers: dict[str, str]
+    ) -> None:
+        headers = {**auth_headers, **key("k1")}
+        body = {"title": "Buy milk", "category_id": 999}
+        response = await client.post("/todos", json=body, headers=headers)
+        assert response.status_code == 404
+        assert await count(db, IdempotencyKey) == 0
+
+        response = await client.post("/todos", json=body, headers=headers)
+        assert response.status_code == 404
+
+    async def test_in_progress_key_conflicts_until_abandoned(
+        self, client: AsyncClient, db: AsyncSession, auth_headers: dict[str, str]
+    ) -> None:
+        headers = {**auth_headers, **key("k1")}
+        await client.post("/todos", json={"title": "Buy milk"}, headers=headers)
+        record = await db.scalar(select(IdempotencyKey))
+        assert record is not None
+        # As if the first request were still running.
+        record.status_code = None
+        await db.commit()
+
+        response = await client.post(
+            "/todos", json={"title": "Buy milk"}, headers=headers
+        )
+        assert response.status_code == 409
+        assert response.json()["code"] == "IDEMPOTENCY_IN_PROGRESS"
+        assert response.headers["retry-after"] == "1"
+
+        # The first request died; its claim lapses.
+        record.created_at = datetime.now(UTC) - timedelta(minutes=5)
+        await db.commit()
+        response = await client.post(
+            "/todos", json={"title": "Buy milk"}, headers=headers
+        )
+        assert response.status_code == 201
+        assert REPLAYED_HEADER not in response.headers
+
+
+async def test_concurrent_claims_admit_one(
+    test_engine: AsyncEngine, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    engine = test_engine
+    if engine.dialect.name == "sqlite":
+        # In-memory SQLite shares one connection; the claims must race on
+        # separate connections, as they do against a database file.
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/claims.db")
+        monkeypatch.setattr(
+            database, "_databases", Databases(engine, [Shard(engine, engine)])
+        )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async def claim() -> str:
+        idempotency = Idempotency(Request({"type": "http"}), Response(), key="k1")
+        try:
+            previous = await idempotency._claim("user:1", "fingerprint")
+        except IdempotencyInProgressError:
+            return "conflict"
+        # Claims that start after the winner commits find its record.
+        return "claimed" if previous is None else "in progress"
+
+    try:
+        results = await asyncio.gather(*(claim() for _ in range(4)))
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        if engine is not test_engine:
+            await engine.dispose()
+    assert results.count("claimed") == 1
+
+
+async def test_failed_commit_releases_key(
+    test_engine: AsyncEngine, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    engine = test_engine
+    if engine.dialect.name == "sqlite":
+        # The claim and the release commit on connections of their own.
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/keys.db")
+        monkeypatch.setattr(
+            database, "_databases", Databases(engine, [Shard(engine, engine)])
+        )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    # Fail the commit that follows the todo's insert, as a serialization
+    # failure would, and only that one.
+    failing = False
+    create = TodoService.create
+
+    async def create_then_fail(*args: Any, **kwargs: Any) -> Todo:
+        nonlocal failing
+        todo = await create(*args, **kwargs)
+        failing = True
+        return todo
+
+    def fail(conn: object) -> None:
+        nonlocal failing
+        if failing:
+            failing = False
+            raise RuntimeError("commit failed")
+
+    transport = ASGITransport(app=app)  # type: ignore[arg-type]
+    try:
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            credentials = {"email": "one@example.com", "password": "password123"}
+            await ac.post("/auth/register", json=credentials)
+            response = await ac.post("/auth/login", json=credentials)
+            headers = {
+                "Authorization": f"Bearer {response.json()['access_token']}",
+                **key("k1"),
+            }
+            monkeypatch.setattr(TodoService, "create", create_then_fail)
+            event.listen(engine.sync_engine, "commit", fail)
+            try:
+                with pytest.raises(RuntimeError):
+                    await ac.post("/todos", json={"title": "Lost"}, headers=headers)
+            finally:
+                event.remove(engine.sync_engine, "commit", fail)
+
+            response = await ac.post("/todos", json={"title": "Lost"}, headers=headers)
+            assert response.status_code == 201
+            assert REPLAYED_HEADER not in response.headers
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        if engine is not test_engine:
+            await engine.dispose()
+
+
+async def test_purge_expired_keys(db: AsyncSession) -> None:
+    now = datetime.now(UTC)
+    db.add_all(
+        IdempotencyKey(
+            scope="user:1",
+            key=f"k{n}",
+            fingerprint="",
+            created_at=now,
+            expires_at=now + timedelta(seconds=-1 if n < 3 else 60),
+        )
+        for n in range(5)
+    )
+    await db.commit()
+    assert await purge_expired_keys(batch_size=2) == 3
+    db.expire_all()
+    assert await count(db, IdempotencyKey) == 2
@@ -0,0 +1,54 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+from functools import partial
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.leases import Lease, acquire, run_with_lease
+
+pytestmark = pytest.mark.usefixtures("db", "test_databases")
+
+
+async def test_one_holder_at_a_time(db: AsyncSession) -> None:
+    assert await acquire("job", 60, holder="a")
+    assert not await acquire("job", 60, holder="b")
+    assert await acquire("job", 60, holder="a")
+
+    # Expired, e.g. because its holder died: anyone may take it.
+    await db.execute(
+        update(Lease).values(expires_at=datetime.now(UTC) - timedelta(seconds=1))
+    )
+    await db.commit()
+    assert await acquire("job", 60, holder="b")
+    assert not await acquire("job", 60, holder="a")
+
+
+async def test_job_runs_in_one_process_and_fails_over() -> None:
+    running: list[str] = []
+
+    async def job(holder: str) -> None:
+        running.append(holder)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            running.remove(holder)
+
+    runners = {
+        holder: asyncio.create_task(
+            run_with_lease("job", partial(job, holder), ttl=0.3, holder=holder)
+        )
+        for holder in ("a", "b")
+    }
+    await asyncio.sleep(0.5)
+    [first] = running
+
+    # Stopping the holder releases the lease; the other worker takes over.
+    runners.pop(first).cancel()
+    await asyncio.sleep(0.5)
+    assert running == ["b" if first == "a" else "a"]
+    for runner in runners.values():
+        runner.cancel()
+    await asyncio.gather(*runners.values(), return_exceptions=True)
+    assert running == []
@@ -0,0 +1,77 @@
+import json
+import logging
+import sys
+
+from src.core.config import Settings
+from src.core.logging import (
+    DebugSampler,
+    JsonFormatter,
+    RequestIdFilter,
+    request_id_var,
+)
+
+
+def make_record(level: int = logging.INFO, msg: str = "hello %s") -> logging.LogRecord:
+    return logging.LogRecord("test", level, __file__, 1, msg, ("world",), None)
+
+
+class TestSettings:
+    def test_sql_echo_off_by_default(self) -> None:
+        settings = Settings(SECRET_KEY="x", ENV="staging")
+        assert settings.SQL_ECHO is False
+
+    def test_log_level_defaults_by_env(self) -> None:
+        assert Settings(SECRET_KEY="x", ENV="production").log_level == "INFO"
+        assert Settings(SECRET_KEY="x", ENV="development").log_level == "DEBUG"
+        assert Settings(SECRET_KEY="x", LOG_LEVEL="warning").log_level == "WARNING"
+
+
+class TestRequestIdFilter:
+    def test_stamps_current_request_id(self) -> None:
+        token = request_id_var.set("abc123")
+        try:
+            record = make_record()
+            RequestIdFilter().filter(record)
+        finally:
+            request_id_var.reset(token)
+        assert record.request_id == "abc123"
+
+    def test_placeholder_outside_request(self) -> None:
+        record = make_record()
+        RequestIdFilter().filter(record)
+        assert record.request_id == "-"
+
+
+class TestDebugSampler:
+    def test_drops_debug_at_zero_rate(self) -> None:
+        sampler = DebugSampler(0.0)
+        assert not sampler.filter(make_record(logging.DEBUG))
+        assert sampler.filter(make_record(logging.INFO))
+
+    def test_keeps_everything_at_full_rate(self) -> None:
+        sampler = DebugSampler(1.0)
+        assert all(sampler.filter(make_record(logging.DEBUG)) for _ in range(100))
+
+
+class TestJsonFormatter:
+    def test_structured_output(self) -> None:
+        record = make_record()
+        record.request_id = "req-1"
+        record.user_id = 42
+        data = json.loads(JsonFormatter().format(record))
+        assert data["msg"] == "hello world"
+        assert data["level"] == "INFO"
+        assert data["logger"] == "test"
+        assert data["request_id"] == "req-1"
+        assert data["user_id"] == 42
+        assert "args" not in data
+
+    def test_includes_exception(self) -> None:
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = logging.LogRecord(
+                "test", logging.ERROR, __file__, 1, "failed", (), sys.exc_info()
+            )
+        data = json.loads(JsonFormatter().format(record))
+        assert "ValueError: boom" in data["exc_info"]
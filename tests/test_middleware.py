@@ -0,0 +1,63 @@
+import logging
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class TestRequestId:
+    async def test_generated_when_missing(self, client: AsyncClient) -> None:
+        response = await client.get("/health")
+        assert response.status_code == 200
+        assert len(response.headers["x-request-id"]) == 32
+
+    async def test_propagates_incoming_id(self, client: AsyncClient) -> None:
+        response = await client.get("/health", headers={"X-Request-ID": "abc-123"})
+        assert response.headers["x-request-id"] == "abc-123"
+
+    async def test_rejects_oversized_id(self, client: AsyncClient) -> None:
+        response = await client.get("/health", headers={"X-Request-ID": "x" * 500})
+        assert response.headers["x-request-id"] != "x" * 500
+
+
+class TestAccessLog:
+    async def test_single_line_per_request(
+        self,
+        client: AsyncClient,
+        auth_headers: dict[str, str],
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        with caplog.at_level(logging.INFO, logger="src.access"):
+            response = await client.get(
+                "/todos?status=pending",
+                headers={**auth_headers, "X-Request-ID": "req-42"},
+            )
+        assert response.status_code == 200
+
+        records = [r for r in caplog.records if r.name == "src.access"]
+        assert len(records) == 1
+        record = records[0]
+        assert record.request_id == "req-42"
+        assert record.path == "/todos?status=pending"
+        assert record.status == 200
+        assert record.db_queries == 1  # todo query only; auth reads no table
+        assert record.db_ms > 0
+        assert record.auth_ms > 0
+        assert "server-timing" in response.headers
+
+    async def test_logs_error_status(
+        self, client: AsyncClient, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        with caplog.at_level(logging.INFO, logger="src.access"):
+            await client.get("/auth/me")
+        (record,) = [r for r in caplog.records if r.name == "src.access"]
+        assert record.status == 401
+
+
+async def test_failed_query_does_not_leak_start_time(test_engine: AsyncEngine) -> None:
+    async with test_engine.connect() as conn:
+        with pytest.raises(DBAPIError):
+            await conn.execute(text("SELECT * FROM missing_table"))
+        assert conn.info["query_start"] == []
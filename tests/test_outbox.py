@@ -0,0 +1,203 @@
+import asyncio
+import contextlib
+import json
+from collections.abc import Sequence
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from src.auth.schemas import UserCreate
+from src.auth.service import AuthService
+from src.core import database
+from src.core.database import Base, Databases, Shard
+from src.core.metrics import metrics
+from src.outbox.models import OutboxMessage
+from src.outbox.service import OutboxEntry, register_handler
+from src.outbox.worker import OutboxWorker
+from src.todos.schemas import TodoCreate
+from src.todos.service import TodoService
+
+pytestmark = pytest.mark.usefixtures("isolated_outbox")
+
+
+def make_worker(**overrides: Any) -> OutboxWorker:
+    options: dict[str, Any] = {
+        "concurrency": 1,
+        "batch_size": 10,
+        "lease_seconds": 60,
+        "poll_seconds": 0.01,
+        "max_attempts": 2,
+        "backoff_base_seconds": 60,
+        "backoff_max_seconds": 600,
+    }
+    return OutboxWorker(**{**options, **overrides})
+
+
+@pytest.fixture
+async def user_id(db: AsyncSession) -> int:
+    user = await AuthService(db).create_user(
+        UserCreate(email="test@example.com", password="testpassword123")
+    )
+    await db.commit()
+    return user.id
+
+
+async def add_todos(db: AsyncSession, user_id: int, count: int) -> None:
+    for n in range(count):
+        await TodoService(db).create(TodoCreate(title=f"Todo {n}"), user_id)
+    await db.commit()
+
+
+async def outbox_rows(db: AsyncSession) -> list[OutboxMessage]:
+    db.expire_all()
+    return list((await db.scalars(select(OutboxMessage))).all())
+
+
+class TestEnqueue:
+    async def test_written_in_the_todo_transaction(
+        self, db: AsyncSession, user_id: int
+    ) -> None:
+        await TodoService(db).create(TodoCreate(title="Dropped"), user_id)
+        await db.rollback()
+        assert await outbox_rows(db) == []
+
+        todo = await TodoService(db).create(TodoCreate(title="Kept"), user_id)
+        await TodoService(db).delete(todo.id, user_id)
+        await db.commit()
+
+        rows = await outbox_rows(db)
+        assert [row.topic for row in rows] == ["todo.created", "todo.deleted"]
+        assert json.loads(rows[0].payload)["title"] == "Kept"
+        assert json.loads(rows[1].payload) == {"id": todo.id}
+
+
+class TestWorker:
+    async def test_handles_and_deletes_batches(
+        self, db: AsyncSession, user_id: int
+    ) -> None:
+        batches: list[list[str]] = []
+
+        async def handler(entries: Sequence[OutboxEntry]) -> None:
+            batches.append([json.loads(e.payload)["title"] for e in entries])
+
+        register_handler(["todo.created"], handler)
+        await add_todos(db, user_id, 3)
+        processed = metrics.get("outbox.processed")
+
+        assert await make_worker(batch_size=2).run_once() == 2
+        assert await make_worker(batch_size=2).run_once() == 1
+        assert batches == [["Todo 0", "Todo 1"], ["Todo 2"]]
+        assert await outbox_rows(db) == []
+        assert metrics.get("outbox.processed") == processed + 3
+
+    async def test_failed_batch_backs_off_then_is_kept(
+        self, db: AsyncSession, user_id: int
+    ) -> None:
+        async def handler(entries: Sequence[OutboxEntry]) -> None:
+            raise ConnectionError("down")
+
+        register_handler(["todo.created"], handler)
+        await add_todos(db, user_id, 1)
+        worker = make_worker()
+
+        before = datetime.now(UTC)
+        assert await worker.run_once() == 1
+        [row] = await outbox_rows(db)
+        assert row.attempts == 1
+        assert "down" in (row.last_error or "")
+        # Backoff of 30-60 s with jitter.
+        assert 29 < (row.available_at - before).total_seconds() < 61
+        assert await worker.run_once() == 0
+
+        row.available_at = before
+        await db.commit()
+        assert await worker.run_once() == 1
+        [row] = await outbox_rows(db)
+        assert row.attempts == 2
+        assert row.failed_at is not None
+        row.available_at = before
+        await db.commit()
+        assert await worker.run_once() == 0
+
+    async def test_expired_lease_is_reclaimed(
+        self, db: AsyncSession, user_id: int
+    ) -> None:
+        await add_todos(db, user_id, 1)
+        worker = make_worker(lease_seconds=0)
+        async with database.get_databases().session_factory() as session:
+            first = await worker.claim(session)
+        # The first claimer died without finishing.
+        async with database.get_databases().session_factory() as session:
+            second = await worker.claim(session)
+        assert [e.id for e in first] == [e.id for e in second]
+        assert second[0].attempts == 2
+
+    async def test_concurrent_claims_do_not_overlap(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        test_engine: AsyncEngine,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        engine = test_engine
+        if engine.dialect.name == "sqlite":
+            # In-memory SQLite shares one connection; claims must race on
+            # separate connections, as they do against a database file.
+            engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/outbox.db")
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            monkeypatch.setattr(
+                database, "_databases", Databases(engine, [Shard(engine, engine)])
+            )
+        async with database.get_databases().session_factory() as session:
+            session.add_all(
+                OutboxMessage(user_id=user_id, topic="todo.created", payload="{}")
+                for _ in range(5)
+            )
+            await session.commit()
+        worker = make_worker(batch_size=3)
+
+        async def claim() -> list[int]:
+            async with database.get_databases().session_factory() as session:
+                return [entry.id for entry in await worker.claim(session)]
+
+        try:
+            first, second = await asyncio.gather(claim(), claim())
+        finally:
+            if engine is not test_engine:
+                await engine.dispose()
+        assert len(first) + len(second) == 5
+        assert not set(first) & set(second)
+
+    async def test_pool_processes_messages_committed_later(
+        self, db: AsyncSession, user_id: int
+    ) -> None:
+        handled: list[int] = []
+
+        async def handler(entries: Sequence[OutboxEntry]) -> None:
+            handled.extend(entry.id for entry in entries)
+
+        register_handler(["todo.created"], handler)
+        worker = make_worker(concurrency=2, poll_seconds=10)
+        processed = metrics.get("outbox.processed")
+        task = asyncio.create_task(worker.run())
+        try:
+            await asyncio.sleep(0.05)
+            # Committing wakes the idle pool before its next poll.
+            await add_todos(db, user_id, 2)
+            for _ in range(100):
+                if metrics.get("outbox.processed") == processed + 2:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        assert sorted(handled) == [1, 2]
+        assert worker.lag_seconds >= 0
+        assert worker.throughput() == pytest.approx(2 / 60)
@@ -0,0 +1,67 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth.models import User
+from src.auth.passwords import (
+    Argon2Hasher,
+    BcryptHasher,
+    calibrate_bcrypt,
+    set_password_hasher,
+)
+
+CREDENTIALS = {"email": "rehash@example.com", "password": "securepass123"}
+
+
+class TestBcryptHasher:
+    def test_round_trip(self) -> None:
+        hasher = BcryptHasher(rounds=4)
+        hashed = hasher.hash("secret-password")
+        assert hashed.startswith("$2b$04$")
+        assert hasher.verify("secret-password", hashed)
+        assert not hasher.verify("wrong-password", hashed)
+
+    def test_needs_rehash_when_cost_changes(self) -> None:
+        hashed = BcryptHasher(rounds=4).hash("secret-password")
+        assert not BcryptHasher(rounds=4).needs_rehash(hashed)
+        assert BcryptHasher(rounds=5).needs_rehash(hashed)
+
+    def test_unknown_scheme_never_verifies(self) -> None:
+        assert not BcryptHasher(rounds=4).verify("x", "plaintext")
+
+
+class TestArgon2Hasher:
+    def test_migrates_between_schemes(self) -> None:
+        pytest.importorskip("argon2")
+        argon2 = Argon2Hasher(time_cost=1, memory_cost=1024, parallelism=1)
+        bcrypt_hash = BcryptHasher(rounds=4).hash("secret-password")
+        argon2_hash = argon2.hash("secret-password")
+
+        # Either hasher verifies both schemes, and flags the other for rehash.
+        assert argon2.verify("secret-password", bcrypt_hash)
+        assert BcryptHasher(rounds=4).verify("secret-password", argon2_hash)
+        assert argon2.needs_rehash(bcrypt_hash)
+        assert not argon2.needs_rehash(argon2_hash)
+        assert BcryptHasher(rounds=4).needs_rehash(argon2_hash)
+
+
+def test_calibration_scales_with_target() -> None:
+    assert calibrate_bcrypt(1, probe_rounds=4) <= calibrate_bcrypt(200, probe_rounds=4)
+
+
+async def test_login_rehashes_outdated_hash(
+    client: AsyncClient, db: AsyncSession
+) -> None:
+    await client.post("/auth/register", json=CREDENTIALS)
+    set_password_hasher(BcryptHasher(rounds=5))
+
+    response = await client.post("/auth/login", json=CREDENTIALS)
+    assert response.status_code == 200
+    hashed = (await db.execute(select(User.hashed_password))).scalar_one()
+    assert hashed.startswith("$2b$05$")
+
+    # The upgraded hash still logs in, without another rehash.
+    response = await client.post("/auth/login", json=CREDENTIALS)
+    assert response.status_code == 200
+    assert (await db.execute(select(User.hashed_password))).scalar_one() == hashed
@@ -0,0 +1,220 @@
+import random
+from datetime import UTC, datetime
+from typing import Any
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from src.outbox.models import OutboxMessage
+from src.outbox.service import register_handler
+from src.outbox.worker import OutboxWorker
+from src.todos.archive import archive_completed
+from src.todos.models import Todo
+from src.todos.ranks import TODOS_RERANK, handle_rerank, key_between, rerank
+
+
+async def add(client: AsyncClient, headers: dict[str, str], title: str) -> int:
+    response = await client.post("/todos", json={"title": title}, headers=headers)
+    assert response.status_code == 201, response.json()
+    todo_id: int = response.json()["id"]
+    return todo_id
+
+
+async def move(
+    client: AsyncClient, headers: dict[str, str], todo_id: int, **position: int
+) -> Any:
+    return await client.patch(
+        f"/todos/{todo_id}/move",
+        json={"parent_id": None, **position},
+        headers=headers,
+    )
+
+
+async def ordered(client: AsyncClient, headers: dict[str, str], **params: Any) -> Any:
+    response = await client.get(
+        "/todos", params={"order": "rank", **params}, headers=headers
+    )
+    return [todo["title"] for todo in response.json()]
+
+
+class TestKeyBetween:
+    def test_keys_sort_in_insertion_order(self) -> None:
+        rng = random.Random(0)
+        keys: list[str] = []
+        for _ in range(2000):
+            i = rng.randint(0, len(keys))
+            low = keys[i - 1] if i else None
+            high = keys[i] if i < len(keys) else None
+            key = key_between(low, high)
+            assert (low is None or low < key) and (high is None or key < high)
+            keys.insert(i, key)
+        assert max(map(len, keys)) <= 8
+
+    def test_appends_and_prepends_stay_short(self) -> None:
+        first = last = key_between(None, None)
+        for _ in range(10_000):
+            first = key_between(None, first)
+            last = key_between(last, None)
+        assert first < last
+        assert len(first) <= 4 and len(last) <= 4
+
+    def test_same_gap_grows_a_character_per_few_moves(self) -> None:
+        low, high = "a0", "a1"
+        for _ in range(60):
+            high = key_between(low, high)
+        assert low < high < "a1"
+        assert len(high) <= 14
+
+    def test_rejects_unordered_bounds(self) -> None:
+        with pytest.raises(ValueError):
+            key_between("a1", "a0")
+        with pytest.raises(ValueError):
+            key_between("a1", "a1")
+
+
+class TestManualOrder:
+    async def test_new_todos_go_on_top(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        for title in ("A", "B", "C"):
+            await add(client, auth_headers, title)
+        assert await ordered(client, auth_headers) == ["C", "B", "A"]
+
+    async def test_move_before_and_after(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        a, b, c = [await add(client, auth_headers, title) for title in "ABC"]
+
+        response = await move(client, auth_headers, a, before_id=c)
+        assert response.status_code == 200
+        assert await ordered(client, auth_headers) == ["A", "C", "B"]
+        await move(client, auth_headers, c, after_id=b)
+        assert await ordered(client, auth_headers) == ["A", "B", "C"]
+        await move(client, auth_headers, b, after_id=a)
+        assert await ordered(client, auth_headers) == ["A", "B", "C"]
+        await move(client, auth_headers, b, before_id=b)
+        assert await ordered(client, auth_headers) == ["A", "B", "C"]
+        # The default order is unchanged.
+        response = await client.get("/todos", headers=auth_headers)
+        assert [todo["title"] for todo in response.json()] == ["C", "B", "A"]
+
+    async def test_move_updates_one_row(
+        self,
+        client: AsyncClient,
+        auth_headers: dict[str, str],
+        test_engine: AsyncEngine,
+    ) -> None:
+        ids = [await add(client, auth_headers, str(n)) for n in range(20)]
+
+        statements: list[str] = []
+
+        def record(*args: Any) -> None:
+            statements.append(args[2])
+
+        event.listen(test_engine.sync_engine, "before_cursor_execute", record)
+        try:
+            response = await move(client, auth_headers, ids[0], before_id=ids[-1])
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", record)
+        assert response.status_code == 200
+        [write] = [
+            s for s in statements if s.startswith(("UPDATE", "INSERT INTO todo"))
+        ]
+        assert write.startswith("UPDATE todo SET")
+        assert (await ordered(client, auth_headers))[0] == "0"
+
+    async def test_rejects_other_users_todo_and_two_positions(
+        self,
+        client: AsyncClient,
+        auth_headers: dict[str, str],
+        second_user_headers: dict[str, str],
+    ) -> None:
+        mine = await add(client, auth_headers, "Mine")
+        theirs = await add(client, second_user_headers, "Theirs")
+        response = await move(client, auth_headers, mine, after_id=theirs)
+        assert response.status_code == 404
+        assert response.json()["code"] == "ADJACENT_TODO_NOT_FOUND"
+
+        response = await move(client, auth_headers, mine, after_id=mine, before_id=mine)
+        assert response.status_code == 422
+
+    async def test_archived_todos_keep_their_place(
+        self, client: AsyncClient, db: AsyncSession, auth_headers: dict[str, str]
+    ) -> None:
+        a, b, c = [await add(client, auth_headers, title) for title in "ABC"]
+        await client.patch(
+            f"/todos/{b}", json={"status": "completed"}, headers=auth_headers
+        )
+        await db.commit()
+        assert await archive_completed(db, datetime.now(UTC), batch_size=10) == 1
+
+        assert await ordered(client, auth_headers) == ["C", "A"]
+        assert await ordered(client, auth_headers, include_archived="true") == [
+            "C",
+            "B",
+            "A",
+        ]
+        # Restored todos go back on top, like new ones.
+        await move(client, auth_headers, a, before_id=c)
+        await client.post(f"/todos/{b}/restore", headers=auth_headers)
+        assert await ordered(client, auth_headers) == ["B", "A", "C"]
+
+    async def test_rerank_keeps_archived_todos_in_place(
+        self, client: AsyncClient, db: AsyncSession, auth_headers: dict[str, str]
+    ) -> None:
+        a, b, c = [await add(client, auth_headers, title) for title in "ABC"]
+        await client.patch(
+            f"/todos/{b}", json={"status": "completed"}, headers=auth_headers
+        )
+        await db.commit()
+        assert await archive_completed(db, datetime.now(UTC), batch_size=10) == 1
+        user_id = await db.scalar(select(Todo.user_id).where(Todo.id == a))
+        assert user_id is not None
+
+        assert await rerank(db, user_id, max_length=0) == 3
+        await db.commit()
+        db.expire_all()
+        assert await ordered(client, auth_headers, include_archived="true") == [
+            "C",
+            "B",
+            "A",
+        ]
+
+
+@pytest.mark.usefixtures("isolated_outbox")
+async def test_long_ranks_are_rewritten_in_background(
+    client: AsyncClient,
+    db: AsyncSession,
+    auth_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr("src.todos.ranks.settings.RANK_REBALANCE_LENGTH", 4)
+    register_handler([TODOS_RERANK], handle_rerank)
+    await add(client, auth_headers, "Bottom")
+    top = await add(client, auth_headers, "Top")
+    # Each move into the gap under "Top" halves it.
+    for n in range(20):
+        todo_id = await add(client, auth_headers, str(n))
+        await move(client, auth_headers, todo_id, after_id=top)
+    await db.commit()
+    before = await ordered(client, auth_headers)
+    assert await db.scalar(select(func.max(func.length(Todo.rank)))) > 4
+    topics = await db.scalars(select(OutboxMessage.topic))
+    assert TODOS_RERANK in topics.all()
+
+    worker = OutboxWorker(
+        concurrency=1,
+        batch_size=100,
+        lease_seconds=60,
+        poll_seconds=1,
+        max_attempts=3,
+        backoff_base_seconds=60,
+        backoff_max_seconds=600,
+    )
+    await worker.run_once()
+    db.expire_all()
+    assert await db.scalar(select(func.max(func.length(Todo.rank)))) <= 4
+    assert await ordered(client, auth_headers) == before
+    assert before[0] == "Top" and before[-1] == "Bottom"
@@ -0,0 +1,97 @@
+import pytest
+from httpx import AsyncClient
+
+from src.core.ratelimit import (
+    InMemoryRateLimitBackend,
+    InMemorySharedStore,
+    RateLimit,
+    RateLimitBackend,
+    SharedStoreRateLimitBackend,
+    set_rate_limit_backend,
+    take_token,
+)
+
+
+class TestTokenBucket:
+    def test_burst_then_reject(self) -> None:
+        limit = RateLimit(name="t", capacity=2, rate=1.0)
+        bucket, first = take_token(None, limit, now=0.0)
+        bucket, second = take_token(bucket, limit, now=0.0)
+        bucket, third = take_token(bucket, limit, now=0.0)
+        assert first.allowed and second.allowed
+        assert not third.allowed
+        assert third.retry_after == pytest.approx(1.0)
+
+    def test_refills_over_time(self) -> None:
+        limit = RateLimit(name="t", capacity=1, rate=2.0)
+        bucket, _ = take_token(None, limit, now=0.0)
+        _, early = take_token(bucket, limit, now=0.1)
+        _, later = take_token(bucket, limit, now=0.5)
+        assert not early.allowed
+        assert later.allowed
+
+    def test_never_exceeds_capacity(self) -> None:
+        limit = RateLimit(name="t", capacity=3, rate=1.0)
+        bucket, _ = take_token(None, limit, now=0.0)
+        _, result = take_token(bucket, limit, now=1000.0)
+        assert result.remaining == 2
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [InMemoryRateLimitBackend(), SharedStoreRateLimitBackend(InMemorySharedStore())],
+    ids=["in-memory", "shared-store"],
+)
+class TestBackends:
+    async def test_keys_are_independent(self, backend: RateLimitBackend) -> None:
+        limit = RateLimit.per_minute("t", 1)
+        assert (await backend.hit("a", limit)).allowed
+        assert not (await backend.hit("a", limit)).allowed
+        assert (await backend.hit("b", limit)).allowed
+
+
+class TestInMemoryBackend:
+    async def test_bounded_number_of_keys(self) -> None:
+        backend = InMemoryRateLimitBackend(max_keys=10)
+        limit = RateLimit.per_minute("t", 5)
+        for i in range(50):
+            await backend.hit(str(i), limit)
+        assert len(backend._buckets) <= 10
+
+
+class TestRoutes:
+    async def test_login_rate_limited_per_ip(self, client: AsyncClient) -> None:
+        credentials = {"email": "ghost@example.com", "password": "securepass123"}
+        for _ in range(10):
+            response = await client.post("/auth/login", json=credentials)
+            assert response.status_code == 401
+
+        response = await client.post("/auth/login", json=credentials)
+        assert response.status_code == 429
+        assert response.json()["code"] == "RATE_LIMITED"
+        assert int(response.headers["Retry-After"]) >= 1
+        assert response.headers["RateLimit-Remaining"] == "0"
+
+    async def test_list_todos_headers(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        response = await client.get("/todos", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["RateLimit-Limit"] == "120"
+        assert response.headers["RateLimit-Remaining"] == "119"
+
+    async def test_list_todos_limited_per_user(
+        self,
+        client: AsyncClient,
+        auth_headers: dict[str, str],
+        second_user_headers: dict[str, str],
+    ) -> None:
+        set_rate_limit_backend(InMemoryRateLimitBackend(clock=lambda: 0.0))
+        for _ in range(120):
+            await client.get("/todos", headers=auth_headers)
+
+        response = await client.get("/todos", headers=auth_headers)
+        assert response.status_code == 429
+
+        response = await client.get("/todos", headers=second_user_headers)
+        assert response.status_code == 200
@@ -0,0 +1,189 @@
+import asyncio
+import contextlib
+import json
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth.schemas import UserCreate
+from src.auth.service import AuthService
+from src.reminders.scheduler import ReminderScheduler
+from src.reminders.sinks import (
+    FileReminderSink,
+    InMemoryReminderSink,
+    Reminder,
+    set_reminder_sink,
+)
+from src.todos.models import TodoStatus
+from src.todos.schemas import TodoCreate, TodoUpdate
+from src.todos.service import TodoService
+
+pytestmark = pytest.mark.usefixtures("test_databases")
+
+
+def days_from_today(days: int) -> date:
+    return datetime.now(UTC).date() + timedelta(days=days)
+
+
+def make_scheduler(lead: timedelta = timedelta(0)) -> ReminderScheduler:
+    return ReminderScheduler(
+        lead=lead, horizon=timedelta(days=2), reload_interval=300, batch_size=2
+    )
+
+
+@pytest.fixture
+async def user_id(db: AsyncSession) -> int:
+    user = await AuthService(db).create_user(
+        UserCreate(email="test@example.com", password="testpassword123")
+    )
+    await db.commit()
+    return user.id
+
+
+async def add_todo(db: AsyncSession, user_id: int, title: str, due: date | None) -> int:
+    todo = await TodoService(db).create(TodoCreate(title=title, due_date=due), user_id)
+    await db.commit()
+    return todo.id
+
+
+class TestReload:
+    async def test_loads_open_todos_due_within_horizon(
+        self, db: AsyncSession, user_id: int
+    ) -> None:
+        for days in (1, 1, 2, 2, 1):
+            await add_todo(db, user_id, f"in {days}", days_from_today(days))
+        await add_todo(db, user_id, "past", days_from_today(0))
+        await add_todo(db, user_id, "later", days_from_today(5))
+        await add_todo(db, user_id, "undated", None)
+        done = await add_todo(db, user_id, "done", days_from_today(1))
+        await TodoService(db).update(
+            done, TodoUpdate(status=TodoStatus.COMPLETED), user_id
+        )
+        await db.commit()
+
+        scheduler = make_scheduler()
+        await scheduler.reload()
+
+        # Five rows in batches of two: every page is followed.
+        assert len(scheduler) == 5
+
+    async def test_fires_in_due_order_once(
+        self, db: AsyncSession, user_id: int
+    ) -> None:
+        later = await add_todo(db, user_id, "later", days_from_today(2))
+        sooner = await add_todo(db, user_id, "sooner", days_from_today(1))
+        scheduler = make_scheduler()
+        await scheduler.reload()
+
+        now = datetime.now(UTC)
+        assert scheduler.pop_due(now) == []
+        due = scheduler.pop_due(now + timedelta(days=3))
+        assert [r.todo_id for r in due] == [sooner, later]
+        assert scheduler.pop_due(now + timedelta(days=3)) == []
+
+
+class TestIncrementalUpdates:
+    async def test_service_writes_apply_on_commit(
+        self, db: AsyncSession, user_id: int, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        scheduler = make_scheduler()
+        await scheduler.reload()
+        monkeypatch.setattr("src.todos.service.reminders", scheduler)
+        service = TodoService(db)
+
+        todo = await service.create(
+            TodoCreate(title="Call", due_date=days_from_today(1)), user_id
+        )
+        todo_id = todo.id
+        assert len(scheduler) == 0
+        await db.commit()
+        assert len(scheduler) == 1
+
+        await service.update(todo_id, TodoUpdate(due_date=days_from_today(7)), user_id)
+        await db.commit()
+        assert len(scheduler) == 0  # beyond the window
+
+        await service.update(todo_id, TodoUpdate(due_date=days_from_today(2)), user_id)
+        await db.rollback()
+        assert len(scheduler) == 0
+
+        await service.update(todo_id, TodoUpdate(due_date=days_from_today(2)), user_id)
+        await db.commit()
+        assert len(scheduler) == 1
+
+        await service.delete(todo_id, user_id)
+        await db.commit()
+        assert len(scheduler) == 0
+
+    async def test_writes_in_other_workers_are_relayed(self, user_id: int) -> None:
+        holder = make_scheduler()
+        await holder.reload()
+        writer = make_scheduler()  # not running the scheduler: holds nothing
+        relayed: list[tuple[int, str]] = []
+        writer.set_relay(lambda *message: relayed.append(message))
+
+        reminder = Reminder(1, user_id, "Call", days_from_today(1))
+        writer.reschedule(user_id, 1, reminder)
+        writer.reschedule(user_id, 2, Reminder(2, user_id, "Mail", days_from_today(1)))
+        writer.cancel(user_id, 2)
+        assert len(writer) == 0
+        for _, message in relayed:
+            await holder.apply_relayed(message)
+
+        later = datetime.now(UTC) + timedelta(days=3)
+        assert holder.pop_due(later) == [reminder]
+
+    async def test_write_during_reload_wins_over_loaded_row(
+        self, db: AsyncSession, user_id: int, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        todo_id = await add_todo(db, user_id, "Call", days_from_today(1))
+        scheduler = make_scheduler()
+        load = scheduler._load
+
+        async def load_then_complete(start: date, through: date) -> dict:
+            loaded = await load(start, through)
+            scheduler.cancel(user_id, todo_id)
+            return loaded
+
+        monkeypatch.setattr(scheduler, "_load", load_then_complete)
+        await scheduler.reload()
+        assert len(scheduler) == 0
+
+
+class TestRun:
+    async def test_sends_due_reminders_to_sink(
+        self, db: AsyncSession, user_id: int
+    ) -> None:
+        sink = InMemoryReminderSink()
+        set_reminder_sink(sink)
+        due = days_from_today(1)
+        # Fire 50 ms from now.
+        midnight = datetime(due.year, due.month, due.day, tzinfo=UTC)
+        lead = midnight - datetime.now(UTC) - timedelta(milliseconds=50)
+        todo_id = await add_todo(db, user_id, "Call", due)
+
+        scheduler = make_scheduler(lead)
+        task = asyncio.create_task(scheduler.run())
+        try:
+            for _ in range(100):
+                if sink.sent:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+            set_reminder_sink(None)
+
+        assert [r.todo_id for r in sink.sent] == [todo_id]
+
+
+async def test_file_sink_appends_json_lines(tmp_path: Path) -> None:
+    sink = FileReminderSink(tmp_path / "reminders.jsonl")
+    await sink.send([Reminder(1, 2, "Call", date(2026, 10, 20))])
+    await sink.send([Reminder(3, 2, "Write", date(2026, 10, 21))])
+
+    lines = (tmp_path / "reminders.jsonl").read_text().splitlines()
+    assert [json.loads(line)["todo_id"] for line in lines] == [1, 3]
@@ -0,0 +1,122 @@
+from collections.abc import AsyncGenerator
+from pathlib import Path
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from src.auth.models import User
+from src.auth.service import create_access_token
+from src.core import database
+from src.core.cache import InMemoryCache, set_cache
+from src.core.config import get_settings
+from src.core.database import (
+    LAST_WRITE_COOKIE,
+    Base,
+    Databases,
+    RoutingSession,
+    Shard,
+)
+from src.main import app
+from src.todos.models import Todo
+
+
+@pytest.fixture
+async def engines(tmp_path: Path) -> AsyncGenerator[tuple[AsyncEngine, AsyncEngine]]:
+    primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    for engine in (primary, replica):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            # Same user on both sides, as if replicated.
+            await conn.execute(
+                insert(User).values(id=1, email="r@example.com", hashed_password="x")
+            )
+    yield primary, replica
+    await primary.dispose()
+    await replica.dispose()
+
+
+@pytest.fixture
+async def routed_client(
+    engines: tuple[AsyncEngine, AsyncEngine], monkeypatch: pytest.MonkeyPatch
+) -> AsyncGenerator[AsyncClient]:
+    primary, replica = engines
+    monkeypatch.setattr(
+        database, "_databases", Databases(primary, [Shard(primary, replica)])
+    )
+    transport = ASGITransport(app=app)  # type: ignore[arg-type]
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        ac.headers["Authorization"] = f"Bearer {create_access_token(1)}"
+        yield ac
+
+
+class TestRoutingSession:
+    async def test_selects_follow_flag(
+        self, engines: tuple[AsyncEngine, AsyncEngine]
+    ) -> None:
+        primary, replica = engines
+        factory = async_sessionmaker(
+            class_=AsyncSession,
+            sync_session_class=RoutingSession,
+            shards=[Shard(primary, replica)],
+            directory=primary,
+        )
+        query = select(Todo)
+        async with factory(info={"use_replica": True}) as session:
+            assert session.sync_session.get_bind(clause=query) is replica.sync_engine
+        async with factory() as session:
+            assert session.sync_session.get_bind(clause=query) is primary.sync_engine
+
+
+class TestReadRouting:
+    async def test_writes_go_to_primary_reads_stick(
+        self, routed_client: AsyncClient, engines: tuple[AsyncEngine, AsyncEngine]
+    ) -> None:
+        response = await routed_client.post("/todos", json={"title": "Fresh"})
+        assert response.status_code == 201
+
+        # Within the stickiness window the writer reads its own write.
+        response = await routed_client.get("/todos")
+        assert [t["title"] for t in response.json()] == ["Fresh"]
+
+    async def test_reads_use_replica_outside_window(
+        self,
+        routed_client: AsyncClient,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(get_settings(), "REPLICA_STICKINESS_SECONDS", 0.0)
+        await routed_client.post("/todos", json={"title": "Not replicated yet"})
+        set_cache(InMemoryCache())
+
+        response = await routed_client.get("/todos")
+        assert response.json() == []
+
+        response = await routed_client.get("/auth/me")
+        assert response.json()["email"] == "r@example.com"
+
+    async def test_stickiness_travels_with_the_client(
+        self, routed_client: AsyncClient
+    ) -> None:
+        response = await routed_client.post("/todos", json={"title": "Fresh"})
+        cookie = response.cookies[LAST_WRITE_COOKIE]
+        set_cache(InMemoryCache())
+
+        # Another worker, which has no memory of the write, serves the reads.
+        transport = ASGITransport(app=app)  # type: ignore[arg-type]
+        async with AsyncClient(transport=transport, base_url="http://test") as other:
+            other.headers.update(routed_client.headers)
+            other.cookies[LAST_WRITE_COOKIE] = cookie
+            response = await other.get("/todos")
+            assert [t["title"] for t in response.json()] == ["Fresh"]
+
+            set_cache(InMemoryCache())
+            other.cookies.clear()
+            response = await other.get("/todos")
+            assert response.json() == []
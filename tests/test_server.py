@@ -0,0 +1,94 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.core.database import Base
+from src.server import bind_socket, build_config, default_workers, parse_args
+
+
+class TestConfig:
+    def test_defaults(self) -> None:
+        config = build_config(parse_args([]))
+        assert config.workers == default_workers()
+        assert config.loop == "uvloop"
+        assert config.http == "httptools"
+        assert config.limit_max_requests is None
+        assert config.access_log is False
+
+    def test_reload_runs_one_worker(self) -> None:
+        config = build_config(parse_args(["--reload", "--workers", "4"]))
+        assert config.workers == 1
+        assert config.should_reload
+
+    @pytest.mark.skipif(
+        not hasattr(socket, "SO_REUSEPORT"), reason="platform lacks SO_REUSEPORT"
+    )
+    def test_socket_allows_port_reuse(self) -> None:
+        first = bind_socket("127.0.0.1", 0)
+        port = first.getsockname()[1]
+        first.listen()
+        # A second server can take over the port while the first drains.
+        second = bind_socket("127.0.0.1", port)
+        assert second.getsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT)
+        first.close()
+        second.close()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+class TestServe:
+    async def test_workers_are_replaced_after_max_requests(
+        self, tmp_path: Path
+    ) -> None:
+        url = f"sqlite+aiosqlite:///{tmp_path / 'serve.db'}"
+        engine = create_async_engine(url)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await engine.dispose()
+
+        port = free_port()
+        env = {**os.environ, "DATABASE_URL": url, "ACCESS_LOG": "false"}
+        process = subprocess.Popen(
+            [sys.executable, "-m", "src", "--port", str(port), "--workers", "2"]
+            + ["--max-requests", "5"],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            deadline = time.monotonic() + 60
+            while True:
+                try:
+                    httpx.get(f"http://127.0.0.1:{port}/health")
+                    break
+                except httpx.TransportError:
+                    assert time.monotonic() < deadline, "server did not start"
+                    time.sleep(0.2)
+            statuses = []
+            while len(statuses) < 20:
+                try:
+                    statuses.append(
+                        httpx.get(f"http://127.0.0.1:{port}/health").status_code
+                    )
+                except httpx.TransportError:
+                    # Both workers may be restarting at once; wait for one.
+                    assert time.monotonic() < deadline, "workers were not replaced"
+                    time.sleep(0.2)
+            # Twice what the two original workers were allowed to serve.
+            assert set(statuses) == {200}
+        finally:
+            process.send_signal(signal.SIGTERM)
+            assert process.wait(timeout=30) == 0
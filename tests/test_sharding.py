@@ -0,0 +1,273 @@
+from collections.abc import AsyncGenerator
+from datetime import UTC, datetime
+from pathlib import Path
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from src.auth.models import User
+from src.core import database, rebalance
+from src.core.database import Base, Databases, Shard
+from src.core.idempotency import REPLAYED_HEADER, IdempotencyKey
+from src.core.sharding import UserDirectory, shard_map
+from src.main import app
+from src.tags.models import TodoTag
+from src.todos.archive import archive_completed
+from src.todos.models import Todo, TodoArchive
+
+Engines = tuple[AsyncEngine, list[AsyncEngine]]
+
+
+@pytest.fixture
+async def engines(tmp_path: Path) -> AsyncGenerator[Engines]:
+    directory = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'dir.db'}")
+    shard_engines = [
+        create_async_engine(f"sqlite+aiosqlite:///{tmp_path / f'shard{i}.db'}")
+        for i in range(2)
+    ]
+    for engine in (directory, *shard_engines):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    yield directory, shard_engines
+    for engine in (directory, *shard_engines):
+        await engine.dispose()
+
+
+@pytest.fixture
+async def sharded_client(
+    engines: Engines, monkeypatch: pytest.MonkeyPatch
+) -> AsyncGenerator[AsyncClient]:
+    directory, shard_engines = engines
+    shards = [Shard(engine, engine) for engine in shard_engines]
+    monkeypatch.setattr(database, "_databases", Databases(directory, shards))
+    monkeypatch.setattr(shard_map, "shard_count", len(shards))
+    transport = ASGITransport(app=app)  # type: ignore[arg-type]
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        yield ac
+
+
+async def signup(client: AsyncClient, email: str) -> dict[str, str]:
+    credentials = {"email": email, "password": "password123"}
+    response = await client.post("/auth/register", json=credentials)
+    assert response.status_code == 201
+    response = await client.post("/auth/login", json=credentials)
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def key(value: str) -> dict[str, str]:
+    return {"Idempotency-Key": value}
+
+
+async def count(engine: AsyncEngine, model: type[Base]) -> int:
+    async with engine.connect() as conn:
+        return (
+            await conn.execute(select(func.count()).select_from(model))
+        ).scalar_one()
+
+
+class TestShardedRequests:
+    async def test_users_live_on_their_shard(
+        self, sharded_client: AsyncClient, engines: Engines
+    ) -> None:
+        directory, (shard0, shard1) = engines
+        first = await signup(sharded_client, "one@example.com")
+        second = await signup(sharded_client, "two@example.com")
+        for headers, title in ((first, "first"), (second, "second")):
+            response = await sharded_client.post(
+                "/todos", json={"title": title}, headers=headers
+            )
+            assert response.status_code == 201
+
+        # Ids 1 and 2 land on shards 1 and 0; the directory holds no user data.
+        async with shard1.connect() as conn:
+            assert (await conn.execute(select(User.email))).scalar_one() == (
+                "one@example.com"
+            )
+            assert (await conn.execute(select(Todo.title))).scalar_one() == "first"
+        async with shard0.connect() as conn:
+            assert (await conn.execute(select(Todo.title))).scalar_one() == "second"
+        assert await count(directory, UserDirectory) == 2
+        assert await count(directory, User) == 0
+
+        response = await sharded_client.get("/todos", headers=first)
+        assert [todo["title"] for todo in response.json()] == ["first"]
+        response = await sharded_client.get("/auth/me", headers=second)
+        assert response.json()["email"] == "two@example.com"
+
+    async def test_tags_get_ids_unique_across_shards(
+        self, sharded_client: AsyncClient, engines: Engines
+    ) -> None:
+        tag_ids = []
+        for email in ("one@example.com", "two@example.com"):
+            headers = await signup(sharded_client, email)
+            await sharded_client.post(
+                "/todos", json={"title": "x", "tags": ["work"]}, headers=headers
+            )
+            response = await sharded_client.get("/tags", headers=headers)
+            tag_ids += [tag["id"] for tag in response.json()]
+        assert len(set(tag_ids)) == 2
+
+    async def test_moving_user_is_refused(
+        self, sharded_client: AsyncClient, engines: Engines
+    ) -> None:
+        headers = await signup(sharded_client, "busy@example.com")
+        await rebalance._set_moving(1, True)
+
+        response = await sharded_client.get("/todos", headers=headers)
+        assert response.status_code == 503
+        assert response.json()["code"] == "USER_MOVING"
+
+    async def test_failed_registration_frees_the_email(
+        self, sharded_client: AsyncClient, engines: Engines
+    ) -> None:
+        directory, (_, shard1) = engines
+        # A stray row makes the shard write of user 1 fail after the
+        # directory has committed its entry.
+        async with AsyncSession(shard1) as db:
+            db.add(User(id=1, email="new@example.com", hashed_password="x"))
+            await db.commit()
+        credentials = {"email": "new@example.com", "password": "password123"}
+        with pytest.raises(IntegrityError):
+            await sharded_client.post("/auth/register", json=credentials)
+        assert await count(directory, UserDirectory) == 0
+
+        async with AsyncSession(shard1) as db:
+            await db.execute(delete(User))
+            await db.commit()
+        await signup(sharded_client, "new@example.com")
+
+    async def test_idempotent_response_is_stored_once_the_shard_commits(
+        self, sharded_client: AsyncClient, engines: Engines
+    ) -> None:
+        directory, (_, shard1) = engines
+        headers = await signup(sharded_client, "one@example.com")
+        first = await sharded_client.post(
+            "/todos", json={"title": "First"}, headers={**headers, **key("k1")}
+        )
+        assert first.status_code == 201
+
+        def fail(*args: object) -> None:
+            raise RuntimeError("shard commit failed")
+
+        event.listen(shard1.sync_engine, "commit", fail)
+        try:
+            with pytest.raises(RuntimeError):
+                await sharded_client.post(
+                    "/todos", json={"title": "Lost"}, headers={**headers, **key("k2")}
+                )
+        finally:
+            event.remove(shard1.sync_engine, "commit", fail)
+        # The key was released, not stored with a response for a lost write.
+        async with directory.connect() as conn:
+            keys = (await conn.execute(select(IdempotencyKey.key))).scalars().all()
+        assert keys == ["k1"]
+
+        retry = await sharded_client.post(
+            "/todos", json={"title": "First"}, headers={**headers, **key("k1")}
+        )
+        assert retry.headers[REPLAYED_HEADER] == "true"
+        assert retry.json() == first.json()
+        retry = await sharded_client.post(
+            "/todos", json={"title": "Lost"}, headers={**headers, **key("k2")}
+        )
+        assert retry.status_code == 201
+        assert REPLAYED_HEADER not in retry.headers
+        assert await count(shard1, Todo) == 2
+
+
+class TestRebalance:
+    async def test_move_user_copies_rows_with_their_ids(
+        self, sharded_client: AsyncClient, engines: Engines
+    ) -> None:
+        _, (shard0, shard1) = engines
+        headers = await signup(sharded_client, "mover@example.com")
+        category = await sharded_client.post(
+            "/categories", json={"name": "Work"}, headers=headers
+        )
+        created = await sharded_client.post(
+            "/todos",
+            json={"title": "Filed", "category_id": category.json()["id"]},
+            headers=headers,
+        )
+        # A second user on the target shard gets ids of their own.
+        other = await signup(sharded_client, "stay@example.com")
+        await sharded_client.post("/categories", json={"name": "Own"}, headers=other)
+
+        await rebalance.move_user(1, 0, settle_seconds=0)
+
+        assert await count(shard1, User) == 0
+        assert await count(shard1, Todo) == 0
+        response = await sharded_client.get("/todos", headers=headers)
+        [todo] = response.json()
+        assert todo["title"] == "Filed"
+        assert todo["id"] == created.json()["id"]
+        assert todo["category_id"] == category.json()["id"]
+        response = await sharded_client.get(
+            f"/categories/{todo['category_id']}", headers=headers
+        )
+        assert response.json()["name"] == "Work"
+        response = await sharded_client.get("/categories", headers=other)
+        assert [c["name"] for c in response.json()] == ["Own"]
+
+    async def test_archived_todos_return_to_todo(
+        self, sharded_client: AsyncClient, engines: Engines
+    ) -> None:
+        _, (shard0, shard1) = engines
+        headers = await signup(sharded_client, "mover@example.com")
+        response = await sharded_client.post(
+            "/todos", json={"title": "Done"}, headers=headers
+        )
+        await sharded_client.patch(
+            f"/todos/{response.json()['id']}",
+            json={"status": "completed"},
+            headers=headers,
+        )
+        async with AsyncSession(shard1) as db:
+            assert await archive_completed(db, datetime.now(UTC), batch_size=10) == 1
+
+        await rebalance.move_user(1, 0, settle_seconds=0)
+
+        assert await count(shard1, TodoArchive) == 0
+        assert await count(shard0, TodoArchive) == 0
+        response = await sharded_client.get("/todos", headers=headers)
+        [todo] = response.json()
+        assert todo["title"] == "Done"
+        assert todo["status"] == "completed"
+
+    async def test_tags_follow_moved_todos(
+        self, sharded_client: AsyncClient, engines: Engines
+    ) -> None:
+        _, (shard0, shard1) = engines
+        headers = await signup(sharded_client, "mover@example.com")
+        done = await sharded_client.post(
+            "/todos", json={"title": "Done", "tags": ["old"]}, headers=headers
+        )
+        await sharded_client.patch(
+            f"/todos/{done.json()['id']}",
+            json={"status": "completed"},
+            headers=headers,
+        )
+        await sharded_client.post(
+            "/todos", json={"title": "Open", "tags": ["new"]}, headers=headers
+        )
+        async with AsyncSession(shard1) as db:
+            assert await archive_completed(db, datetime.now(UTC), batch_size=10) == 1
+        other = await signup(sharded_client, "stay@example.com")
+        await sharded_client.post(
+            "/todos", json={"title": "Theirs", "tags": ["own"]}, headers=other
+        )
+        await sharded_client.post("/todos", json={"title": "Theirs too"}, headers=other)
+
+        await rebalance.move_user(1, 0, settle_seconds=0)
+
+        assert await count(shard1, TodoTag) == 0
+        response = await sharded_client.get("/todos", headers=headers)
+        tags = {todo["title"]: todo["tags"] for todo in response.json()}
+        assert tags == {"Done": ["old"], "Open": ["new"]}
+        response = await sharded_client.get("/todos", headers=other)
+        tags = {todo["title"]: todo["tags"] for todo in response.json()}
+        assert tags == {"Theirs": ["own"], "Theirs too": []}
@@ -0,0 +1,31 @@
+import subprocess
+import sys
+
+from benchmarks.import_cost import measure_imports
+
+# What importing the app costs beyond the frameworks it is built on, as a
+# fraction of theirs. Relative, since both scale with the machine; measured
+# around 0.6. Eagerly loaded drivers are caught by the next test.
+FRAMEWORKS = ["fastapi", "sqlalchemy", "pydantic", "pydantic_settings"]
+APP_IMPORT_BUDGET = 1.0
+
+DEFERRED_MODULES = ["aiosqlite", "asyncpg", "jose", "cryptography", "uvloop"]
+
+
+def test_import_time_within_budget() -> None:
+    costs = {cost.module: cost.cumulative_us for cost in measure_imports("src.main")}
+    frameworks = sum(costs[module] for module in FRAMEWORKS)
+    assert costs["src.main"] - frameworks < frameworks * APP_IMPORT_BUDGET
+
+
+def test_import_defers_engines_and_heavy_modules() -> None:
+    check = (
+        "import sys, src.main\n"
+        "from src.core import database\n"
+        "assert database._databases is None, 'engine created at import'\n"
+        f"print([m for m in {DEFERRED_MODULES!r} if m in sys.modules])\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", check], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,289 @@
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from src.todos.archive import archive_completed
+from src.todos.models import Todo, TodoArchive
+from src.todos.service import TodoService
+
+
+async def add(
+    client: AsyncClient,
+    headers: dict[str, str],
+    title: str,
+    parent_id: int | None = None,
+) -> int:
+    response = await client.post(
+        "/todos", json={"title": title, "parent_id": parent_id}, headers=headers
+    )
+    assert response.status_code == 201, response.json()
+    todo_id: int = response.json()["id"]
+    return todo_id
+
+
+async def complete(client: AsyncClient, headers: dict[str, str], todo_id: int) -> None:
+    await client.patch(
+        f"/todos/{todo_id}", json={"status": "completed"}, headers=headers
+    )
+
+
+async def move(
+    client: AsyncClient, headers: dict[str, str], todo_id: int, parent_id: int | None
+) -> Any:
+    return await client.patch(
+        f"/todos/{todo_id}/move", json={"parent_id": parent_id}, headers=headers
+    )
+
+
+class TestCreate:
+    async def test_subtask_has_parent(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        parent = await add(client, auth_headers, "Trip")
+        child = await add(client, auth_headers, "Pack", parent)
+        response = await client.get(f"/todos/{child}", headers=auth_headers)
+        assert response.json()["parent_id"] == parent
+
+    async def test_parent_must_be_own_todo(
+        self,
+        client: AsyncClient,
+        auth_headers: dict[str, str],
+        second_user_headers: dict[str, str],
+    ) -> None:
+        parent = await add(client, auth_headers, "Trip")
+        for headers, parent_id in ((auth_headers, 999), (second_user_headers, parent)):
+            response = await client.post(
+                "/todos", json={"title": "x", "parent_id": parent_id}, headers=headers
+            )
+            assert response.status_code == 404
+            assert response.json()["code"] == "PARENT_TODO_NOT_FOUND"
+
+    async def test_depth_limit(
+        self,
+        client: AsyncClient,
+        auth_headers: dict[str, str],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr("src.todos.service.settings.SUBTASK_MAX_DEPTH", 2)
+        top = await add(client, auth_headers, "0")
+        middle = await add(client, auth_headers, "1", top)
+        bottom = await add(client, auth_headers, "2", middle)
+        response = await client.post(
+            "/todos", json={"title": "3", "parent_id": bottom}, headers=auth_headers
+        )
+        assert response.status_code == 422
+        assert response.json()["code"] == "SUBTASK_TOO_DEEP"
+
+
+class TestSubtree:
+    async def test_rolls_up_completion_in_one_query(
+        self,
+        client: AsyncClient,
+        auth_headers: dict[str, str],
+        test_engine: AsyncEngine,
+    ) -> None:
+        trip = await add(client, auth_headers, "Trip")
+        pack = await add(client, auth_headers, "Pack", trip)
+        await add(client, auth_headers, "Book", trip)
+        clothes = await add(client, auth_headers, "Clothes", pack)
+        await add(client, auth_headers, "Charger", pack)
+        await add(client, auth_headers, "Elsewhere")
+        await complete(client, auth_headers, clothes)
+
+        statements: list[str] = []
+
+        def record(*args: Any) -> None:
+            statements.append(args[2])
+
+        event.listen(test_engine.sync_engine, "before_cursor_execute", record)
+        try:
+            response = await client.get(f"/todos/{trip}/subtree", headers=auth_headers)
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", record)
+        # One query for the subtree, then one for all its tags.
+        assert [s for s in statements if "subtree" in s] == statements[-2:-1]
+        assert "todo_tag" in statements[-1]
+
+        nodes = {node["title"]: node for node in response.json()}
+        assert list(nodes) == ["Trip", "Pack", "Book", "Clothes", "Charger"]
+        assert [node["depth"] for node in nodes.values()] == [0, 1, 1, 2, 2]
+        assert nodes["Clothes"]["parent_id"] == pack
+        assert (nodes["Trip"]["subtasks"], nodes["Trip"]["subtasks_completed"]) == (
+            4,
+            1,
+        )
+        assert nodes["Trip"]["progress"] == 25.0
+        assert nodes["Pack"]["progress"] == 50.0
+        assert nodes["Book"]["subtasks"] == 0
+        assert nodes["Book"]["progress"] is None
+
+        response = await client.get(f"/todos/{pack}/subtree", headers=auth_headers)
+        assert [node["depth"] for node in response.json()] == [0, 1, 1]
+
+    async def test_other_users_subtree_not_found(
+        self,
+        client: AsyncClient,
+        auth_headers: dict[str, str],
+        second_user_headers: dict[str, str],
+    ) -> None:
+        trip = await add(client, auth_headers, "Trip")
+        response = await client.get(
+            f"/todos/{trip}/subtree", headers=second_user_headers
+        )
+        assert response.status_code == 404
+
+
+class TestMove:
+    async def test_moves_whole_subtree(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        trip = await add(client, auth_headers, "Trip")
+        pack = await add(client, auth_headers, "Pack", trip)
+        await add(client, auth_headers, "Clothes", pack)
+        work = await add(client, auth_headers, "Work")
+
+        response = await move(client, auth_headers, pack, work)
+        assert response.status_code == 200
+        assert response.json()["parent_id"] == work
+        response = await client.get(f"/todos/{work}/subtree", headers=auth_headers)
+        assert [n["title"] for n in response.json()] == ["Work", "Pack", "Clothes"]
+
+        response = await move(client, auth_headers, pack, None)
+        assert response.json()["parent_id"] is None
+        response = await client.get(f"/todos/{work}/subtree", headers=auth_headers)
+        assert len(response.json()) == 1
+
+    async def test_refuses_cycles(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        trip = await add(client, auth_headers, "Trip")
+        pack = await add(client, auth_headers, "Pack", trip)
+        clothes = await add(client, auth_headers, "Clothes", pack)
+        for parent in (trip, clothes):
+            response = await move(client, auth_headers, trip, parent)
+            assert response.status_code == 422
+            assert response.json()["code"] == "SUBTASK_CYCLE"
+
+    async def test_rechecks_after_a_concurrent_move(
+        self,
+        client: AsyncClient,
+        db: AsyncSession,
+        auth_headers: dict[str, str],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        trip = await add(client, auth_headers, "Trip")
+        pack = await add(client, auth_headers, "Pack")
+        check_parent = TodoService._check_parent
+
+        async def racing_check(self: TodoService, *args: Any) -> None:
+            await check_parent(self, *args)
+            # Another request moves Pack under Trip once this check passed.
+            await db.execute(update(Todo).where(Todo.id == pack).values(parent_id=trip))
+            monkeypatch.setattr(TodoService, "_check_parent", check_parent)
+
+        monkeypatch.setattr(TodoService, "_check_parent", racing_check)
+        response = await move(client, auth_headers, trip, pack)
+        assert response.status_code == 422
+        assert response.json()["code"] == "SUBTASK_CYCLE"
+
+    async def test_counts_subtree_height_against_depth_limit(
+        self,
+        client: AsyncClient,
+        auth_headers: dict[str, str],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr("src.todos.service.settings.SUBTASK_MAX_DEPTH", 2)
+        trip = await add(client, auth_headers, "Trip")
+        pack = await add(client, auth_headers, "Pack", trip)
+        await add(client, auth_headers, "Clothes", pack)
+        work = await add(client, auth_headers, "Work")
+        response = await move(client, auth_headers, trip, work)
+        assert response.status_code == 422
+        assert response.json()["code"] == "SUBTASK_TOO_DEEP"
+        response = await move(client, auth_headers, pack, work)
+        assert response.status_code == 200
+
+    async def test_parent_is_kept_unless_given(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        trip = await add(client, auth_headers, "Trip")
+        pack = await add(client, auth_headers, "Pack", trip)
+        book = await add(client, auth_headers, "Book", trip)
+
+        response = await client.patch(
+            f"/todos/{pack}/move", json={"after_id": book}, headers=auth_headers
+        )
+        assert response.status_code == 200
+        assert response.json()["parent_id"] == trip
+        response = await client.patch(
+            f"/todos/{pack}/move", json={"parent_id": None}, headers=auth_headers
+        )
+        assert response.status_code == 200
+        assert response.json()["parent_id"] is None
+
+
+async def test_delete_removes_subtree(
+    client: AsyncClient, db: AsyncSession, auth_headers: dict[str, str]
+) -> None:
+    trip = await add(client, auth_headers, "Trip")
+    pack = await add(client, auth_headers, "Pack", trip)
+    await add(client, auth_headers, "Clothes", pack)
+    await add(client, auth_headers, "Work")
+
+    response = await client.delete(f"/todos/{trip}", headers=auth_headers)
+    assert response.status_code == 204
+    assert (await db.scalars(select(Todo.title))).all() == ["Work"]
+
+
+async def test_subtree_queries_stop_at_a_cycle(
+    client: AsyncClient, db: AsyncSession, auth_headers: dict[str, str]
+) -> None:
+    trip = await add(client, auth_headers, "Trip")
+    pack = await add(client, auth_headers, "Pack", trip)
+    # Written around the checks, as a race could have before they locked.
+    await db.execute(update(Todo).where(Todo.id == trip).values(parent_id=pack))
+    await db.commit()
+
+    response = await client.get(f"/todos/{trip}/subtree", headers=auth_headers)
+    assert response.status_code == 200
+    response = await client.delete(f"/todos/{trip}", headers=auth_headers)
+    assert response.status_code == 204
+
+
+async def test_archiving_and_restoring_subtasks(
+    client: AsyncClient, db: AsyncSession, auth_headers: dict[str, str]
+) -> None:
+    trip = await add(client, auth_headers, "Trip")
+    pack = await add(client, auth_headers, "Pack", trip)
+    clothes = await add(client, auth_headers, "Clothes", pack)
+    for todo_id in (trip, pack, clothes):
+        await complete(client, auth_headers, todo_id)
+    await db.commit()
+    later = datetime.now(UTC) + timedelta(seconds=1)
+
+    # One level per batch: a parent waits for its subtasks.
+    assert await archive_completed(db, later, batch_size=1) == 3
+    db.expire_all()
+    archived = await db.scalars(select(TodoArchive.id).order_by(TodoArchive.id))
+    assert archived.all() == [trip, pack, clothes]
+
+    # Trip is still archived, so Pack comes back at the top level.
+    response = await client.post(f"/todos/{pack}/restore", headers=auth_headers)
+    assert response.json()["parent_id"] is None
+    response = await client.post(f"/todos/{clothes}/restore", headers=auth_headers)
+    assert response.json()["parent_id"] == pack
+
+
+async def test_parent_with_open_subtask_stays(
+    client: AsyncClient, db: AsyncSession, auth_headers: dict[str, str]
+) -> None:
+    trip = await add(client, auth_headers, "Trip")
+    await add(client, auth_headers, "Pack", trip)
+    await complete(client, auth_headers, trip)
+    await db.execute(update(Todo).values(updated_at=datetime(2020, 1, 1, tzinfo=UTC)))
+    await db.commit()
+    assert await archive_completed(db, datetime.now(UTC), batch_size=10) == 0
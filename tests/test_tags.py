@@ -0,0 +1,281 @@
+from datetime import UTC, datetime
+from typing import Any
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from src.core.config import get_settings
+from src.tags.models import Tag, TodoTag
+from src.tags.service import TagService
+from src.todos.archive import archive_completed
+
+
+async def add(
+    client: AsyncClient, headers: dict[str, str], title: str, tags: list[str]
+) -> int:
+    response = await client.post(
+        "/todos", json={"title": title, "tags": tags}, headers=headers
+    )
+    assert response.status_code == 201, response.json()
+    todo_id: int = response.json()["id"]
+    return todo_id
+
+
+async def titles(client: AsyncClient, headers: dict[str, str], **params: Any) -> Any:
+    response = await client.get("/todos", params=params, headers=headers)
+    assert response.status_code == 200, response.json()
+    return sorted(todo["title"] for todo in response.json())
+
+
+async def count_links(db: AsyncSession) -> int:
+    return await db.scalar(select(func.count()).select_from(TodoTag)) or 0
+
+
+class TestTagRouter:
+    async def test_create_rename_delete(
+        self, client: AsyncClient, db: AsyncSession, auth_headers: dict[str, str]
+    ) -> None:
+        response = await client.post(
+            "/tags", json={"name": " Work "}, headers=auth_headers
+        )
+        await db.commit()
+        assert response.status_code == 201
+        tag = response.json()
+        assert tag["name"] == "work"
+
+        response = await client.post(
+            "/tags", json={"name": "WORK"}, headers=auth_headers
+        )
+        assert response.status_code == 409
+        assert response.json()["code"] == "TAG_EXISTS"
+
+        response = await client.patch(
+            f"/tags/{tag['id']}", json={"name": "Office"}, headers=auth_headers
+        )
+        assert response.json()["name"] == "office"
+
+        response = await client.delete(f"/tags/{tag['id']}", headers=auth_headers)
+        assert response.status_code == 204
+        response = await client.delete(f"/tags/{tag['id']}", headers=auth_headers)
+        assert response.status_code == 404
+        assert response.json()["code"] == "TAG_NOT_FOUND"
+
+    async def test_rejects_commas(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        response = await client.post(
+            "/tags", json={"name": "a,b"}, headers=auth_headers
+        )
+        assert response.status_code == 422
+
+    async def test_autocomplete_by_prefix(
+        self,
+        client: AsyncClient,
+        auth_headers: dict[str, str],
+        second_user_headers: dict[str, str],
+    ) -> None:
+        for name in ("workout", "home", "work", "wp", "wo"):
+            await client.post("/tags", json={"name": name}, headers=auth_headers)
+        await client.post("/tags", json={"name": "worry"}, headers=second_user_headers)
+
+        async def complete(**params: Any) -> list[str]:
+            response = await client.get("/tags", params=params, headers=auth_headers)
+            return [tag["name"] for tag in response.json()]
+
+        assert await complete() == ["home", "wo", "work", "workout", "wp"]
+        assert await complete(prefix="Wor") == ["work", "workout"]
+        assert await complete(prefix="wo", limit=2) == ["wo", "work"]
+        assert await complete(prefix="x") == []
+        # Last characters without a plain successor code point.
+        assert await complete(prefix="w\U0010ffff") == []
+        assert await complete(prefix="\ud7ff") == []
+
+    async def test_rename_shows_on_todos(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        todo_id = await add(client, auth_headers, "Report", ["work"])
+        [tag] = (await client.get("/tags", headers=auth_headers)).json()
+        await client.patch(
+            f"/tags/{tag['id']}", json={"name": "office"}, headers=auth_headers
+        )
+        response = await client.get(f"/todos/{todo_id}", headers=auth_headers)
+        assert response.json()["tags"] == ["office"]
+
+    async def test_delete_takes_tag_off_todos(
+        self, client: AsyncClient, db: AsyncSession, auth_headers: dict[str, str]
+    ) -> None:
+        todo_id = await add(client, auth_headers, "Report", ["work", "urgent"])
+        tags = (
+            await client.get("/tags", params={"prefix": "work"}, headers=auth_headers)
+        ).json()
+        await client.delete(f"/tags/{tags[0]['id']}", headers=auth_headers)
+        response = await client.get(f"/todos/{todo_id}", headers=auth_headers)
+        assert response.json()["tags"] == ["urgent"]
+        assert await count_links(db) == 1
+
+    async def test_delete_is_one_transaction(
+        self,
+        client: AsyncClient,
+        db: AsyncSession,
+        auth_headers: dict[str, str],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        for n in range(5):
+            await add(client, auth_headers, f"Todo {n}", ["work"])
+        [tag] = (await client.get("/tags", headers=auth_headers)).json()
+        await db.commit()
+
+        # A delete failing after the unlinking leaves every todo tagged, even
+        # with more links than fit in a batch of deletes.
+        monkeypatch.setattr(get_settings(), "DELETE_BATCH_SIZE", 2)
+
+        async def fail(*args: object) -> None:
+            raise RuntimeError("delete failed")
+
+        with monkeypatch.context() as patch:
+            patch.setattr("src.tags.service.invalidate_user", fail)
+            with pytest.raises(RuntimeError):
+                await client.delete(f"/tags/{tag['id']}", headers=auth_headers)
+        await db.rollback()  # as get_db does
+        assert await count_links(db) == 5
+
+        response = await client.delete(f"/tags/{tag['id']}", headers=auth_headers)
+        assert response.status_code == 204
+        assert await count_links(db) == 0
+
+
+class TestTodoTags:
+    async def test_create_and_replace_tags(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        response = await client.post(
+            "/todos",
+            json={"title": "Report", "tags": ["Work", "urgent", "work"]},
+            headers=auth_headers,
+        )
+        todo = response.json()
+        assert todo["tags"] == ["urgent", "work"]
+        response = await client.get("/tags", headers=auth_headers)
+        assert [tag["name"] for tag in response.json()] == ["urgent", "work"]
+
+        url = f"/todos/{todo['id']}"
+        response = await client.patch(url, json={"title": "Q3"}, headers=auth_headers)
+        assert response.json()["tags"] == ["urgent", "work"]
+
+        response = await client.patch(
+            url, json={"tags": ["later"]}, headers=auth_headers
+        )
+        assert response.json()["tags"] == ["later"]
+        assert response.json()["updated_at"] > todo["updated_at"]
+        response = await client.get(url, headers=auth_headers)
+        assert response.json()["tags"] == ["later"]
+
+    async def test_tag_created_concurrently_is_reused(
+        self,
+        client: AsyncClient,
+        db: AsyncSession,
+        auth_headers: dict[str, str],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        await client.post("/tags", json={"name": "work"}, headers=auth_headers)
+        named = TagService._named
+
+        async def stale(self: TagService, *args: Any) -> dict[str, Tag]:
+            # Misses the tag once, as if another request created it since.
+            monkeypatch.setattr(TagService, "_named", named)
+            return {}
+
+        monkeypatch.setattr(TagService, "_named", stale)
+        response = await client.post(
+            "/todos", json={"title": "Report", "tags": ["work"]}, headers=auth_headers
+        )
+        assert response.status_code == 201
+        assert response.json()["tags"] == ["work"]
+        assert await db.scalar(select(func.count()).select_from(Tag)) == 1
+
+    async def test_filter_all_or_any(
+        self,
+        client: AsyncClient,
+        auth_headers: dict[str, str],
+        second_user_headers: dict[str, str],
+    ) -> None:
+        await add(client, auth_headers, "Both", ["work", "urgent"])
+        await add(client, auth_headers, "Work", ["work"])
+        await add(client, auth_headers, "Urgent", ["urgent", "home"])
+        await add(client, auth_headers, "None", [])
+        await add(client, second_user_headers, "Theirs", ["work", "urgent"])
+
+        headers = auth_headers
+        assert await titles(client, headers, tags="work") == ["Both", "Work"]
+        assert await titles(client, headers, tags="urgent, WORK") == ["Both"]
+        assert await titles(client, headers, tags="urgent,work", match="any") == [
+            "Both",
+            "Urgent",
+            "Work",
+        ]
+        assert await titles(client, headers, tags="work,missing") == []
+        assert await titles(client, headers, tags="work,missing", match="any") == [
+            "Both",
+            "Work",
+        ]
+
+    async def test_list_loads_tags_in_one_query(
+        self,
+        client: AsyncClient,
+        auth_headers: dict[str, str],
+        test_engine: AsyncEngine,
+    ) -> None:
+        for n in range(5):
+            await add(client, auth_headers, f"Todo {n}", [f"tag{n}", "common"])
+
+        statements: list[str] = []
+
+        def record(*args: Any) -> None:
+            statements.append(args[2])
+
+        event.listen(test_engine.sync_engine, "before_cursor_execute", record)
+        try:
+            response = await client.get("/todos", headers=auth_headers)
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", record)
+        assert len([s for s in statements if "todo_tag" in s]) == 1
+        for todo in response.json():
+            assert todo["tags"] == ["common", f"tag{todo['title'][-1]}"]
+
+    async def test_delete_todo_removes_its_tags(
+        self, client: AsyncClient, db: AsyncSession, auth_headers: dict[str, str]
+    ) -> None:
+        todo_id = await add(client, auth_headers, "Report", ["work"])
+        await add(client, auth_headers, "Other", ["work"])
+        await client.delete(f"/todos/{todo_id}", headers=auth_headers)
+        assert await count_links(db) == 1
+        # The tag itself stays, for autocomplete.
+        assert await db.scalar(select(func.count()).select_from(Tag)) == 1
+
+    async def test_archived_todos_keep_their_tags(
+        self, client: AsyncClient, db: AsyncSession, auth_headers: dict[str, str]
+    ) -> None:
+        todo_id = await add(client, auth_headers, "Done", ["work"])
+        await add(client, auth_headers, "Open", ["work"])
+        await client.patch(
+            f"/todos/{todo_id}", json={"status": "completed"}, headers=auth_headers
+        )
+        await db.commit()
+        assert await archive_completed(db, datetime.now(UTC), batch_size=10) == 1
+
+        assert await titles(client, auth_headers, tags="work") == ["Open"]
+        assert await titles(
+            client, auth_headers, tags="work", include_archived="true"
+        ) == ["Done", "Open"]
+        response = await client.get(
+            f"/todos/{todo_id}",
+            params={"include_archived": "true"},
+            headers=auth_headers,
+        )
+        assert response.json()["tags"] == ["work"]
+
+        response = await client.post(f"/todos/{todo_id}/restore", headers=auth_headers)
+        assert response.json()["tags"] == ["work"]
+        assert await titles(client, auth_headers, tags="work") == ["Done", "Open"]
@@ -0,0 +1,108 @@
+import pytest
+from httpx import AsyncClient
+
+from src.auth.passwords import BcryptHasher, set_password_hasher
+from src.auth.throttle import login_throttle
+from src.core.cache import InMemoryCache, set_cache
+
+PASSWORD = "securepass123"
+
+
+class CountingHasher(BcryptHasher):
+    def __init__(self) -> None:
+        super().__init__(rounds=4)
+        self.verifies = 0
+
+    def verify(self, password: str, hashed: str) -> bool:
+        self.verifies += 1
+        return super().verify(password, hashed)
+
+
+@pytest.fixture
+def hasher() -> CountingHasher:
+    hasher = CountingHasher()
+    set_password_hasher(hasher)
+    return hasher
+
+
+async def attempt(client: AsyncClient, email: str, password: str) -> int:
+    response = await client.post(
+        "/auth/login", json={"email": email, "password": password}
+    )
+    return response.status_code
+
+
+def test_backoff_doubles_after_free_failures() -> None:
+    assert [login_throttle.backoff(n, free=2) for n in range(5)] == [
+        0.0,
+        0.0,
+        1.0,
+        2.0,
+        4.0,
+    ]
+    assert login_throttle.backoff(100, free=2) == login_throttle.backoff_max
+
+
+class TestLoginThrottle:
+    async def test_account_backs_off_after_failures(
+        self, client: AsyncClient, hasher: CountingHasher
+    ) -> None:
+        await client.post(
+            "/auth/register", json={"email": "a@example.com", "password": PASSWORD}
+        )
+        for i in range(5):
+            assert await attempt(client, "a@example.com", f"wrong-{i}") == 401
+
+        response = await client.post(
+            "/auth/login", json={"email": "a@example.com", "password": PASSWORD}
+        )
+        assert response.status_code == 429
+        assert response.json()["code"] == "LOGIN_THROTTLED"
+        assert int(response.headers["retry-after"]) >= 1
+        assert hasher.verifies == 5  # the throttled attempt did no hashing
+
+    async def test_negative_cache_cannot_evict_failures(
+        self, client: AsyncClient
+    ) -> None:
+        # Each wrong password adds a negative-cache entry to a tiny cache.
+        set_cache(InMemoryCache(max_entries=2))
+        for i in range(5):
+            assert await attempt(client, "c@example.com", f"wrong-{i}") == 401
+        assert await attempt(client, "c@example.com", PASSWORD) == 429
+
+    async def test_ip_backs_off_across_accounts(
+        self, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setitem(login_throttle.free, "ip", 3)
+        for i in range(3):
+            assert await attempt(client, f"user{i}@example.com", PASSWORD) == 401
+        assert await attempt(client, "fresh@example.com", PASSWORD) == 429
+
+    async def test_success_resets_account_failures(
+        self, client: AsyncClient, hasher: CountingHasher
+    ) -> None:
+        await client.post(
+            "/auth/register", json={"email": "b@example.com", "password": PASSWORD}
+        )
+        for i in range(4):
+            await attempt(client, "b@example.com", f"wrong-{i}")
+        assert await attempt(client, "b@example.com", PASSWORD) == 200
+        for i in range(4):
+            assert await attempt(client, "b@example.com", f"again-{i}") == 401
+
+    async def test_repeated_bad_credential_skips_hashing(
+        self, client: AsyncClient, hasher: CountingHasher
+    ) -> None:
+        assert await attempt(client, "ghost@example.com", PASSWORD) == 401
+        assert await attempt(client, "ghost@example.com", PASSWORD) == 401
+        # Unknown email: one dummy verify, then the negative cache answers.
+        assert hasher.verifies == 1
+
+    async def test_registering_clears_remembered_failure(
+        self, client: AsyncClient
+    ) -> None:
+        assert await attempt(client, "late@example.com", PASSWORD) == 401
+        await client.post(
+            "/auth/register", json={"email": "late@example.com", "password": PASSWORD}
+        )
+        assert await attempt(client, "late@example.com", PASSWORD) == 200
@@ -0,0 +1,385 @@
+import asyncio
+import hashlib
+import hmac
+import json
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Any
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth.schemas import UserCreate
+from src.auth.service import AuthService
+from src.outbox.models import OutboxMessage
+from src.outbox.service import OutboxEntry, register_handler
+from src.outbox.worker import OutboxWorker
+from src.todos.schemas import TodoCreate, TodoUpdate
+from src.todos.service import TodoService
+from src.webhooks.delivery import (
+    WEBHOOK_RETRY,
+    WEBHOOK_TOPICS,
+    WebhookDeliveryError,
+    WebhookDestinationError,
+    WebhookDispatcher,
+    coalesce,
+)
+from src.webhooks.models import Webhook
+
+
+@dataclass
+class Receiver:
+    """A stand-in webhook endpoint answering with scripted status codes."""
+
+    statuses: list[int] = field(default_factory=list)
+    delay: float = 0.0
+    requests: list[tuple[dict[str, str], bytes]] = field(default_factory=list)
+    in_flight: int = 0
+    max_in_flight: int = 0
+    url: str = ""
+
+    async def serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.IncompleteReadError:
+                break
+            lines = head.decode().split("\r\n")[1:]
+            headers = {
+                name.lower(): value.strip()
+                for name, _, value in (line.partition(":") for line in lines if line)
+            }
+            body = await reader.readexactly(int(headers["content-length"]))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(self.delay)
+            self.in_flight -= 1
+            self.requests.append((headers, body))
+            status = self.statuses.pop(0) if self.statuses else 200
+            writer.write(f"HTTP/1.1 {status} -\r\nContent-Length: 0\r\n\r\n".encode())
+            await writer.drain()
+        writer.close()
+
+
+@pytest.fixture
+async def receiver() -> AsyncIterator[Receiver]:
+    receiver = Receiver()
+    server = await asyncio.start_server(receiver.serve, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    receiver.url = f"http://127.0.0.1:{port}/hook"
+    async with server:
+        yield receiver
+
+
+@pytest.fixture
+async def dispatcher() -> AsyncIterator[WebhookDispatcher]:
+    dispatcher = WebhookDispatcher(
+        timeout=5,
+        max_connections=10,
+        host_concurrency=4,
+        attempts=3,
+        backoff_base_seconds=0,
+        deadline_seconds=5,
+        allow_private=True,
+    )
+    yield dispatcher
+    await dispatcher.close()
+
+
+@pytest.fixture
+async def user_id(db: AsyncSession) -> int:
+    user = await AuthService(db).create_user(
+        UserCreate(email="test@example.com", password="testpassword123")
+    )
+    await db.commit()
+    return user.id
+
+
+def entry(id: int, topic: str, payload: dict[str, Any]) -> OutboxEntry:
+    return OutboxEntry(
+        id, 1, topic, json.dumps(payload), 1, datetime(2026, 1, 1, tzinfo=UTC), 0
+    )
+
+
+def webhook(id: int, url: str, user_id: int = 1) -> Webhook:
+    return Webhook(id=id, user_id=user_id, url=url, secret=f"secret-{id}")
+
+
+def verify(secret: str, headers: dict[str, str], body: bytes) -> bool:
+    fields = dict(
+        part.split("=", 1) for part in headers["x-webhook-signature"].split(",")
+    )
+    message = f"{fields['t']}.".encode() + body
+    expected = hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, fields["v1"])
+
+
+class TestWebhookRouter:
+    async def test_create_list_delete(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        response = await client.post(
+            "/webhooks", json={"url": "https://example.com/hook"}, headers=auth_headers
+        )
+        assert response.status_code == 201
+        created = response.json()
+        assert created["url"] == "https://example.com/hook"
+        assert len(created["secret"]) >= 32
+
+        response = await client.get("/webhooks", headers=auth_headers)
+        assert response.json() == [
+            {key: created[key] for key in ("id", "url", "created_at")}
+        ]
+
+        response = await client.delete(
+            f"/webhooks/{created['id']}", headers=auth_headers
+        )
+        assert response.status_code == 204
+        response = await client.delete(
+            f"/webhooks/{created['id']}", headers=auth_headers
+        )
+        assert response.status_code == 404
+        assert response.json()["code"] == "WEBHOOK_NOT_FOUND"
+
+    async def test_other_users_webhook_not_found(
+        self,
+        client: AsyncClient,
+        auth_headers: dict[str, str],
+        second_user_headers: dict[str, str],
+    ) -> None:
+        response = await client.post(
+            "/webhooks", json={"url": "https://example.com/hook"}, headers=auth_headers
+        )
+        webhook_id = response.json()["id"]
+        response = await client.delete(
+            f"/webhooks/{webhook_id}", headers=second_user_headers
+        )
+        assert response.status_code == 404
+        response = await client.get("/webhooks", headers=second_user_headers)
+        assert response.json() == []
+
+    async def test_rejects_invalid_url(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ) -> None:
+        response = await client.post(
+            "/webhooks", json={"url": "ftp://example.com"}, headers=auth_headers
+        )
+        assert response.status_code == 422
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "http://localhost:8000/hook",
+            "http://127.0.0.1/hook",
+            "http://10.0.0.5/hook",
+            "http://169.254.169.254/latest/meta-data",
+            "http://[::1]/hook",
+        ],
+    )
+    async def test_rejects_private_destinations(
+        self, client: AsyncClient, auth_headers: dict[str, str], url: str
+    ) -> None:
+        response = await client.post(
+            "/webhooks", json={"url": url}, headers=auth_headers
+        )
+        assert response.status_code == 422
+
+    async def test_limit_per_user(
+        self,
+        client: AsyncClient,
+        auth_headers: dict[str, str],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr("src.webhooks.service.settings.WEBHOOK_MAX_PER_USER", 1)
+        body = {"url": "https://example.com/hook"}
+        response = await client.post("/webhooks", json=body, headers=auth_headers)
+        assert response.status_code == 201
+        response = await client.post("/webhooks", json=body, headers=auth_headers)
+        assert response.status_code == 409
+        assert response.json()["code"] == "WEBHOOK_LIMIT"
+
+
+class TestCoalesce:
+    def test_keeps_net_effect_per_entity(self) -> None:
+        entries = [
+            entry(1, "todo.created", {"id": 1, "title": "a"}),
+            entry(2, "todo.updated", {"id": 1, "title": "b"}),
+            entry(3, "todo.updated", {"id": 2, "title": "c"}),
+            entry(4, "todo.deleted", {"id": 2}),
+            entry(5, "todo.created", {"id": 3, "title": "d"}),
+            entry(6, "todo.deleted", {"id": 3}),
+            entry(7, "category.updated", {"id": 1, "name": "Work"}),
+        ]
+        assert [(e.id, e.topic) for e in coalesce(entries)] == [
+            (2, "todo.created"),
+            (4, "todo.deleted"),
+            (7, "category.updated"),
+        ]
+
+
+class TestDispatcher:
+    async def test_signed_delivery(
+        self, receiver: Receiver, dispatcher: WebhookDispatcher
+    ) -> None:
+        await dispatcher.send(webhook(1, receiver.url), b'{"events":[]}', "abc")
+
+        [(headers, body)] = receiver.requests
+        assert body == b'{"events":[]}'
+        assert headers["x-webhook-id"] == "abc"
+        assert headers["content-type"] == "application/json"
+        assert verify("secret-1", headers, body)
+        assert not verify("secret-2", headers, body)
+
+    async def test_retries_server_errors(
+        self, receiver: Receiver, dispatcher: WebhookDispatcher
+    ) -> None:
+        receiver.statuses = [500, 503]
+        await dispatcher.send(webhook(1, receiver.url), b"{}", "abc")
+        assert len(receiver.requests) == 3
+
+        receiver.statuses = [500, 500, 500]
+        with pytest.raises(WebhookDeliveryError, match="HTTP 500"):
+            await dispatcher.send(webhook(1, receiver.url), b"{}", "abc")
+
+    async def test_client_error_is_not_retried(
+        self, receiver: Receiver, dispatcher: WebhookDispatcher
+    ) -> None:
+        receiver.statuses = [410]
+        await dispatcher.send(webhook(1, receiver.url), b"{}", "abc")
+        assert len(receiver.requests) == 1
+
+    async def test_gives_up_at_the_deadline(
+        self, receiver: Receiver, dispatcher: WebhookDispatcher
+    ) -> None:
+        dispatcher.deadline_seconds = 0.05
+        receiver.delay = 1
+        with pytest.raises(WebhookDeliveryError, match="no success"):
+            await dispatcher.send(webhook(1, receiver.url), b"{}", "abc")
+
+    async def test_refuses_private_destinations(
+        self, receiver: Receiver, dispatcher: WebhookDispatcher
+    ) -> None:
+        dispatcher.allow_private = False
+        # The address connected to is checked, whatever the name resolved to
+        # before, and the connection is closed before anything is sent.
+        by_name = receiver.url.replace("127.0.0.1", "localhost")
+        for url in (receiver.url, by_name):
+            with pytest.raises(WebhookDestinationError):
+                await dispatcher._send(webhook(1, url), b"{}", "abc")
+        # Dropped, not retried.
+        await dispatcher.send(webhook(1, receiver.url), b"{}", "abc")
+        assert receiver.requests == []
+
+    async def test_limits_requests_per_host(
+        self, receiver: Receiver, dispatcher: WebhookDispatcher
+    ) -> None:
+        dispatcher.host_concurrency = 2
+        receiver.delay = 0.02
+        await asyncio.gather(
+            *(
+                dispatcher.send(webhook(n, receiver.url), b"{}", str(n))
+                for n in range(6)
+            )
+        )
+        assert len(receiver.requests) == 6
+        assert receiver.max_in_flight == 2
+
+
+@pytest.mark.usefixtures("isolated_outbox")
+class TestOutboxDelivery:
+    async def test_batch_becomes_one_signed_post(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        receiver: Receiver,
+        dispatcher: WebhookDispatcher,
+    ) -> None:
+        register_handler(WEBHOOK_TOPICS, dispatcher.handle)
+        db.add(Webhook(user_id=user_id, url=receiver.url, secret="s3cret"))
+        todos = TodoService(db)
+        first = await todos.create(TodoCreate(title="First"), user_id)
+        first_id = first.id
+        await todos.update(first_id, TodoUpdate(title="Renamed"), user_id)
+        second = await todos.create(TodoCreate(title="Second"), user_id)
+        await todos.delete(second.id, user_id)
+        await db.commit()
+
+        worker = OutboxWorker(
+            concurrency=1,
+            batch_size=100,
+            lease_seconds=60,
+            poll_seconds=1,
+            max_attempts=3,
+            backoff_base_seconds=60,
+            backoff_max_seconds=600,
+        )
+        assert await worker.run_once() == 4
+
+        [(headers, body)] = receiver.requests
+        assert verify("s3cret", headers, body)
+        [event] = json.loads(body)["events"]
+        assert event["type"] == "todo.created"
+        assert event["data"]["title"] == "Renamed"
+        db.expire_all()
+        assert (await db.scalars(select(OutboxMessage))).all() == []
+
+    async def test_failed_delivery_is_retried_for_its_webhook_alone(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        receiver: Receiver,
+        dispatcher: WebhookDispatcher,
+    ) -> None:
+        register_handler(WEBHOOK_TOPICS, dispatcher.handle)
+        register_handler([WEBHOOK_RETRY], dispatcher.retry)
+        failing = Receiver(statuses=[500, 500, 500])
+        server = await asyncio.start_server(failing.serve, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        db.add(Webhook(user_id=user_id, url=receiver.url, secret="ok"))
+        db.add(Webhook(user_id=user_id, url=f"http://127.0.0.1:{port}/", secret="down"))
+        await TodoService(db).create(TodoCreate(title="First"), user_id)
+        await db.commit()
+
+        worker = OutboxWorker(
+            concurrency=1,
+            batch_size=100,
+            lease_seconds=60,
+            poll_seconds=1,
+            max_attempts=3,
+            backoff_base_seconds=0,
+            backoff_max_seconds=0,
+        )
+        async with server:
+            assert await worker.run_once() == 1
+            db.expire_all()
+            [message] = (await db.scalars(select(OutboxMessage))).all()
+            assert message.topic == WEBHOOK_RETRY
+            assert message.attempts == 1
+            assert "HTTP 500" in (message.last_error or "")
+
+            failing.statuses = [500, 500, 500]
+            message.available_at = datetime.now(UTC)
+            await db.commit()
+            assert await worker.run_once() == 1
+            db.expire_all()
+            [message] = (await db.scalars(select(OutboxMessage))).all()
+            assert message.attempts == 2
+
+            message.available_at = datetime.now(UTC)
+            await db.commit()
+            assert await worker.run_once() == 1
+            # Or closing the server waits on the pooled connection.
+            await dispatcher.close()
+
+        # The healthy webhook got the batch once; the other one kept its id.
+        assert len(receiver.requests) == 1
+        ids = {headers["x-webhook-id"] for headers, _ in failing.requests}
+        assert len(failing.requests) == 7 and len(ids) == 1
+        assert verify("down", *failing.requests[-1])
+        db.expire_all()
+        assert (await db.scalars(select(OutboxMessage))).all() == []